@@ -0,0 +1,92 @@
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+from langchain_qdrant import RetrievalMode
+
+from assistant.infrastructure.qdrant.service import QdrantManager
+
+DEPARTMENTS = ["hr", "it support", "facilities & admin", "billing & payment", "shipping & delivery"]
+
+
+def seed(manager: QdrantManager, points: int) -> None:
+    documents = [
+        Document(page_content=f"Q: question {i}\nA: answer {i}", metadata={"source": DEPARTMENTS[i % 5]})
+        for i in range(points)
+    ]
+    for i in range(0, points, 256):
+        manager.add_documents(documents[i : i + 256])
+
+
+async def run(search, queries: int, concurrency: int) -> tuple[float, list[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await search(f"question {i}", DEPARTMENTS[i % 5])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(queries)))
+    return queries / (time.perf_counter() - start), sorted(latencies)
+
+
+@click.command()
+@click.option("--collection", default="benchmark_async_retrieval", help="Scratch collection (recreated).")
+@click.option("--points", default=2000, type=int, help="Documents to seed.")
+@click.option("--queries", default=512, type=int, help="Searches per run.")
+@click.option("--concurrency", "concurrency_levels", multiple=True, type=int, default=(1, 16, 64))
+def main(collection: str, points: int, queries: int, concurrency_levels: tuple[int, ...]) -> None:
+    """
+    Compare retrieval throughput of the sync client run in worker threads (what LangGraph does with
+    sync nodes) against the shared AsyncQdrantClient, at several levels of concurrency.
+
+    Needs a Qdrant server at QDRANT_URL. Embeddings are deterministic fakes, so only Qdrant
+    round-trips are measured.
+    """
+    manager = QdrantManager(
+        collection_name=collection,
+        embedding=DeterministicFakeEmbedding(size=1536),
+        vector_size=1536,
+        retrieval_mode=RetrievalMode.DENSE,
+        force_recreate=True,
+    )
+    seed(manager, points)
+
+    async def threaded(query: str, source: str):
+        return await asyncio.to_thread(manager.similarity_search, query, 3, None, {"source": source})
+
+    async def native(query: str, source: str):
+        return await manager.asimilarity_search(query, 3, filters={"source": source})
+
+    async def bench() -> None:
+        click.echo(f"{'client':<10} {'concurrency':>11} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for concurrency in concurrency_levels:
+            for name, search in (("threaded", threaded), ("async", native)):
+                throughput, latencies = await run(search, queries, concurrency)
+                click.echo(
+                    f"{name:<10} {concurrency:>11} {throughput:>10.1f} "
+                    f"{statistics.median(latencies):>10.2f} {latencies[int(len(latencies) * 0.99) - 1]:>10.2f}"
+                )
+        await manager.aclose()
+
+    asyncio.run(bench())
+    manager.client.delete_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import asyncio
+import operator
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Annotated, TypedDict
+
+import click
+from pymongo import MongoClient, monitoring
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.graph import END, START, StateGraph
+
+from assistant.config import settings
+from assistant.infrastructure.mongdb.checkpointer import AsyncMongoDBSaver
+
+DATABASE = "checkpointer_benchmark"
+DURABILITIES = ("sync", "async", "exit")
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts the commands sent to MongoDB by every client of the process."""
+
+    def __init__(self) -> None:
+        self.commands = 0
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self.commands += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+class TurnState(TypedDict):
+    query: str
+    notes: Annotated[list[str], operator.add]
+    response: str
+
+
+def build_graph(node_seconds: float, payload: str):
+    """Same shape as the support workflow: two parallel first steps, retrieval, then the response."""
+
+    def node(name: str):
+        async def run(state: TurnState) -> dict:
+            await asyncio.sleep(node_seconds)
+            return {"notes": [f"{name}: {payload}"]}
+
+        return run
+
+    async def respond(state: TurnState) -> dict:
+        await asyncio.sleep(node_seconds)
+        return {"response": payload}
+
+    builder = StateGraph(TurnState)
+    for name in ("classify", "speculate", "retrieve"):
+        builder.add_node(name, node(name))
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "classify")
+    builder.add_edge(START, "speculate")
+    builder.add_edge("classify", "retrieve")
+    builder.add_edge("speculate", "retrieve")
+    builder.add_edge("retrieve", "respond")
+    builder.add_edge("respond", END)
+    return builder
+
+
+@click.command()
+@click.option("--mongodb-uri", default=settings.MONGO_URI, help="MongoDB to benchmark, e.g. a local mongod.")
+@click.option("--turns", default=200, type=int, help="Turns per configuration.")
+@click.option("--concurrency", default=16, type=int, help="Turns running at the same time.")
+@click.option("--threads", default=20, type=int, help="Conversation threads the turns are spread over.")
+@click.option("--node-ms", default=5.0, help="Work done by each graph node.")
+@click.option("--payload-kb", default=4.0, help="Size of the state each node adds.")
+def main(mongodb_uri: str, turns: int, concurrency: int, threads: int, node_ms: float, payload_kb: float) -> None:
+    """
+    Compare conversation state checkpointers on the same graph: MongoDBSaver (blocking pymongo in
+    the thread pool) and AsyncMongoDBSaver with and without write coalescing, under each
+    durability mode. Reports turn latency, throughput and MongoDB commands per turn.
+
+    Uses (and drops) the `checkpointer_benchmark` database of the given MongoDB.
+    """
+    counter = CommandCounter()
+    monitoring.register(counter)
+    sync_client = MongoClient(mongodb_uri)
+    builder = build_graph(node_ms / 1000, "x" * int(payload_kb * 1024))
+
+    def savers():
+        yield "MongoDBSaver", lambda: MongoDBSaver(sync_client, db_name=DATABASE)
+        yield "async", lambda: AsyncMongoDBSaver(mongodb_uri, DATABASE, coalesce_writes=False)
+        yield "async+coalesce", lambda: AsyncMongoDBSaver(mongodb_uri, DATABASE, coalesce_writes=True)
+
+    async def run_turns(graph, durability: str) -> list[float]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def turn(i: int) -> float:
+            async with semaphore:
+                start = time.perf_counter()
+                config = {"configurable": {"thread_id": f"thread-{i % threads}"}}
+                await graph.ainvoke({"query": f"question {i}"}, config, durability=durability)
+                return time.perf_counter() - start
+
+        return await asyncio.gather(*[turn(i) for i in range(turns)])
+
+    async def bench() -> None:
+        click.echo(
+            f"{'saver':<16} {'durability':<10} {'p50 ms':>8} {'p99 ms':>8} {'turns/s':>8} {'commands/turn':>14}"
+        )
+        for name, make_saver in savers():
+            for durability in DURABILITIES:
+                sync_client.drop_database(DATABASE)
+                saver = make_saver()
+                graph = builder.compile(checkpointer=saver)
+                # One warm-up turn opens the connections and creates the indexes
+                await graph.ainvoke({"query": "warm-up"}, {"configurable": {"thread_id": "warm-up"}})
+
+                commands = counter.commands
+                start = time.perf_counter()
+                timings = sorted(await run_turns(graph, durability))
+                elapsed = time.perf_counter() - start
+                if isinstance(saver, AsyncMongoDBSaver):
+                    await saver.aclose()
+                click.echo(
+                    f"{name:<16} {durability:<10} {1000 * statistics.median(timings):>8.1f} "
+                    f"{1000 * timings[int(len(timings) * 0.99) - 1]:>8.1f} {turns / elapsed:>8.1f} "
+                    f"{(counter.commands - commands) / turns:>14.1f}"
+                )
+        sync_client.drop_database(DATABASE)
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
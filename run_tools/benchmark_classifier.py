@@ -0,0 +1,108 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from assistant.application.agents.classifier import CascadeClassifier, LocalPrediction, score_sentiment
+from assistant.application.rag.embeddings import get_openai_embedding_model
+from assistant.domain.document import department_for_category, read_all_json_files
+from assistant.config import settings
+
+
+def label_questions(knowledge_base_path: Path) -> dict[str, str]:
+    """Map every knowledge base question onto its department."""
+    labels = {}
+    for data_collection in read_all_json_files(knowledge_base_path):
+        for doc in data_collection:
+            question = doc["doc"].split("\n", 1)[0].removeprefix("Q:").strip()
+            labels[question] = department_for_category(doc["category"])
+    return labels
+
+
+@click.command()
+@click.option(
+    "--data-path",
+    type=click.Path(exists=True, path_type=Path),
+    default=settings.EVALUATION_DATASET_FILE_PATH,
+    help="Evaluation file with 'question' items and an optional 'category' label.",
+)
+@click.option(
+    "--margins",
+    default="0.0,0.02,0.04,0.06,0.08,0.1,0.15",
+    help="Comma separated category margins to sweep.",
+)
+def main(data_path: Path, margins: str) -> None:
+    """
+    Benchmark the local stage of the cascade classifier against labelled questions.
+
+    Questions without a 'category' are labelled by looking them up in the knowledge base. The
+    evaluation set reuses knowledge base questions verbatim, so treat its accuracy as optimistic.
+    """
+    with open(data_path, "r") as f:
+        evaluation_data = json.load(f)
+
+    kb_labels = label_questions(settings.KNOWLEDGE_DATASET_PATH)
+    questions, expected = [], []
+    for item in evaluation_data:
+        label = item.get("category") or kb_labels.get(item["question"].strip())
+        if label:
+            questions.append(item["question"])
+            expected.append(label)
+    click.echo(f"{len(questions)}/{len(evaluation_data)} questions labelled")
+
+    classifier = CascadeClassifier(embedding=get_openai_embedding_model())
+    if classifier.model is None:
+        raise click.ClickException("Run run_tools/ingest_data.py first to build the department model.")
+
+    start = time.perf_counter()
+    query_vectors = classifier.embedding.embed_documents(questions)
+    embed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = [
+        dict(zip(classifier.model.departments, classifier.model.score(vector, classifier.strategy, classifier.knn_k).tolist()))
+        for vector in query_vectors
+    ]
+    sentiments = [score_sentiment(question) for question in questions]
+    local_seconds = time.perf_counter() - start
+
+    click.echo(
+        f"embedding: {1000 * embed_seconds / len(questions):.2f} ms/query (batched), "
+        f"local scoring: {1000 * local_seconds / len(questions):.3f} ms/query"
+    )
+    click.echo(f"strategy={classifier.strategy} min_similarity={classifier.min_similarity}")
+    click.echo(f"{'margin':>8} {'hit_rate':>9} {'accuracy':>9} {'llm_calls':>10}")
+
+    for margin in [float(m) for m in margins.split(",")]:
+        classifier.category_margin = margin
+        classifier.stats.reset()
+        for department_scores, (sentiment, polarity), label in zip(scores, sentiments, expected):
+            prediction = classifier.decide(
+                LocalPrediction(
+                    category=None,
+                    sentiment=sentiment if polarity >= classifier.sentiment_margin else None,
+                    sentiment_polarity=polarity,
+                ),
+                department_scores,
+            )
+            needs_llm = prediction.category is None or prediction.sentiment is None
+            classifier.stats.record(prediction, llm_calls=int(needs_llm))
+            if prediction.category is not None:
+                classifier.stats.record_labelled(prediction.category, label)
+
+        stats = classifier.stats.snapshot()
+        click.echo(
+            f"{margin:>8.3f} {stats['category_hit_rate']:>9.2%} {stats['accuracy']:>9.2%} {stats['llm_calls']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import click
+import numpy as np
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langchain_core.documents import Document
+from langchain_qdrant import RetrievalMode
+
+from assistant.application.rag.embeddings import (
+    embedding_dimensions,
+    get_openai_embedding_model,
+    truncate_embedding,
+)
+from assistant.domain.document import create_documents_from_knowledge_base, read_all_json_files
+from assistant.infrastructure.qdrant.service import QdrantManager
+from assistant.config import settings
+
+
+def question_of(page_content: str) -> str:
+    return page_content.split("\n", 1)[0].removeprefix("Q:").strip()
+
+
+def distractor_vectors(count: int, dimensions: int) -> list[list[float]]:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+
+@click.command()
+@click.option(
+    "--data-path",
+    type=click.Path(exists=True, path_type=Path),
+    default=settings.EVALUATION_DATASET_FILE_PATH,
+    help="Evaluation file with 'question' items.",
+)
+@click.option("--dimensions", "dimension_levels", multiple=True, type=int, default=(256, 512, 1536))
+@click.option("--shortlist-size", default=settings.RAG_SHORTLIST_SIZE, type=int, help="Two-stage shortlist size.")
+@click.option("--distractors", default=0, type=int, help="Random points added to emulate a larger corpus.")
+@click.option("--k", default=3, type=int, help="Results per search.")
+def main(data_path: Path, dimension_levels: tuple[int, ...], shortlist_size: int, distractors: int, k: int) -> None:
+    """
+    Recall-versus-latency report for shortened embeddings and two-stage shortlist/rescore search.
+
+    The knowledge base and the evaluation questions are embedded once at the model's native size;
+    shorter embeddings are derived by Matryoshka truncation, which is what the API returns for a
+    smaller `dimensions`. Each layout gets a scratch collection on the Qdrant server at QDRANT_URL.
+    recall@k counts questions whose knowledge base entry is in the top k; overlap@k compares the
+    top k with the native-size search.
+    """
+    with open(data_path, "r") as f:
+        questions = [item["question"].strip() for item in json.load(f)]
+    documents = create_documents_from_knowledge_base(read_all_json_files(settings.KNOWLEDGE_DATASET_PATH))
+
+    native = embedding_dimensions(dimensions=None)
+    embedding = get_openai_embedding_model(dimensions=None)
+    document_vectors = embedding.embed_documents([doc.page_content for doc in documents])
+    query_vectors = embedding.embed_documents(questions)
+
+    # (label, stored dimensions, shortlist dimensions)
+    layouts = [(str(d), d, None) for d in dimension_levels]
+    layouts += [(f"{d}->{native}", native, d) for d in dimension_levels if d < native]
+
+    baseline: list[set] = []
+    click.echo(f"{'layout':<12} {'recall@' + str(k):>9} {'overlap@' + str(k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, dimensions, shortlist_dimensions in sorted(layouts, key=lambda layout: layout[1] != native):
+        manager = QdrantManager(
+            collection_name=f"benchmark_dimensions_{label.replace('->', '_')}",
+            embedding=embedding,
+            vector_size=dimensions,
+            retrieval_mode=RetrievalMode.DENSE,
+            force_recreate=True,
+            shortlist_dimensions=shortlist_dimensions,
+            shortlist_size=shortlist_size,
+        )
+        ids = [str(uuid.uuid4()) for _ in documents]
+        ids_to_question = {point_id: question_of(doc.page_content) for point_id, doc in zip(ids, documents)}
+        manager.upsert_points(
+            ids,
+            documents,
+            [truncate_embedding(vector, dimensions) for vector in document_vectors],
+        )
+        for start in range(0, distractors, 1000):
+            count = min(1000, distractors - start)
+            manager.upsert_points(
+                [str(uuid.uuid4()) for _ in range(count)],
+                [Document(page_content="", metadata={"source": "distractor"})] * count,
+                distractor_vectors(count, dimensions),
+            )
+        timings, hits, overlap = [], 0, 0
+        for i, (question, vector) in enumerate(zip(questions, query_vectors)):
+            start = time.perf_counter()
+            points = manager.similarity_search_by_vector(truncate_embedding(vector, dimensions), k)
+            timings.append((time.perf_counter() - start) * 1000)
+
+            found = [ids_to_question.get(str(point.id)) for point in points]
+            hits += question in found
+            if len(baseline) <= i:
+                baseline.append(set(found))
+            overlap += len(baseline[i] & set(found))
+        timings.sort()
+
+        click.echo(
+            f"{label:<12} {hits / len(questions):>9.3f} {overlap / (k * len(questions)):>10.3f} "
+            f"{timings[len(timings) // 2]:>8.2f} {timings[int(len(timings) * 0.99) - 1]:>8.2f}"
+        )
+        manager.client.delete_collection(manager.collection_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import click
+import numpy as np
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_qdrant import RetrievalMode
+from qdrant_client.http import models
+
+from assistant.infrastructure.qdrant.service import QdrantManager
+
+DEPARTMENTS = ["hr", "it support", "facilities & admin", "billing & payment", "shipping & delivery"]
+
+LAYOUTS = {
+    "no index": {"payload_indexes": [], "partition_field": None},
+    "keyword index": {"payload_indexes": ["source"], "partition_field": None},
+    "partitioned": {"payload_indexes": ["source"], "partition_field": "source"},
+}
+
+
+def seed(manager: QdrantManager, points: int, dimensions: int, batch_size: int = 1000) -> None:
+    rng = np.random.default_rng(0)
+    for start in range(0, points, batch_size):
+        count = min(batch_size, points - start)
+        vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+        documents = [
+            Document(page_content=f"synthetic {start + i}", metadata={"source": DEPARTMENTS[(start + i) % 5]})
+            for i in range(count)
+        ]
+        manager.upsert_points([str(uuid.uuid4()) for _ in range(count)], documents, vectors.tolist())
+
+
+def wait_until_indexed(manager: QdrantManager, timeout: float = 1800) -> None:
+    """Searches on a collection that is still building its HNSW graph fall back to brute force."""
+    deadline = time.monotonic() + timeout
+    for collection_name in manager._data_collections():
+        while manager.client.get_collection(collection_name).status != models.CollectionStatus.GREEN:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{collection_name} is still optimizing")
+            time.sleep(1)
+
+
+def drop(manager: QdrantManager) -> None:
+    for collection_name in {manager.collection_name, *manager._data_collections()}:
+        manager.client.delete_collection(collection_name)
+
+
+@click.command()
+@click.option("--sizes", multiple=True, type=int, default=(1_000, 100_000, 1_000_000), help="Corpus sizes.")
+@click.option("--dimensions", default=256, type=int, help="Vector dimensions of the synthetic corpus.")
+@click.option("--queries", default=200, type=int, help="Filtered searches per measurement.")
+@click.option("--k", default=3, type=int, help="Documents returned per search.")
+def main(sizes: tuple[int, ...], dimensions: int, queries: int, k: int) -> None:
+    """
+    Compare department-filtered search latency with no payload index, with a keyword index on
+    `metadata.source` and with one collection per department, across corpus sizes.
+
+    Needs a Qdrant server at QDRANT_URL. Every run recreates its scratch collections; the
+    synthetic corpus spreads points evenly over the five departments.
+    """
+    embedding = DeterministicFakeEmbedding(size=dimensions)
+
+    click.echo(f"{'points':>10} {'layout':<15} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for size in sizes:
+        for layout, options in LAYOUTS.items():
+            manager = QdrantManager(
+                collection_name=f"benchmark_filtered_{layout.replace(' ', '_')}",
+                embedding=embedding,
+                vector_size=dimensions,
+                retrieval_mode=RetrievalMode.DENSE,
+                force_recreate=True,
+                **options,
+            )
+            seed(manager, size, dimensions)
+            wait_until_indexed(manager)
+
+            timings = []
+            for i in range(queries):
+                start = time.perf_counter()
+                manager.similarity_search(f"query {i}", k=k, filters={"source": DEPARTMENTS[i % 5]})
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+
+            click.echo(
+                f"{size:>10} {layout:<15} {statistics.mean(timings):>10.2f} "
+                f"{timings[len(timings) // 2]:>10.2f} {timings[int(len(timings) * 0.99) - 1]:>10.2f}"
+            )
+            drop(manager)
+
+
+if __name__ == "__main__":
+    main()
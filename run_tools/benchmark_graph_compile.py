@@ -0,0 +1,63 @@
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langgraph.checkpoint.memory import InMemorySaver
+from opik.integrations.langchain import OpikTracer
+
+from assistant.application.agents.graph import create_workflow_graph
+from assistant.application.agents.registry import CompiledGraphRegistry, graph_variant
+
+
+def per_request_compile(checkpointer) -> None:
+    """What every request used to do before the registry."""
+    graph = create_workflow_graph(*graph_variant()).compile(checkpointer=checkpointer)
+    OpikTracer(graph=graph.get_graph(xray=True))
+
+
+def measure(fn, iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+@click.command()
+@click.option("--iterations", default=200, type=int, help="Requests to simulate per mode.")
+def main(iterations: int) -> None:
+    """
+    Micro-benchmark the per-request graph setup overhead, before and after the compiled-graph registry.
+
+    Only the setup done before `ainvoke`/`astream` is measured; no LLM or database call is made.
+    """
+    checkpointer = InMemorySaver()
+    registry = CompiledGraphRegistry()
+    registry.get(checkpointer=checkpointer, tracing=True)
+
+    modes = {
+        "compile per request": lambda: per_request_compile(checkpointer),
+        "registry lookup": lambda: registry.get(checkpointer=checkpointer, tracing=True).callbacks(),
+    }
+
+    click.echo(f"{'mode':<22} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, fn in modes.items():
+        timings = sorted(measure(fn, iterations))
+        click.echo(
+            f"{name:<22} {statistics.mean(timings):>10.3f} {timings[len(timings) // 2]:>10.3f} "
+            f"{timings[int(len(timings) * 0.99) - 1]:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
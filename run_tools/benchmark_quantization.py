@@ -0,0 +1,123 @@
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import click
+import numpy as np
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_qdrant import RetrievalMode
+from qdrant_client.http import models
+
+from assistant.infrastructure.qdrant.service import QdrantManager
+
+# (quantization, originals on disk, rescore, oversampling)
+CONFIGURATIONS = [
+    ("none", False, False, 1.0),
+    ("scalar", False, False, 1.0),
+    ("scalar", False, True, 2.0),
+    ("scalar", True, True, 2.0),
+    ("binary", False, False, 1.0),
+    ("binary", False, True, 2.0),
+    ("binary", False, True, 4.0),
+    ("binary", True, True, 4.0),
+]
+
+
+def synthetic_corpus(points: int, dimensions: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dimensions), dtype=np.float32)
+    vectors = centroids[rng.integers(0, clusters, points)] + 0.6 * rng.standard_normal(
+        (points, dimensions), dtype=np.float32
+    )
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def estimated_ram_bytes(points: int, dimensions: int, quantization: str, on_disk: bool) -> int:
+    """RAM held by vectors, following Qdrant's sizing guide (x1.5 for the HNSW graph and overhead)."""
+    original = 0 if on_disk else dimensions * 4
+    quantized = {"none": 0, "scalar": dimensions, "binary": dimensions // 8}[quantization]
+    return int(points * (original + quantized) * 1.5)
+
+
+def wait_until_indexed(manager: QdrantManager, timeout: float = 1800) -> None:
+    deadline = time.monotonic() + timeout
+    while manager.client.get_collection(manager.collection_name).status != models.CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{manager.collection_name} is still optimizing")
+        time.sleep(1)
+
+
+@click.command()
+@click.option("--points", default=100_000, type=int, help="Synthetic corpus size.")
+@click.option("--dimensions", default=1536, type=int, help="Vector dimensions.")
+@click.option("--queries", default=200, type=int, help="Searches per configuration.")
+@click.option("--k", default=5, type=int, help="Results per search, recall is measured at k.")
+def main(points: int, dimensions: int, queries: int, k: int) -> None:
+    """
+    Size Qdrant nodes for the knowledge base: for every quantization setup, report the estimated
+    vector RAM, p50/p99 search latency and recall@k against exact (brute force) float32 search.
+
+    Needs a Qdrant server at QDRANT_URL. Collections are recreated for every configuration.
+    """
+    corpus = synthetic_corpus(points, dimensions)
+    query_vectors = synthetic_corpus(queries, dimensions, seed=1)
+    documents = [Document(page_content="", metadata={"source": "benchmark"})] * 1000
+
+    click.echo(
+        f"{'quantization':<13} {'on disk':>7} {'rescore':>7} {'oversample':>10} "
+        f"{'RAM MiB':>9} {'p50 ms':>8} {'p99 ms':>8} {'recall@' + str(k):>9}"
+    )
+    for quantization, on_disk, rescore, oversampling in CONFIGURATIONS:
+        manager = QdrantManager(
+            collection_name="benchmark_quantization",
+            embedding=DeterministicFakeEmbedding(size=dimensions),
+            vector_size=dimensions,
+            retrieval_mode=RetrievalMode.DENSE,
+            force_recreate=True,
+            quantization=quantization,
+            on_disk=on_disk,
+        )
+        for start in range(0, points, 1000):
+            batch = corpus[start : start + 1000]
+            manager.upsert_points(
+                [str(uuid.uuid4()) for _ in range(len(batch))], documents[: len(batch)], batch.tolist()
+            )
+        wait_until_indexed(manager)
+
+        search_params = models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+            if quantization != "none"
+            else None
+        )
+        exact = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+
+        timings, recalled = [], 0
+        for vector in query_vectors.tolist():
+            expected = {point.id for point in manager.similarity_search_by_vector(vector, k, search_params=exact)}
+            start = time.perf_counter()
+            found = manager.similarity_search_by_vector(vector, k, search_params=search_params)
+            timings.append((time.perf_counter() - start) * 1000)
+            recalled += len(expected & {point.id for point in found})
+        timings.sort()
+
+        click.echo(
+            f"{quantization:<13} {str(on_disk):>7} {str(rescore):>7} {oversampling:>10.1f} "
+            f"{estimated_ram_bytes(points, dimensions, quantization, on_disk) / 2**20:>9.1f} "
+            f"{timings[len(timings) // 2]:>8.2f} {timings[int(len(timings) * 0.99) - 1]:>8.2f} "
+            f"{recalled / (k * len(query_vectors)):>9.3f}"
+        )
+        manager.client.delete_collection(manager.collection_name)
+
+
+if __name__ == "__main__":
+    main()
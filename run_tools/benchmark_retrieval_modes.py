@@ -0,0 +1,94 @@
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langchain_qdrant import RetrievalMode
+
+from assistant.application.rag.embeddings import get_openai_embedding_model
+from assistant.application.rag.ingestion import KnowledgeBaseIngestor
+from assistant.application.rag.sparse import BM25SparseEmbeddings
+from assistant.domain.document import create_documents_from_knowledge_base, read_all_json_files
+from assistant.infrastructure.qdrant.service import QdrantManager
+from assistant.config import settings
+
+
+def question_of(page_content: str) -> str:
+    return page_content.split("\n", 1)[0].removeprefix("Q:").strip()
+
+
+@click.command()
+@click.option(
+    "--data-path",
+    type=click.Path(exists=True, path_type=Path),
+    default=settings.EVALUATION_DATASET_FILE_PATH,
+    help="Evaluation file with 'question' items.",
+)
+@click.option("--modes", multiple=True, default=("dense", "sparse", "hybrid"), help="Retrieval modes to compare.")
+@click.option("--ks", multiple=True, type=int, default=(1, 3, 5), help="Cut-offs to report recall at.")
+def main(data_path: Path, modes: tuple[str, ...], ks: tuple[int, ...]) -> None:
+    """
+    Report recall@k and query latency of every retrieval mode on the evaluation set.
+
+    Each mode gets its own embedded Qdrant collection built from the knowledge base. The relevant
+    document of a question is the knowledge base entry asking it, so recall@k is the share of
+    questions whose entry is in the top k. Query latency includes encoding the query; dense and
+    hybrid queries call the embedding API.
+    """
+    with open(data_path, "r") as f:
+        questions = [item["question"].strip() for item in json.load(f)]
+
+    documents = create_documents_from_knowledge_base(read_all_json_files(settings.KNOWLEDGE_DATASET_PATH))
+    sparse_embedding = BM25SparseEmbeddings().fit([doc.page_content for doc in documents])
+
+    click.echo(
+        f"{'mode':<8} "
+        + " ".join(f"{f'recall@{k}':>10}" for k in ks)
+        + f" {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10}"
+    )
+    for mode in modes:
+        retrieval_mode = RetrievalMode(mode)
+        with tempfile.TemporaryDirectory() as path:
+            manager = QdrantManager(
+                collection_name=f"benchmark_{mode}",
+                embedding=get_openai_embedding_model() if retrieval_mode != RetrievalMode.SPARSE else None,
+                sparse_embedding=sparse_embedding if retrieval_mode != RetrievalMode.DENSE else None,
+                path=path,
+                vector_size=1536,
+                retrieval_mode=retrieval_mode,
+            )
+            KnowledgeBaseIngestor(manager).run(documents)
+
+            hits = {k: 0 for k in ks}
+            timings = []
+            for question in questions:
+                start = time.perf_counter()
+                results = manager.similarity_search(question, k=max(ks))
+                timings.append((time.perf_counter() - start) * 1000)
+
+                ranked = [question_of(doc.page_content) for doc in results]
+                for k in ks:
+                    hits[k] += question in ranked[:k]
+            manager.client.close()
+
+        timings.sort()
+        click.echo(
+            f"{mode:<8} "
+            + " ".join(f"{hits[k] / len(questions):>10.3f}" for k in ks)
+            + f" {statistics.mean(timings):>10.2f} {timings[len(timings) // 2]:>10.2f}"
+            f" {timings[int(len(timings) * 0.99) - 1]:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+# The stand-ins replace the knowledge base; keep module import away from Qdrant and the caches,
+# which would otherwise serve every repeated query
+os.environ["VECTOR_BACKEND"] = "mmap"
+os.environ["MMAP_INDEX_PATH"] = tempfile.mkdtemp()
+os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+os.environ["RETRIEVAL_CACHE_ENABLED"] = "false"
+
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from assistant.application.agents import nodes
+from assistant.application.agents.graph import create_workflow_graph
+from assistant.application.agents.speculation import speculative_executor
+
+REPLY = "Thanks for reaching out, here is what our knowledge base says about your request."
+
+
+class StandInLLM(BaseChatModel):
+    """Chat model with fixed latencies: classification calls and streamed replies."""
+
+    category: str = "HR"
+    classify_seconds: float = 0.3
+    first_token_seconds: float = 0.3
+    token_seconds: float = 0.01
+
+    @property
+    def _llm_type(self) -> str:
+        return "stand-in"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("The benchmark runs the async graph nodes only")
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_seconds)
+        for i, word in enumerate(REPLY.split()):
+            if i:
+                await asyncio.sleep(self.token_seconds)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content = "".join([chunk.message.content async for chunk in self._astream(messages)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def with_structured_output(self, schema, **kwargs):
+        async def classify(_: Any):
+            await asyncio.sleep(self.classify_seconds)
+            return schema(
+                **{name: self.category if name == "categorized_topic" else "Neutral" for name in schema.model_fields}
+            )
+
+        return RunnableLambda(classify)
+
+
+class StandInEmbedding:
+    """Query embedding with a fixed latency on first sight of a text, then cached."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self._cache: dict[str, list[float]] = {}
+
+    async def aembed_query(self, text: str) -> list[float]:
+        if text not in self._cache:
+            await asyncio.sleep(self.seconds)
+            self._cache[text] = [0.0]
+        return self._cache[text]
+
+
+class StandInVectorStore:
+    """Knowledge base search with a fixed round-trip latency."""
+
+    def __init__(self, embed_seconds: float, search_seconds: float) -> None:
+        self.embedding = StandInEmbedding(embed_seconds)
+        self.search_seconds = search_seconds
+        self.searches = 0
+
+    async def asimilarity_search(self, query: str, k: int = 4, filters=None, search_params=None) -> list[Document]:
+        await self.embedding.aembed_query(query)
+        self.searches += 1
+        await asyncio.sleep(self.search_seconds)
+        return [Document(page_content=f"Q: {query}\nA: answer {i}", metadata=filters or {}) for i in range(k)]
+
+
+async def time_to_first_token(graph, query: str) -> float:
+    start = time.perf_counter()
+    async for mode, chunk in graph.astream(
+        {"customer_query": [HumanMessage(content=query)]}, stream_mode=["messages", "custom"]
+    ):
+        if mode == "messages" and chunk[1]["langgraph_node"] == "generate_department_response":
+            return (time.perf_counter() - start) * 1000
+    raise RuntimeError("The graph produced no response tokens")
+
+
+@click.command()
+@click.option("--classification-mode", default="sequential", type=click.Choice(["sequential", "fused"]))
+@click.option("--category", default="HR", help="Category the stand-in classifier returns; GENERAL skips retrieval.")
+@click.option("--classify-ms", default=300.0, help="Latency of each classification LLM call.")
+@click.option("--first-token-ms", default=300.0, help="Latency of the first response token.")
+@click.option("--embed-ms", default=80.0, help="Latency of the query embedding.")
+@click.option("--search-ms", default=40.0, help="Latency of a Qdrant search.")
+@click.option("--queries", default=30, type=int, help="Queries per configuration.")
+def main(
+    classification_mode: str,
+    category: str,
+    classify_ms: float,
+    first_token_ms: float,
+    embed_ms: float,
+    search_ms: float,
+    queries: int,
+) -> None:
+    """
+    Measure time-to-first-token of the async graph with and without speculative retrieval.
+
+    The LLM, the embedding model and Qdrant are local stand-ins with fixed latencies, so the
+    difference is the retrieval time hidden behind classification. The search count shows the
+    extra Qdrant load (one search per department instead of one per query).
+    """
+    nodes.llm = StandInLLM(
+        category=category,
+        classify_seconds=classify_ms / 1000,
+        first_token_seconds=first_token_ms / 1000,
+    )
+
+    async def bench() -> None:
+        click.echo(f"{'speculative':<12} {'p50 ms':>8} {'mean ms':>8} {'p99 ms':>8} {'searches/query':>15}")
+        for speculative in (False, True):
+            nodes.vector_store = StandInVectorStore(embed_ms / 1000, search_ms / 1000)
+            graph = create_workflow_graph(classification_mode, True, speculative).compile()
+            timings = sorted([await time_to_first_token(graph, f"question {i}") for i in range(queries)])
+            # Let cancelled speculative searches unwind before counting them
+            await asyncio.sleep(search_ms / 1000)
+            click.echo(
+                f"{str(speculative):<12} {timings[len(timings) // 2]:>8.1f} {statistics.mean(timings):>8.1f} "
+                f"{timings[int(len(timings) * 0.99) - 1]:>8.1f} {nodes.vector_store.searches / queries:>15.1f}"
+            )
+        click.echo(f"speculative executor: {speculative_executor.snapshot()}")
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from assistant.infrastructure.ws_streaming import CoalescingStreamSender, FrameCodec
+
+# (label, encoding, flush characters); None is the previous one-send_json-per-token loop
+CONFIGURATIONS = [
+    ("per-token send_json", None, 0),
+    ("per-token json", "json", 0),
+    ("per-token msgpack", "msgpack", 0),
+    ("coalesced json", "json", 48),
+    ("coalesced msgpack", "msgpack", 48),
+]
+
+
+class StandInWebSocket:
+    """Websocket whose sends cost `send_seconds` of (non-CPU) latency, counting frames and bytes."""
+
+    def __init__(self, send_seconds: float) -> None:
+        self.send_seconds = send_seconds
+        self.frames = 0
+        self.bytes = 0
+
+    async def _send(self, size: int) -> None:
+        self.frames += 1
+        self.bytes += size
+        await asyncio.sleep(self.send_seconds)
+
+    async def send_text(self, data: str) -> None:
+        await self._send(len(data))
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._send(len(data))
+
+    async def send_json(self, data: dict) -> None:
+        # What Starlette does
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+
+async def token_stream(tokens: int, tokens_per_second: float):
+    """LLM-like stream of short tokens, as fast as possible when tokens_per_second is 0."""
+    for i in range(tokens):
+        if tokens_per_second:
+            await asyncio.sleep(1 / tokens_per_second)
+        yield " token" if i % 7 else " word,"
+
+
+async def legacy_send(websocket: StandInWebSocket, chunks) -> str:
+    full_response = ""
+    async for chunk in chunks:
+        full_response += chunk
+        await websocket.send_json({"chunk": chunk})
+    return full_response
+
+
+@click.command()
+@click.option("--answers", default=50, type=int, help="Answers streamed per configuration.")
+@click.option("--tokens", default=400, type=int, help="Tokens per answer.")
+@click.option("--tokens-per-second", default=0.0, type=float, help="LLM speed; 0 streams as fast as possible.")
+@click.option("--send-ms", default=0.0, type=float, help="Latency of a socket send.")
+def main(answers: int, tokens: int, tokens_per_second: float, send_ms: float) -> None:
+    """
+    Compare websocket framing strategies: frames and bytes per answer, frames/s and the CPU time
+    spent per streamed answer (encoding, framing, buffering and the event loop work they cause).
+
+    The token stream and the socket are in-process stand-ins, so the numbers isolate the server's
+    streaming overhead from the LLM and the network.
+    """
+
+    async def bench() -> None:
+        click.echo(
+            f"{'configuration':<22} {'frames/answer':>13} {'bytes/answer':>12} {'frames/s':>10} {'CPU ms/answer':>13}"
+        )
+        for label, encoding, flush_chars in CONFIGURATIONS:
+            websocket = StandInWebSocket(send_ms / 1000)
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            for _ in range(answers):
+                chunks = token_stream(tokens, tokens_per_second)
+                if encoding is None:
+                    await legacy_send(websocket, chunks)
+                else:
+                    sender = CoalescingStreamSender(websocket, FrameCodec(encoding), flush_chars=flush_chars)
+                    await sender.stream(chunks)
+            cpu = time.process_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            click.echo(
+                f"{label:<22} {websocket.frames / answers:>13.1f} {websocket.bytes / answers:>12.0f} "
+                f"{websocket.frames / wall:>10.0f} {1000 * cpu / answers:>13.2f}"
+            )
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from assistant.application.state_retention import compact_conversation_state, get_conversation_state_stats
+
+
+@click.command()
+@click.option("--keep-last", default=None, type=int, help="Checkpoints kept per thread; defaults to CHECKPOINT_KEEP_LAST.")
+@click.option("--top", default=10, type=int, help="Largest threads listed in the statistics.")
+@click.option("--dry-run", is_flag=True, help="Only print the statistics.")
+def main(keep_last: int | None, top: int, dry_run: bool) -> None:
+    """
+    Prune the conversation state to the newest checkpoints of every thread, printing the
+    collection statistics before and after. Meant for a periodic job: turns prune the threads
+    they touch, this catches the others.
+    """
+
+    async def run() -> None:
+        click.echo(json.dumps(await get_conversation_state_stats(top=top), indent=2))
+        if dry_run:
+            return
+        click.echo(json.dumps(await compact_conversation_state(keep_last=keep_last), indent=2))
+        click.echo(json.dumps(await get_conversation_state_stats(top=top), indent=2))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-
 import sys
 from pathlib import Path
 
+import click
+
 # Ensure the repository src/ directory is on the import path when running as a script.
 ROOT = Path(__file__).resolve().parents[1]
 SRC = ROOT / "src"
@@ -9,15 +10,64 @@ if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
 from assistant.infrastructure.qdrant.service import vectorstore
+from assistant.application.agents.classifier import DepartmentEmbeddingModel
+from assistant.application.rag.ingestion import KnowledgeBaseIngestor
 from assistant.domain.document import read_all_json_files, create_documents_from_knowledge_base
 from assistant.config import settings
 
-vector_store = vectorstore()
 
-if __name__ == "__main__":
+@click.command()
+@click.option(
+    "--batch-size", default=settings.INGESTION_BATCH_SIZE, type=int, help="Documents per embed/upsert batch."
+)
+@click.option(
+    "--max-concurrency",
+    default=settings.INGESTION_MAX_CONCURRENCY,
+    type=int,
+    help="Maximum number of batches in flight.",
+)
+@click.option(
+    "--keep-missing", is_flag=True, help="Do not delete stored documents that left the knowledge base."
+)
+@click.option(
+    "--retrieval-mode",
+    type=click.Choice(["dense", "sparse", "hybrid"]),
+    default=settings.RETRIEVAL_MODE,
+    help="Collection layout to ingest into.",
+)
+def main(batch_size: int, max_concurrency: int, keep_missing: bool, retrieval_mode: str) -> None:
+    """
+    Incrementally ingest the knowledge base into Qdrant. Safe to re-run, including after a crash.
+    """
+    vector_store = vectorstore(retrieval_mode)
+
     file_path = settings.KNOWLEDGE_DATASET_PATH
     knowledge_base = read_all_json_files(file_path)
     documents = create_documents_from_knowledge_base(knowledge_base)
-    
-    # Add documents
-    vector_store.add_documents(documents)
+
+    # Build the BM25 vocabulary before encoding any document with it
+    if vector_store.sparse_embedding is not None:
+        vector_store.sparse_embedding.fit([doc.page_content for doc in documents])
+        vector_store.sparse_embedding.save()
+
+    # Embed and upsert only new or changed documents, delete removed ones
+    report = KnowledgeBaseIngestor(
+        vector_store,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        delete_missing=not keep_missing,
+    ).run(documents)
+    click.echo(str(report))
+
+    # Invalidate caches built on top of the previous knowledge base, including after an earlier run
+    # that crashed between writing documents and bumping the generation
+    vector_store.sync_generation(report.fingerprint)
+
+    # Build the per-department embedding model used by the cascade classifier, which sparse-only
+    # retrieval does without
+    if vector_store.embedding is not None:
+        DepartmentEmbeddingModel.build(documents, vector_store.embedding).save(settings.CLASSIFIER_CENTROIDS_PATH)
+
+
+if __name__ == "__main__":
+    main()
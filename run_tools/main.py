@@ -7,7 +7,7 @@ import click
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
-from assistant.application.generate_response import get_streaming_response
+from assistant.application.generate_response import close_checkpointer, get_streaming_response
 
 
 # ---------- FastAPI app (for Streamlit UI) ----------
@@ -22,8 +22,8 @@ app.add_middleware(
 
 
 async def _send_stream(websocket: WebSocket, user_id: str, message: str) -> None:
-    """Stream chunks back to the websocket client."""
-    async for chunk in get_streaming_response(messages=message, user_id=user_id):
+    """Stream chunks back to the websocket client; the server loop finishes the turn in the background."""
+    async for chunk in get_streaming_response(messages=message, user_id=user_id, background=True):
         await websocket.send_json({"chunk": chunk})
     await websocket.send_json({"response": "done"})
 
@@ -72,11 +72,15 @@ def async_command(f):
 @async_command
 async def main(user_id: str, query: str) -> None:
     """CLI command to stream a response from the assistant."""
-    async for chunk in get_streaming_response(
-        messages=query,
-        user_id=user_id,
-    ):
-        print(f"\033[32m{chunk}\033[0m", end="", flush=True)
+    try:
+        async for chunk in get_streaming_response(
+            messages=query,
+            user_id=user_id,
+        ):
+            print(f"\033[32m{chunk}\033[0m", end="", flush=True)
+    finally:
+        # Send the buffered conversation state before asyncio.run() closes the loop
+        await close_checkpointer()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+import sys
+from pathlib import Path
+
+import click
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from langchain_core.documents import Document
+from langchain_qdrant import RetrievalMode
+from qdrant_client import QdrantClient
+
+from assistant.application.rag.embeddings import get_openai_embedding_model, truncate_embedding
+from assistant.infrastructure.qdrant.service import QdrantManager, collection_name_for, search_params_from_settings
+from assistant.config import settings
+
+
+def dense_vector(vector) -> list[float]:
+    """The dense embedding of a point, whether it is stored unnamed or as the 'full' named vector."""
+    if isinstance(vector, dict):
+        return vector.get("full") or vector[""]
+    return vector
+
+
+def dense_vector_size(vectors_config) -> int:
+    """Size of the dense embedding of a collection, whether it is stored unnamed or as the 'full' named vector."""
+    if isinstance(vectors_config, dict):
+        return (vectors_config.get("full") or vectors_config[""]).size
+    return vectors_config.size
+
+
+@click.command()
+@click.option(
+    "--source-collection",
+    default=settings.QDRANT_DATABASE_NAME,
+    help="Existing dense collection to migrate from.",
+)
+@click.option(
+    "--dimensions",
+    type=int,
+    default=settings.RAG_EMBEDDING_DIMENSIONS,
+    help="Target embedding dimensions. Defaults to RAG_EMBEDDING_DIMENSIONS.",
+)
+@click.option(
+    "--shortlist-dimensions",
+    type=int,
+    default=settings.RAG_SHORTLIST_DIMENSIONS,
+    help="Shortlist dimensions of the target two-stage layout. Defaults to RAG_SHORTLIST_DIMENSIONS.",
+)
+@click.option("--batch-size", default=256, type=int, help="Points copied per batch.")
+def main(source_collection: str, dimensions: int | None, shortlist_dimensions: int | None, batch_size: int) -> None:
+    """
+    Migrate an existing knowledge base collection to a shorter embedding and/or two-stage layout
+    without re-embedding the documents.
+
+    text-embedding-3 embeddings are Matryoshka representations: their leading dimensions,
+    re-normalised, are what the API returns for a smaller `dimensions`. The stored vectors are
+    therefore truncated into a new collection named after the target layout, which the app uses
+    once RAG_EMBEDDING_DIMENSIONS / RAG_SHORTLIST_DIMENSIONS are set to the same values. The source
+    collection is left untouched, so rolling back is just reverting the settings. The cascade
+    classifier truncates its department model to the query size by itself.
+
+    Growing the dimensions needs new embeddings; run run_tools/ingest_data.py instead.
+    """
+    target_collection = collection_name_for(RetrievalMode.DENSE, dimensions, shortlist_dimensions)
+    if target_collection == source_collection:
+        raise click.ClickException("The target layout is the source layout; nothing to migrate.")
+
+    # The source is read as stored, whatever its vector layout and the current settings
+    client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+    if not client.collection_exists(source_collection):
+        raise click.ClickException(f"Collection {source_collection} does not exist.")
+    source_collections = [source_collection] + sorted(
+        collection.name
+        for collection in client.get_collections().collections
+        if collection.name.startswith(f"{source_collection}__")
+    )
+    source_size = dense_vector_size(client.get_collection(source_collection).config.params.vectors)
+    target_size = dimensions or source_size
+    if target_size > source_size:
+        raise click.ClickException(
+            f"Cannot grow {source_size}-dimensional vectors to {target_size}; re-ingest with the new settings."
+        )
+
+    target = QdrantManager(
+        collection_name=target_collection,
+        embedding=get_openai_embedding_model(dimensions=dimensions),
+        vector_size=target_size,
+        payload_indexes=settings.QDRANT_PAYLOAD_INDEXES,
+        partition_field=settings.QDRANT_PARTITION_FIELD,
+        quantization=settings.QDRANT_QUANTIZATION,
+        quantization_always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+        on_disk=settings.QDRANT_VECTORS_ON_DISK,
+        search_params=search_params_from_settings(),
+        shortlist_dimensions=shortlist_dimensions,
+    )
+
+    copied = 0
+    # The main collection, or its partitions when the source is partitioned (the main one is then empty)
+    for collection_name in source_collections:
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if points:
+                target.upsert_points(
+                    [str(point.id) for point in points],
+                    [
+                        Document(page_content=point.payload["page_content"], metadata=point.payload["metadata"])
+                        for point in points
+                    ],
+                    [truncate_embedding(dense_vector(point.vector), target_size) for point in points],
+                )
+                copied += len(points)
+            if offset is None:
+                break
+
+    target.bump_generation()
+    click.echo(f"Copied {copied} points from {source_collection} into {target.collection_name}")
+
+    click.echo(
+        f"Set RAG_EMBEDDING_DIMENSIONS={dimensions or ''} and RAG_SHORTLIST_DIMENSIONS={shortlist_dimensions or ''} "
+        "and restart the API to switch over."
+    )
+
+
+if __name__ == "__main__":
+    main()
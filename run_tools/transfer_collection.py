@@ -0,0 +1,81 @@
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+import click
+from bson import json_util
+from pydantic import BaseModel, ConfigDict
+
+# Ensure the repository src/ directory is on the import path when running as a script.
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from assistant.config import settings
+from assistant.infrastructure.mongdb.client import MongoClientWrapper
+
+
+# Canonical extended JSON keeps every BSON type (binary checkpoints, dates read by TTL indexes, int64)
+JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS
+
+
+class StoredDocument(BaseModel):
+    """Any document of a collection; its fields are kept as they are."""
+
+    model_config = ConfigDict(extra="allow")
+
+    id: str | None = None
+
+
+@click.group()
+def main() -> None:
+    """Export a MongoDB collection to extended JSON lines, or import one, with flat memory use."""
+
+
+@main.command("export")
+@click.argument("collection")
+@click.argument("output", type=click.Path(dir_okay=False, path_type=Path))
+@click.option("--query", default="{}", help="MongoDB query filter, as (extended) JSON.")
+@click.option("--batch-size", default=settings.MONGO_BATCH_SIZE, type=int, help="Documents per cursor round trip.")
+def export_collection(collection: str, output: Path, query: str, batch_size: int) -> None:
+    """Stream the documents of COLLECTION matching --query to the OUTPUT file, one extended JSON document per line."""
+    start, count = time.perf_counter(), 0
+    with MongoClientWrapper(StoredDocument, collection) as client, output.open("w") as file:
+        for document in client.iter_documents(json_util.loads(query), batch_size=batch_size, validate=False):
+            file.write(json_util.dumps(document.model_dump(), json_options=JSON_OPTIONS) + "\n")
+            count += 1
+    click.echo(f"Exported {count} documents in {time.perf_counter() - start:.1f}s")
+
+
+@main.command("import")
+@click.argument("collection")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--key", "key_fields", multiple=True, help="Upsert on these fields instead of inserting; repeatable.")
+@click.option("--batch-size", default=settings.MONGO_BATCH_SIZE, type=int, help="Documents per bulk write.")
+def import_collection(collection: str, source: Path, key_fields: tuple[str, ...], batch_size: int) -> None:
+    """Write the JSON lines of SOURCE into COLLECTION in chunks of unordered bulk writes.
+
+    Inserted documents get a new _id; the exported one is kept in their `id` field.
+    """
+
+    def documents() -> Iterator[StoredDocument]:
+        with source.open() as file:
+            for line in file:
+                if line.strip():
+                    yield StoredDocument.model_validate(json_util.loads(line, json_options=JSON_OPTIONS))
+
+    start = time.perf_counter()
+    with MongoClientWrapper(StoredDocument, collection) as client:
+        if key_fields:
+            report = client.upsert_documents(documents(), key_fields, batch_size=batch_size)
+        else:
+            report = client.ingest_documents(documents(), batch_size=batch_size)
+    click.echo(f"Imported {report} in {time.perf_counter() - start:.1f}s")
+    for error in report.errors[:10]:
+        click.echo(f"  document {error['index']}: {error['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from assistant.infrastructure.metrics import (
+    graph_node_duration,
+    llm_call_duration,
+    response_tokens,
+    time_to_first_token,
+    tokens_saved,
+    turn_duration,
+    turns_cancelled,
+    turns_in_flight,
+)
+
+# Nodes whose chat model tokens are streamed to the customer
+RESPONSE_NODES = frozenset({"generate_department_response", "escalate_to_oncall_team"})
+
+
+class GraphMetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records the Prometheus metrics of one conversation turn from LangGraph callbacks: the duration
+    of every node and chat model call, the time to the first response token and the total turn
+    duration, plus the number of turns in flight.
+
+    A turn whose task is cancelled or whose stream is closed early (client disconnect or cancel
+    message) is counted as cancelled, with an estimate of the response tokens this saved: the mean
+    response length of completed turns minus the tokens already generated.
+
+    The handler keeps per-turn state, so a new one is created for every graph run. Responses that
+    stream no tokens (semantic cache hits, non-streaming models) count their first token when the
+    response node finishes.
+
+    Args:
+        mode: "invoke" for /chat turns and "stream" for /ws/chat turns; the `mode` label.
+    """
+
+    # The bookkeeping is cheap; run it on the caller's thread instead of the executor
+    run_inline = True
+
+    def __init__(self, mode: str = "invoke") -> None:
+        self.mode = mode
+        self._turn: Optional[tuple[UUID, float]] = None
+        self._nodes: Dict[UUID, tuple[str, float]] = {}
+        self._llm_calls: Dict[UUID, tuple[str, float]] = {}
+        self._first_token_seen = False
+        self._response_tokens = 0
+        self._streamed_calls: set[UUID] = set()
+
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        tags: Optional[list[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        now = time.perf_counter()
+        if parent_run_id is None:
+            self._turn = (run_id, now)
+            turns_in_flight.inc(mode=self.mode)
+        elif any(tag.startswith("graph:step:") for tag in tags or ()):
+            # Node runs are tagged with their superstep; the runnables inside a node are not
+            self._nodes[run_id] = (kwargs.get("name") or (metadata or {}).get("langgraph_node", ""), now)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_chain(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # A stream closed while suspended (its consumer was cancelled) ends the run with GeneratorExit
+        self._finish_chain(run_id, cancelled=isinstance(error, (asyncio.CancelledError, GeneratorExit)))
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._llm_calls[run_id] = ((metadata or {}).get("langgraph_node", ""), time.perf_counter())
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        call = self._llm_calls.get(run_id)
+        if token and call is not None and call[0] in RESPONSE_NODES:
+            self._record_first_token(time.perf_counter())
+            self._response_tokens += 1
+            self._streamed_calls.add(run_id)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        call = self._llm_calls.get(run_id)
+        if call is not None and call[0] in RESPONSE_NODES and run_id not in self._streamed_calls:
+            # Not streamed (/chat turns): take the token count reported by the model
+            message = getattr(response.generations[0][0], "message", None) if response.generations else None
+            self._response_tokens += (getattr(message, "usage_metadata", None) or {}).get("output_tokens", 0)
+        self._finish_llm_call(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_llm_call(run_id)
+
+    def _finish_chain(self, run_id: UUID, cancelled: bool = False) -> None:
+        now = time.perf_counter()
+        node = self._nodes.pop(run_id, None)
+        if node is not None:
+            graph_node_duration.observe(now - node[1], node=node[0])
+            if node[0] in RESPONSE_NODES and not cancelled:
+                self._record_first_token(now)
+        elif self._turn is not None and self._turn[0] == run_id:
+            turn_duration.observe(now - self._turn[1], mode=self.mode)
+            turns_in_flight.dec(mode=self.mode)
+            self._turn = None
+            if cancelled:
+                turns_cancelled.inc(mode=self.mode)
+                tokens_saved.inc(max((response_tokens.mean() or 0) - self._response_tokens, 0), mode=self.mode)
+            elif self._response_tokens:
+                response_tokens.observe(self._response_tokens, mode=self.mode)
+
+    def _finish_llm_call(self, run_id: UUID) -> None:
+        call = self._llm_calls.pop(run_id, None)
+        if call is not None:
+            llm_call_duration.observe(time.perf_counter() - call[1], node=call[0])
+
+    def _record_first_token(self, now: float) -> None:
+        if not self._first_token_seen and self._turn is not None:
+            self._first_token_seen = True
+            time_to_first_token.observe(now - self._turn[1], mode=self.mode)
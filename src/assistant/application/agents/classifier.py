@@ -0,0 +1,327 @@
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from assistant.config import settings
+
+_POSITIVE_WORDS = {
+    "amazing", "appreciate", "appreciated", "awesome", "brilliant", "delighted", "excellent",
+    "fantastic", "glad", "good", "grateful", "great", "happy", "helpful", "love", "loved",
+    "perfect", "pleased", "satisfied", "thank", "thanks", "wonderful",
+}
+_NEGATIVE_WORDS = {
+    "angry", "annoyed", "awful", "bad", "broken", "complaint", "disappointed", "disappointing",
+    "disgusted", "frustrated", "frustrating", "furious", "hate", "horrible", "poor", "ridiculous",
+    "rude", "terrible", "unacceptable", "unhappy", "upset", "useless", "worst",
+}
+_NEGATIONS = {"not", "no", "never", "isn't", "wasn't", "don't", "didn't", "doesn't", "hardly"}
+_TOKEN_PATTERN = re.compile(r"[a-z']+")
+
+
+def score_sentiment(text: str) -> tuple[str, float]:
+    """Cheap lexicon sentiment scorer.
+
+    Counts positive and negative cue words (a preceding negation flips the cue) and returns
+    the sentiment label with its polarity in [0, 1]. Queries without any cue are Neutral with
+    polarity 1.0, mixed queries get a polarity close to 0.
+
+    Args:
+        text: The customer query.
+
+    Returns:
+        tuple[str, float]: 'Positive', 'Neutral' or 'Negative' and the polarity of the decision.
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    positive = negative = 0
+    for i, token in enumerate(tokens):
+        negated = i > 0 and tokens[i - 1] in _NEGATIONS
+        if token in _POSITIVE_WORDS:
+            negative, positive = (negative + 1, positive) if negated else (negative, positive + 1)
+        elif token in _NEGATIVE_WORDS:
+            positive, negative = (positive + 1, negative) if negated else (positive, negative + 1)
+
+    if positive == negative == 0:
+        return "Neutral", 1.0
+
+    polarity = abs(positive - negative) / (positive + negative)
+    if positive > negative:
+        return "Positive", polarity
+    if negative > positive:
+        return "Negative", polarity
+    return "Neutral", polarity
+
+
+class DepartmentEmbeddingModel:
+    """Per-department embedding model built from the knowledge base.
+
+    Stores the L2-normalised embedding of every knowledge base document together with its
+    department, and the normalised department centroids derived from them.
+
+    Args:
+        departments: Department names, indexed by `labels`.
+        vectors: Document embeddings with shape (n_documents, dimensions).
+        labels: Department index of each document.
+    """
+
+    def __init__(self, departments: list[str], vectors: np.ndarray, labels: np.ndarray) -> None:
+        self.departments = list(departments)
+        self.vectors = _normalise(np.asarray(vectors, dtype=np.float32))
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.centroids = _normalise(
+            np.stack([self.vectors[self.labels == i].mean(axis=0) for i in range(len(self.departments))])
+        )
+
+    @classmethod
+    def build(cls, documents: list[Document], embedding: Embeddings) -> "DepartmentEmbeddingModel":
+        """Embed the knowledge base documents and group them by their `source` department."""
+        departments = sorted({doc.metadata["source"].upper() for doc in documents})
+        labels = [departments.index(doc.metadata["source"].upper()) for doc in documents]
+        vectors = embedding.embed_documents([doc.page_content for doc in documents])
+
+        return cls(departments, np.asarray(vectors, dtype=np.float32), np.asarray(labels))
+
+    @classmethod
+    def load(cls, path: Path) -> "DepartmentEmbeddingModel":
+        with np.load(path) as data:
+            return cls(data["departments"].tolist(), data["vectors"], data["labels"])
+
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path, departments=np.array(self.departments), vectors=self.vectors, labels=self.labels
+        )
+        logger.info(f"Saved department embedding model ({len(self.labels)} documents) to {path}")
+
+    def score(self, query_vector: list[float], strategy: str = "centroid", k: int = 5) -> np.ndarray:
+        """Cosine score of the query against every department."""
+        query = _normalise(np.asarray(query_vector, dtype=np.float32)[None, :])[0]
+        if strategy == "centroid":
+            return self.centroids @ query
+
+        similarities = self.vectors @ query
+        scores = np.empty(len(self.departments), dtype=np.float32)
+        for i in range(len(self.departments)):
+            department_similarities = similarities[self.labels == i]
+            top = min(k, department_similarities.size)
+            scores[i] = np.partition(department_similarities, -top)[-top:].mean()
+        return scores
+
+
+@dataclass
+class LocalPrediction:
+    """Outcome of the in-process classification step.
+
+    `category` and `sentiment` are None when the local model is not confident enough and the
+    LLM has to decide. `best_category` is the top scoring department regardless of confidence.
+    """
+
+    category: str | None
+    sentiment: str | None
+    best_category: str | None = None
+    category_score: float = 0.0
+    category_margin: float = 0.0
+    sentiment_polarity: float = 0.0
+
+
+class CascadeStats:
+    """Thread-safe hit-rate and accuracy counters of the cascade classifier."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.queries = 0
+            self.local_hits = 0
+            self.local_category_hits = 0
+            self.local_sentiment_hits = 0
+            self.llm_calls = 0
+            self.fallback_comparisons = 0
+            self.fallback_agreements = 0
+            self.labelled = 0
+            self.labelled_correct = 0
+
+    def record(self, prediction: LocalPrediction, llm_category: str | None = None, llm_calls: int = 0) -> None:
+        """Record one classified query.
+
+        Args:
+            prediction: The local prediction for the query.
+            llm_category: Category returned by the LLM fallback, if it was asked for one.
+            llm_calls: Number of LLM round trips the fallback needed.
+        """
+        with self._lock:
+            self.queries += 1
+            self.llm_calls += llm_calls
+            self.local_hits += int(llm_calls == 0)
+            self.local_category_hits += int(prediction.category is not None)
+            self.local_sentiment_hits += int(prediction.sentiment is not None)
+            if llm_category is not None and prediction.best_category is not None:
+                self.fallback_comparisons += 1
+                self.fallback_agreements += int(llm_category == prediction.best_category)
+
+    def record_labelled(self, predicted_category: str, expected_category: str) -> None:
+        """Record the accuracy of a classification against a known label."""
+        with self._lock:
+            self.labelled += 1
+            self.labelled_correct += int(predicted_category == expected_category)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "local_hits": self.local_hits,
+                "llm_calls": self.llm_calls,
+                "hit_rate": _ratio(self.local_hits, self.queries),
+                "category_hit_rate": _ratio(self.local_category_hits, self.queries),
+                "sentiment_hit_rate": _ratio(self.local_sentiment_hits, self.queries),
+                "fallback_agreement": _ratio(self.fallback_agreements, self.fallback_comparisons),
+                "labelled": self.labelled,
+                "accuracy": _ratio(self.labelled_correct, self.labelled),
+            }
+
+
+class CascadeClassifier:
+    """Local-first query classifier that only defers to the LLM on ambiguous queries.
+
+    The department is predicted from the similarity of the query embedding to the knowledge base
+    departments, the sentiment from a lexicon. Each part is only trusted when it clears its
+    configured threshold.
+
+    Args:
+        embedding: Embedding model used to embed the query. Must match the one used at ingest time.
+            None (sparse-only retrieval) leaves the department to the LLM.
+        dimensions: Size of the query embeddings; a model built with another size is not used.
+        model_path: Location of the department embedding model written by ingestion.
+        strategy: 'centroid' or 'knn' department scoring.
+        knn_k: Neighbours per department for the 'knn' strategy.
+        category_margin: Minimum best-vs-second department score gap.
+        min_similarity: Minimum best department score.
+        sentiment_margin: Minimum lexicon polarity.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings | None,
+        dimensions: int | None = None,
+        model_path: Path = settings.CLASSIFIER_CENTROIDS_PATH,
+        strategy: str = settings.CLASSIFIER_STRATEGY,
+        knn_k: int = settings.CLASSIFIER_KNN_K,
+        category_margin: float = settings.CLASSIFIER_CATEGORY_MARGIN,
+        min_similarity: float = settings.CLASSIFIER_MIN_SIMILARITY,
+        sentiment_margin: float = settings.CLASSIFIER_SENTIMENT_MARGIN,
+    ) -> None:
+        self.embedding = embedding
+        self.dimensions = dimensions
+        self.model_path = Path(model_path)
+        self.strategy = strategy
+        self.knn_k = knn_k
+        self.category_margin = category_margin
+        self.min_similarity = min_similarity
+        self.sentiment_margin = sentiment_margin
+        self.stats = CascadeStats()
+
+        self._model: DepartmentEmbeddingModel | None = None
+        self._model_checked = False
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> DepartmentEmbeddingModel | None:
+        """The department embedding model, loaded on first use. None if ingestion has not built it."""
+        if not self._model_checked:
+            with self._lock:
+                if not self._model_checked:
+                    if self.embedding is None:
+                        logger.info("No dense embedding model; categories will be resolved by the LLM.")
+                    elif self.model_path.exists():
+                        model = DepartmentEmbeddingModel.load(self.model_path)
+                        if self.dimensions is None or model.dimensions == self.dimensions:
+                            self._model = model
+                        else:
+                            self._dimension_mismatch(model.dimensions, self.dimensions)
+                    else:
+                        logger.warning(
+                            f"Department embedding model not found at {self.model_path}. "
+                            "Run the ingestion to build it; categories will be resolved by the LLM."
+                        )
+                    self._model_checked = True
+        return self._model
+
+    def score_departments(self, query: str) -> dict[str, float]:
+        """Return the department scores of a query, or an empty dict without a model."""
+        if self.model is None:
+            return {}
+        return self._score(self.embedding.embed_query(query))
+
+    async def ascore_departments(self, query: str) -> dict[str, float]:
+        if self.model is None:
+            return {}
+        return self._score(await self.embedding.aembed_query(query))
+
+    def _score(self, query_vector: list[float]) -> dict[str, float]:
+        model = self.model
+        if model is None:
+            return {}
+        if model.dimensions != len(query_vector):
+            # Without a configured size the first query tells; the model is then dropped for good
+            self._dimension_mismatch(model.dimensions, len(query_vector))
+            self._model = None
+            return {}
+        scores = model.score(query_vector, self.strategy, self.knn_k)
+        return dict(zip(model.departments, scores.tolist()))
+
+    def _dimension_mismatch(self, model_dimensions: int, query_dimensions: int) -> None:
+        logger.warning(
+            f"Department embedding model at {self.model_path} has {model_dimensions} dimensions but queries "
+            f"embed to {query_dimensions}. Re-run the ingestion to rebuild it; categories will be resolved by the LLM."
+        )
+
+    def predict(self, query: str) -> LocalPrediction:
+        return self.decide(self._predict_sentiment(query), self.score_departments(query))
+
+    async def apredict(self, query: str) -> LocalPrediction:
+        return self.decide(self._predict_sentiment(query), await self.ascore_departments(query))
+
+    def _predict_sentiment(self, query: str) -> LocalPrediction:
+        sentiment, polarity = score_sentiment(query)
+        return LocalPrediction(
+            category=None,
+            sentiment=sentiment if polarity >= self.sentiment_margin else None,
+            sentiment_polarity=polarity,
+        )
+
+    def decide(self, prediction: LocalPrediction, scores: dict[str, float]) -> LocalPrediction:
+        """Fill the category of a prediction from department scores using the configured thresholds."""
+        if not scores:
+            return prediction
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_category, best_score = ranked[0]
+        margin = best_score - ranked[1][1] if len(ranked) > 1 else best_score
+
+        prediction.best_category = best_category
+        prediction.category_score = best_score
+        prediction.category_margin = margin
+        if best_score >= self.min_similarity and margin >= self.category_margin:
+            prediction.category = best_category
+
+        return prediction
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _ratio(numerator: int, denominator: int) -> float:
+    return numerator / denominator if denominator else 0.0
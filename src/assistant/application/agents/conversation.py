@@ -0,0 +1,53 @@
+import math
+from typing import Sequence
+
+from langchain_core.messages import AnyMessage, HumanMessage
+
+from assistant.application.agents.state import CustomerSupportAgentState
+from assistant.config import settings
+
+NO_CONVERSATION = "No previous conversation."
+
+# Rough size of a token in English text; the summary savings are estimates, not billed tokens
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated number of LLM tokens of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def format_messages(messages: Sequence[AnyMessage]) -> str:
+    """Render messages as 'Customer:' and 'Assistant:' lines."""
+    return "\n".join(
+        f"{'Customer' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}"
+        for message in messages
+    )
+
+
+def render_conversation(support_state: CustomerSupportAgentState) -> str:
+    """
+    The conversation so far as prompt context: the running summary of the older turns followed by
+    the messages kept verbatim.
+    """
+    parts = []
+    if support_state.get("summary"):
+        parts.append(f"Summary of the earlier conversation: {support_state['summary']}")
+    if support_state.get("messages"):
+        parts.append(format_messages(support_state["messages"]))
+    return "\n".join(parts) or NO_CONVERSATION
+
+
+def messages_to_summarize(
+    support_state: CustomerSupportAgentState,
+    trigger: int = settings.TOTAL_MESSAGES_SUMMARY_TRIGGER,
+    keep: int = settings.TOTAL_MESSAGES_AFTER_SUMMARY,
+) -> list[AnyMessage]:
+    """
+    The messages to fold into the running summary: all but the `keep` most recent ones once the
+    thread holds more than `trigger` messages, otherwise none. A trigger of 0 disables summarization.
+    """
+    messages = support_state.get("messages") or []
+    if not trigger or len(messages) <= trigger:
+        return []
+    return messages[: len(messages) - keep] if keep > 0 else list(messages)
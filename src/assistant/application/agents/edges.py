@@ -1,3 +1,6 @@
+from langgraph.graph import END
+
+from assistant.application.agents.conversation import messages_to_summarize
 from assistant.application.agents.state import CustomerSupportAgentState
 
 # Define the router function that directs the flow based on sentiment and category
@@ -13,4 +16,12 @@ def determine_route(support_state: CustomerSupportAgentState) -> str:
 
     # Always route to generate_department_response - it handles both RAG and conversational responses
     # based on the category (GENERAL vs specific departments)
-    return "generate_department_response"
\ No newline at end of file
+    return "generate_department_response"
+
+def should_summarize(support_state: CustomerSupportAgentState) -> str:
+
+    # After the reply, fold the older turns into the running summary once the thread has grown past
+    # TOTAL_MESSAGES_SUMMARY_TRIGGER messages; otherwise the turn is over
+    if messages_to_summarize(support_state):
+        return "summarize_conversation"
+    return END
@@ -1,27 +1,88 @@
 from functools import lru_cache
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from assistant.application.agents.state import CustomerSupportAgentState
 from assistant.application.agents.nodes import (
+    aanalyze_inquiry_sentiment,
+    acascade_classify_inquiry,
+    acategorize_inquiry,
+    aclassify_inquiry,
+    agenerate_department_response,
+    astart_speculative_retrieval,
+    asummarize_conversation,
+    cascade_classify_inquiry,
     categorize_inquiry,
+    classify_inquiry,
     generate_department_response,
     analyze_inquiry_sentiment,
     accept_user_input_oncall,
-    escalate_to_oncall_team
+    escalate_to_oncall_team,
+    summarize_conversation,
 )
-from assistant.application.agents.edges import determine_route
+from assistant.application.agents.edges import determine_route, should_summarize
+from assistant.config import settings
 
 
-@lru_cache(maxsize=1)
-def create_workflow_graph():
+@lru_cache(maxsize=None)
+def create_workflow_graph(
+    classification_mode: str | None = None,
+    async_nodes: bool | None = None,
+    speculative_retrieval: bool | None = None,
+):
+    """Build the customer support state graph.
+
+    Args:
+        classification_mode: 'sequential' runs categorize_inquiry then analyze_inquiry_sentiment,
+            'fused' runs the single classify_inquiry node and 'cascade' runs cascade_classify_inquiry,
+            which only calls the LLM for ambiguous queries. Defaults to settings.CLASSIFICATION_MODE.
+        async_nodes: Use the native async classification and response nodes, which run on the event
+            loop instead of LangGraph's thread executor. The on-call nodes stay sync: one blocks on
+            input() and the other does no I/O. Defaults to settings.GRAPH_ASYNC_NODES.
+        speculative_retrieval: Add a start_speculative_retrieval branch that retrieves for every
+            department concurrently with classification; the response node keeps the chosen one.
+            Requires async nodes. Defaults to settings.SPECULATIVE_RETRIEVAL.
+
+    Both response nodes append the turn to the conversation transcript and are followed by
+    summarize_conversation when the transcript has grown past settings.TOTAL_MESSAGES_SUMMARY_TRIGGER
+    messages. That step runs after the reply has been produced; callers return the reply without
+    waiting for it.
+    """
+    classification_mode = classification_mode or settings.CLASSIFICATION_MODE
+    async_nodes = settings.GRAPH_ASYNC_NODES if async_nodes is None else async_nodes
+    speculative_retrieval = (
+        settings.SPECULATIVE_RETRIEVAL if speculative_retrieval is None else speculative_retrieval
+    )
+    if speculative_retrieval and not async_nodes:
+        raise ValueError("Speculative retrieval requires the async graph nodes")
+
     # Create a typed LangGraph state graph using the custom CustomerSupportAgentState
     customer_support_graph = StateGraph(CustomerSupportAgentState)
 
     # Register each functional node in the graph that represents a step in the agent workflow
 
-    # Step 1: Categorize the incoming query by department (e.g., billing, records, etc.)
-    customer_support_graph.add_node("categorize_inquiry", categorize_inquiry)
-    # Step 2: Analyze the user's sentiment (positive, neutral, negative, distress)
-    customer_support_graph.add_node("analyze_inquiry_sentiment", analyze_inquiry_sentiment)
+    if classification_mode == "fused":
+        # Steps 1+2: Categorize the query and analyze its sentiment in a single LLM call
+        customer_support_graph.add_node("classify_inquiry", aclassify_inquiry if async_nodes else classify_inquiry)
+        entry_node = last_classification_node = "classify_inquiry"
+    elif classification_mode == "cascade":
+        # Steps 1+2: Classify locally from the knowledge base embeddings, falling back to the LLM when unsure
+        customer_support_graph.add_node(
+            "cascade_classify_inquiry", acascade_classify_inquiry if async_nodes else cascade_classify_inquiry
+        )
+        entry_node = last_classification_node = "cascade_classify_inquiry"
+    elif classification_mode == "sequential":
+        # Step 1: Categorize the incoming query by department (e.g., billing, records, etc.)
+        customer_support_graph.add_node(
+            "categorize_inquiry", acategorize_inquiry if async_nodes else categorize_inquiry
+        )
+        # Step 2: Analyze the user's sentiment (positive, neutral, negative, distress)
+        customer_support_graph.add_node(
+            "analyze_inquiry_sentiment", aanalyze_inquiry_sentiment if async_nodes else analyze_inquiry_sentiment
+        )
+        # After categorizing the query, move to sentiment analysis
+        customer_support_graph.add_edge("categorize_inquiry", "analyze_inquiry_sentiment")
+        entry_node, last_classification_node = "categorize_inquiry", "analyze_inquiry_sentiment"
+    else:
+        raise ValueError(f"Unknown classification mode: {classification_mode}")
 
     # Step 4a: Accept user input for escalation to emergency on-call team (for distress sentiment)
     customer_support_graph.add_node("accept_user_input_oncall", accept_user_input_oncall)
@@ -29,14 +90,20 @@ def create_workflow_graph():
     customer_support_graph.add_node("escalate_to_oncall_team", escalate_to_oncall_team)
 
     # Step 5: Generate a department-specific response using RAG if sentiment is positive or neutral
-    customer_support_graph.add_node("generate_department_response", generate_department_response)
+    customer_support_graph.add_node(
+        "generate_department_response",
+        agenerate_department_response if async_nodes else generate_department_response,
+    )
+
+    # Step 6: Fold the older turns of a long conversation into the running summary
+    customer_support_graph.add_node(
+        "summarize_conversation", asummarize_conversation if async_nodes else summarize_conversation
+    )
 
     # Define the flow of transitions between the nodes in the graph
-    # After categorizing the query, move to sentiment analysis
-    customer_support_graph.add_edge("categorize_inquiry", "analyze_inquiry_sentiment")
-    # After sentiment analysis, use conditional routing to determine next steps
+    # After classification, use conditional routing to determine next steps
     customer_support_graph.add_conditional_edges(
-        "analyze_inquiry_sentiment",
+        last_classification_node,
         determine_route,
         [
             "accept_user_input_oncall",
@@ -46,14 +113,26 @@ def create_workflow_graph():
 
     # If the user input is collected for on-call emergency, route to on-call team
     customer_support_graph.add_edge("accept_user_input_oncall", "escalate_to_oncall_team")
-    customer_support_graph.add_edge("escalate_to_oncall_team", END)
+    customer_support_graph.add_conditional_edges(
+        "escalate_to_oncall_team", should_summarize, ["summarize_conversation", END]
+    )
 
-    # If sentiment is neutral or positive, generate a department response and finish
-    customer_support_graph.add_edge("generate_department_response", END)
+    # If sentiment is neutral or positive, generate a department response and finish,
+    # summarizing the conversation first when it has grown too long
+    customer_support_graph.add_conditional_edges(
+        "generate_department_response", should_summarize, ["summarize_conversation", END]
+    )
+    customer_support_graph.add_edge("summarize_conversation", END)
 
     # Set the starting point of the workflow
-    customer_support_graph.set_entry_point("categorize_inquiry")
+    customer_support_graph.set_entry_point(entry_node)
+
+    # Step 0 (optional): start retrieving for every department alongside classification. The branch
+    # only schedules the searches and ends; generate_department_response collects the result.
+    if speculative_retrieval:
+        customer_support_graph.add_node("start_speculative_retrieval", astart_speculative_retrieval)
+        customer_support_graph.add_edge(START, "start_speculative_retrieval")
     return customer_support_graph
 
   # Compile the graph
-# compiled_support_agent = create_workflow_graph().compile()
\ No newline at end of file
+# compiled_support_agent = create_workflow_graph().compile()
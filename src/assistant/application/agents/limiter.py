@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from loguru import logger
+
+from assistant.config import settings
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when an LLM call is rejected because the limiter queue is full."""
+
+
+class _Waiter:
+    """A queued acquisition, woken either through an asyncio future or a threading event."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class LLMConcurrencyLimiter:
+    """Process-wide FIFO limit on the number of concurrent LLM calls.
+
+    Async nodes use `async with limiter:` and wait on the event loop; sync nodes use `with limiter:`
+    from LangGraph's worker threads. Both draw from the same slots, so the bound holds whatever mix
+    of nodes is running. Calls beyond `max_in_flight` wait in a queue of at most `max_queued`
+    entries; further calls fail fast with LLMOverloadedError instead of piling up.
+
+    Args:
+        max_in_flight: Maximum number of LLM calls running at once.
+        max_queued: Maximum number of calls waiting for a slot.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._waiters: deque[_Waiter] = deque()
+        self._in_flight = 0
+
+        self.acquired = 0
+        self.queued = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_in_flight = 0
+
+    async def __aenter__(self) -> "LLMConcurrencyLimiter":
+        start = time.perf_counter()
+        waiter = self._try_acquire(asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+        self._record_wait(time.perf_counter() - start)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    def __enter__(self) -> "LLMConcurrencyLimiter":
+        start = time.perf_counter()
+        waiter = self._try_acquire(None)
+        if waiter is not None:
+            waiter.event.wait()
+        self._record_wait(time.perf_counter() - start)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the oldest waiter if there is one."""
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().grant()
+            else:
+                self._in_flight -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "peak_in_flight": self.peak_in_flight,
+                "acquired": self.acquired,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.total_wait_seconds / self.acquired * 1000 if self.acquired else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
+
+    def _try_acquire(self, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Waiter]:
+        """Take a free slot and return None, or enqueue and return the waiter to block on."""
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+                return None
+            if len(self._waiters) >= self.max_queued:
+                self.rejected += 1
+                raise LLMOverloadedError(
+                    f"{self._in_flight} LLM calls in flight and {len(self._waiters)} queued; rejecting the call"
+                )
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            self.queued += 1
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Drop a cancelled waiter, giving its slot back if it was granted in the meantime."""
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def _record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        if seconds > 1:
+            logger.debug(f"LLM call waited {seconds:.2f}s for a concurrency slot")
+
+
+llm_limiter = LLMConcurrencyLimiter(
+    max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+    max_queued=settings.LLM_MAX_QUEUED,
+)
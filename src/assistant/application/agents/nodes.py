@@ -1,26 +1,68 @@
+import asyncio
 import os
-from typing import Dict
+import time
+from typing import Dict, List
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
+from langgraph.config import get_stream_writer
+from assistant.infrastructure.metrics import (
+    conversation_context_tokens,
+    conversation_summaries,
+    retrieval_duration,
+    summary_llm_tokens,
+    summary_tokens_saved,
+)
 from assistant.infrastructure.qdrant.service import vectorstore
-from langchain_core.messages import AIMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
-from assistant.application.agents.state import CustomerSupportAgentState, QueryCategory, QuerySentiment
+from assistant.application.agents.classifier import CascadeClassifier
+from assistant.application.agents.conversation import (
+    NO_CONVERSATION,
+    estimate_tokens,
+    format_messages,
+    messages_to_summarize,
+    render_conversation,
+)
+from assistant.application.agents.limiter import llm_limiter
+from assistant.application.agents.speculation import speculative_executor
+from assistant.application.rag.retrieval_cache import with_retrieval_cache
+from assistant.application.rag.semantic_cache import CacheLookup, build_semantic_cache
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, RemoveMessage
+from langchain_core.runnables import Runnable
+from assistant.application.agents.state import (
+    CustomerSupportAgentState,
+    QueryCategory,
+    QueryClassification,
+    QuerySentiment,
+)
 from assistant.domain.prompts import (
+    CLASSIFY_INQUIRY_PROMPT,
+    GENERAL_RESPONSE_PROMPT,
     SENTIMENT_CATEGORY_PROMPT,
     RESPONSE_PROMPT,
     ROUTE_CATEGORY_PROMPT,
+    SUMMARY_PROMPT,
 )
 
 load_dotenv()
 
-vector_store = vectorstore()
+vector_store = with_retrieval_cache(vectorstore())
+
+response_cache = build_semantic_cache(vector_store)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0, stream_usage=True)
 
+# Sparse-only retrieval has no dense model: the department is then classified by the LLM
+cascade_classifier = CascadeClassifier(embedding=vector_store.embedding, dimensions=vector_store.vector_size)
+
+DEPARTMENTS = ['HR', 'IT_SUPPORT', 'FACILITY_AND_ADMIN', 'BILLING_AND_PAYMENT', 'SHIPPING_AND_DELIVERY']
+
+# Knowledge base entries retrieved for a department response
+RESPONSE_TOP_K = 3
+
+
 def categorize_inquiry(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
     """
     Classify the customer query into 'Billing', 'Appointments', 'Records' or 'Insurance'.
@@ -31,77 +73,344 @@ def categorize_inquiry(support_state: CustomerSupportAgentState) -> CustomerSupp
     route_category_prompt = ROUTE_CATEGORY_PROMPT.prompt
 
     prompt = route_category_prompt.format(customer_query=query)
-    route_category = llm.with_structured_output(QueryCategory).invoke(prompt)
+    with llm_limiter:
+        route_category = llm.with_structured_output(QueryCategory).invoke(prompt)
+
+    return {
+        "query_category": route_category.categorized_topic
+    }
+
+
+async def acategorize_inquiry(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Async variant of categorize_inquiry.
+    """
+
+    prompt = ROUTE_CATEGORY_PROMPT.prompt.format(customer_query=support_state["customer_query"])
+    async with llm_limiter:
+        route_category = await llm.with_structured_output(QueryCategory).ainvoke(prompt)
 
     return {
         "query_category": route_category.categorized_topic
     }
 
 
+def classify_inquiry(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Classify the customer query by department and sentiment with a single structured LLM call.
+    Replaces the categorize_inquiry -> analyze_inquiry_sentiment round trips in the fused graph mode.
+    """
+
+    query = support_state["customer_query"]
+
+    classify_inquiry_prompt = CLASSIFY_INQUIRY_PROMPT.prompt
+
+    prompt = classify_inquiry_prompt.format(customer_query=query)
+    with llm_limiter:
+        classification = llm.with_structured_output(QueryClassification).invoke(prompt)
+
+    return {
+        "query_category": classification.categorized_topic,
+        "query_sentiment": classification.sentiment,
+    }
+
+
+async def aclassify_inquiry(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Async variant of classify_inquiry.
+    """
+
+    prompt = CLASSIFY_INQUIRY_PROMPT.prompt.format(customer_query=support_state["customer_query"])
+    async with llm_limiter:
+        classification = await llm.with_structured_output(QueryClassification).ainvoke(prompt)
+
+    return {
+        "query_category": classification.categorized_topic,
+        "query_sentiment": classification.sentiment,
+    }
+
+
+def cascade_classify_inquiry(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Classify the customer query in-process when the local model is confident and only ask the LLM
+    for the parts it is unsure about (one fused call if both category and sentiment are ambiguous).
+    """
+
+    query = support_state["customer_query"]
+    prediction = cascade_classifier.predict(query[0].content)
+
+    category, sentiment = prediction.category, prediction.sentiment
+    llm_category, llm_calls = None, 0
+
+    if category is None and sentiment is None:
+        classification = classify_inquiry(support_state)
+        category = llm_category = classification["query_category"]
+        sentiment = classification["query_sentiment"]
+        llm_calls = 1
+    elif category is None:
+        category = llm_category = categorize_inquiry(support_state)["query_category"]
+        llm_calls = 1
+    elif sentiment is None:
+        sentiment = analyze_inquiry_sentiment(support_state)["query_sentiment"]
+        llm_calls = 1
+
+    cascade_classifier.stats.record(prediction, llm_category=llm_category, llm_calls=llm_calls)
+
+    return {
+        "query_category": category,
+        "query_sentiment": sentiment,
+    }
+
+
+async def acascade_classify_inquiry(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Async variant of cascade_classify_inquiry.
+    """
+
+    query = support_state["customer_query"]
+    prediction = await cascade_classifier.apredict(query[0].content)
+
+    category, sentiment = prediction.category, prediction.sentiment
+    llm_category, llm_calls = None, 0
+
+    if category is None and sentiment is None:
+        classification = await aclassify_inquiry(support_state)
+        category = llm_category = classification["query_category"]
+        sentiment = classification["query_sentiment"]
+        llm_calls = 1
+    elif category is None:
+        category = llm_category = (await acategorize_inquiry(support_state))["query_category"]
+        llm_calls = 1
+    elif sentiment is None:
+        sentiment = (await aanalyze_inquiry_sentiment(support_state))["query_sentiment"]
+        llm_calls = 1
+
+    cascade_classifier.stats.record(prediction, llm_category=llm_category, llm_calls=llm_calls)
+
+    return {
+        "query_category": category,
+        "query_sentiment": sentiment,
+    }
+
 
 def generate_department_response(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
     """
     Provide a department support response by combining knowledge from the vector store and LLM.
     For GENERAL queries, respond conversationally without RAG retrieval.
+    Near-duplicate queries of the same category are answered from the semantic response cache, for
+    the first turn of a thread only: once there is a conversation, the prompt carries it and the
+    reply is specific to the thread. The turn is appended to the transcript.
     """
-    # Retrieve category and ensure it is lowercase for metadata filtering
-    categorized_topic = support_state["query_category"]
-    query = support_state["customer_query"][0].content
+    start = time.perf_counter()
+    query, categorized_topic, conversation = _response_request(support_state)
+
+    # Serve repeated questions from the semantic cache, streaming the cached answer as a single chunk
+    cache_lookup = response_cache.lookup(query, categorized_topic) if _response_cacheable(conversation) else None
+    if cache_lookup is not None and cache_lookup.hit:
+        return _cached_response(query, cache_lookup, start)
+
+    retrieved_content = ""
+    if categorized_topic != 'GENERAL':
+        # Perform retrieval from VectorDB, filtered on the department
+        with retrieval_duration.time(kind="search"):
+            relevant_docs = vector_store.similarity_search(
+                query=query, k=RESPONSE_TOP_K, filters=department_filter(categorized_topic)
+            )
+        retrieved_content = _join_documents(relevant_docs)
 
-    # Handle GENERAL queries without RAG retrieval
+    # Generate the final response using the LLM
+    chain, inputs = _response_chain(categorized_topic, query, conversation, retrieved_content)
+    with llm_limiter:
+        reply = chain.invoke(inputs).content
+
+    if cache_lookup is not None:
+        response_cache.store(cache_lookup, reply, retrieved_content)
+        response_cache.stats.record_response(False, time.perf_counter() - start)
+
+    return _generated_response(query, reply, retrieved_content)
+
+
+async def agenerate_department_response(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Async variant of generate_department_response. The query embedding, retrieval (through the
+    shared AsyncQdrantClient) and LLM generation never block the event loop. When the graph started
+    a speculative retrieval, its result for the chosen department is used instead of searching again.
+    """
+    start = time.perf_counter()
+    query, categorized_topic, conversation = _response_request(support_state)
+    speculation_id = support_state.get("speculation_id")
+
+    cache_lookup = (
+        await response_cache.alookup(query, categorized_topic) if _response_cacheable(conversation) else None
+    )
+    if cache_lookup is not None and cache_lookup.hit:
+        speculative_executor.cancel(speculation_id)
+        return _cached_response(query, cache_lookup, start)
+
+    retrieved_content = ""
     if categorized_topic == 'GENERAL':
-        general_prompt = ChatPromptTemplate.from_template(
-            """You are a friendly customer support assistant for ShopUNow, a retail company.
-
-            Respond to the following query in a warm, conversational manner.
-            Introduce yourself briefly and let them know you can help with:
-            - Human Resources (HR) queries
-            - IT Support questions
-            - Facility and Admin issues
-            - Billing and Payment matters
-            - Shipping and Delivery inquiries
-
-            Customer Query:
-            {customer_query}
-            """
-        )
-        chain = general_prompt | llm
-        reply = chain.invoke({"customer_query": query}).content
-
-        return {
-            "final_response": reply,
-            "retrieved_content": ""
-        }
-
-    # Use metadata filter for department-specific queries
-    if categorized_topic in ['HR', 'IT_SUPPORT', 'FACILITY_AND_ADMIN', 'BILLING_AND_PAYMENT', 'SHIPPING_AND_DELIVERY']:
-        metadata_filter = {"source": categorized_topic.lower()}
+        speculative_executor.cancel(speculation_id)
     else:
-        metadata_filter = None
+        relevant_docs = await speculative_executor.take(speculation_id, categorized_topic)
+        if relevant_docs is None:
+            with retrieval_duration.time(kind="search"):
+                relevant_docs = await vector_store.asimilarity_search(
+                    query=query, k=RESPONSE_TOP_K, filters=department_filter(categorized_topic)
+                )
+        retrieved_content = _join_documents(relevant_docs)
 
-    # Perform retrieval from VectorDB
-    relevant_docs = vector_store.similarity_search(
-                            query=query,
-                            k=3,
-                            filters=metadata_filter
-                        )
-    retrieved_content = "\n\n".join(doc.page_content for doc in relevant_docs)
+    chain, inputs = _response_chain(categorized_topic, query, conversation, retrieved_content)
+    async with llm_limiter:
+        reply = (await chain.ainvoke(inputs)).content
 
-    # Combine retrieved information into the prompt
-    response_prompt = RESPONSE_PROMPT.prompt
+    if cache_lookup is not None:
+        await response_cache.astore(cache_lookup, reply, retrieved_content)
+        response_cache.stats.record_response(False, time.perf_counter() - start)
 
-    # Generate the final response using the LLM
-    chain = response_prompt | llm
-    reply = chain.invoke({
+    return _generated_response(query, reply, retrieved_content)
+
+
+def _response_request(support_state: CustomerSupportAgentState) -> tuple[str, str, str]:
+    """The query of a response node, its category and the conversation so far."""
+    return (
+        support_state["customer_query"][0].content,
+        support_state["query_category"],
+        render_conversation(support_state),
+    )
+
+
+def _response_cacheable(conversation: str) -> bool:
+    # Replies written with a conversation history are specific to that thread and are neither served
+    # from nor stored in the cache
+    return response_cache is not None and conversation == NO_CONVERSATION
+
+
+def _cached_response(query: str, cache_lookup: CacheLookup, start: float) -> CustomerSupportAgentState:
+    get_stream_writer()({"response_chunk": cache_lookup.entry.response})
+    response_cache.stats.record_response(True, time.perf_counter() - start)
+    return _generated_response(query, cache_lookup.entry.response, cache_lookup.entry.retrieved_content)
+
+
+def _response_chain(
+    categorized_topic: str, query: str, conversation: str, retrieved_content: str
+) -> tuple[Runnable, Dict[str, str]]:
+    """The prompt and LLM chain answering the query, with its inputs; GENERAL queries get no retrieved content."""
+    conversation_context_tokens.observe(0 if conversation == NO_CONVERSATION else estimate_tokens(conversation))
+    if categorized_topic == 'GENERAL':
+        return GENERAL_RESPONSE_PROMPT.prompt | llm, {"customer_query": query, "conversation": conversation}
+    return RESPONSE_PROMPT.prompt | llm, {
         "customer_query": query,
-        "retrieved_content": retrieved_content
-    }).content
+        "conversation": conversation,
+        "retrieved_content": retrieved_content,
+    }
+
 
-    # Update and return the modified support state
+def _generated_response(query: str, reply: str, retrieved_content: str) -> CustomerSupportAgentState:
     return {
-        "final_response": reply, "retrieved_content": retrieved_content
+        "final_response": reply,
+        "retrieved_content": retrieved_content,
+        "messages": _turn_messages(query, reply),
     }
 
+
+def _join_documents(documents: List[Document]) -> str:
+    return "\n\n".join(doc.page_content for doc in documents)
+
+
+def summarize_conversation(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Fold the older messages of the conversation into the running summary once the thread holds more
+    than TOTAL_MESSAGES_SUMMARY_TRIGGER of them, keeping the TOTAL_MESSAGES_AFTER_SUMMARY most recent
+    ones verbatim. Runs after the response node, once the reply has been delivered.
+    """
+    folded = messages_to_summarize(support_state)
+    if not folded:
+        return {}
+
+    prompt = SUMMARY_PROMPT.prompt.format(
+        summary=support_state.get("summary") or "None yet.", conversation=format_messages(folded)
+    )
+    with llm_limiter:
+        response = llm.invoke(prompt)
+
+    return _fold_into_summary(support_state, folded, response)
+
+
+async def asummarize_conversation(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Async variant of summarize_conversation.
+    """
+    folded = messages_to_summarize(support_state)
+    if not folded:
+        return {}
+
+    prompt = SUMMARY_PROMPT.prompt.format(
+        summary=support_state.get("summary") or "None yet.", conversation=format_messages(folded)
+    )
+    async with llm_limiter:
+        response = await llm.ainvoke(prompt)
+
+    return _fold_into_summary(support_state, folded, response)
+
+
+def _fold_into_summary(
+    support_state: CustomerSupportAgentState, folded: list[AnyMessage], response: AIMessage
+) -> CustomerSupportAgentState:
+    summary = response.content
+    previous = support_state.get("summary") or ""
+
+    # Every later prompt of the thread carries the summary instead of the folded messages
+    conversation_summaries.inc()
+    summary_tokens_saved.inc(
+        max(estimate_tokens(format_messages(folded)) - (estimate_tokens(summary) - estimate_tokens(previous)), 0)
+    )
+    usage = response.usage_metadata or {}
+    summary_llm_tokens.inc(usage.get("input_tokens", 0), kind="input")
+    summary_llm_tokens.inc(usage.get("output_tokens", 0), kind="output")
+
+    return {
+        "summary": summary,
+        "messages": [RemoveMessage(id=message.id) for message in folded],
+    }
+
+
+def _turn_messages(query: str, reply: str) -> list[AnyMessage]:
+    return [HumanMessage(content=query), AIMessage(content=reply)]
+
+
+def department_filter(categorized_topic: str) -> Dict[str, str] | None:
+    """Metadata filter restricting retrieval to the knowledge base of a department."""
+    if categorized_topic in DEPARTMENTS:
+        return {"source": categorized_topic.lower()}
+    return None
+
+
+async def astart_speculative_retrieval(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Start the retrieval of every department as soon as the query arrives, so that the query
+    embedding and Qdrant round trips overlap with classification. agenerate_department_response
+    keeps the result of the chosen department and cancels the others, or all of them for GENERAL
+    queries and semantic cache hits.
+    """
+    query = support_state["customer_query"][0].content
+
+    # Embed once; the department searches wait for it and then hit the embedding cache
+    embedding = vector_store.embedding
+    embedded = asyncio.ensure_future(embedding.aembed_query(query)) if embedding is not None else None
+
+    async def retrieve(category: str):
+        with retrieval_duration.time(kind="speculative"):
+            if embedded is not None:
+                await asyncio.shield(embedded)
+            return await vector_store.asimilarity_search(
+                query=query, k=RESPONSE_TOP_K, filters=department_filter(category)
+            )
+
+    return {
+        "speculation_id": speculative_executor.start({category: retrieve(category) for category in DEPARTMENTS})
+    }
+
+
 def analyze_inquiry_sentiment(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
     """
     Analyze the sentiment of the customer query as Positive, Neutral, Negative or Distress.
@@ -110,7 +419,22 @@ def analyze_inquiry_sentiment(support_state: CustomerSupportAgentState) -> Custo
     query = support_state["customer_query"]
     sentiment_category_prompt = SENTIMENT_CATEGORY_PROMPT.prompt
     prompt = sentiment_category_prompt.format(customer_query=query)
-    sentiment_category = llm.with_structured_output(QuerySentiment).invoke(prompt)
+    with llm_limiter:
+        sentiment_category = llm.with_structured_output(QuerySentiment).invoke(prompt)
+
+    return {
+        "query_sentiment": sentiment_category.sentiment
+    }
+
+
+async def aanalyze_inquiry_sentiment(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
+    """
+    Async variant of analyze_inquiry_sentiment.
+    """
+
+    prompt = SENTIMENT_CATEGORY_PROMPT.prompt.format(customer_query=support_state["customer_query"])
+    async with llm_limiter:
+        sentiment_category = await llm.with_structured_output(QuerySentiment).ainvoke(prompt)
 
     return {
         "query_sentiment": sentiment_category.sentiment
@@ -119,6 +443,9 @@ def analyze_inquiry_sentiment(support_state: CustomerSupportAgentState) -> Custo
 
 def accept_user_input_oncall(support_state: CustomerSupportAgentState) -> CustomerSupportAgentState:
 
+    # Escalated queries get no department response; drop the retrievals started for one
+    speculative_executor.cancel(support_state.get("speculation_id"))
+
     # REMEMBER: You can always customize the way you accept user input by modifying the code below
     # here we use jupyter widgets so you don't have to install too many external dependencies
 
@@ -156,5 +483,6 @@ def escalate_to_oncall_team(support_state: CustomerSupportAgentState) -> Custome
     # NOTE: You can always add custom code here to call specific APIs like whatsapp to notify your on-call doctors
 
     return {
-        "final_response": response
+        "final_response": response,
+        "messages": [HumanMessage(content=support_state["customer_query"][0].content), response],
     }
\ No newline at end of file
@@ -0,0 +1,114 @@
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph.state import CompiledStateGraph
+from loguru import logger
+from opik.integrations.langchain import OpikTracer
+
+from assistant.application.agents.callbacks import GraphMetricsCallbackHandler
+from assistant.application.agents.graph import create_workflow_graph
+from assistant.config import settings
+
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """A compiled workflow graph together with its pre-rendered tracing metadata.
+
+    Attributes:
+        graph: The compiled LangGraph graph, safe to share between concurrent requests.
+        tracer_metadata: Opik trace metadata holding the mermaid rendering of the xray graph,
+            or None when tracing is disabled.
+    """
+
+    graph: CompiledStateGraph
+    tracer_metadata: dict[str, Any] | None
+
+    def callbacks(self, mode: str = "invoke") -> list[BaseCallbackHandler]:
+        """Per-request callbacks: the metrics handler and, when tracing, an OpikTracer. Both keep
+        per-run state, so fresh ones are created each time, but the tracer reuses the cached graph
+        definition instead of re-rendering it.
+
+        Args:
+            mode: "invoke" or "stream", the `mode` label of the turn metrics.
+        """
+        callbacks: list[BaseCallbackHandler] = [GraphMetricsCallbackHandler(mode)]
+        if self.tracer_metadata is not None:
+            callbacks.append(OpikTracer(metadata=dict(self.tracer_metadata)))
+        return callbacks
+
+
+class CompiledGraphRegistry:
+    """Process-wide cache of compiled workflow graphs.
+
+    Graphs are keyed by (checkpointer, tracing mode, graph variant) and compiled only once.
+    """
+
+    def __init__(self) -> None:
+        self._workflows: dict[tuple, CompiledWorkflow] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        checkpointer: BaseCheckpointSaver | None = None,
+        tracing: bool | None = None,
+        variant: tuple | None = None,
+    ) -> CompiledWorkflow:
+        """Return the compiled workflow for the given key, compiling it on first use.
+
+        Args:
+            checkpointer: Checkpointer to compile the graph with, if any.
+            tracing: Whether requests are traced with Opik. Defaults to tracing_enabled().
+            variant: Tuple of create_workflow_graph arguments. Defaults to graph_variant().
+
+        Returns:
+            CompiledWorkflow: The cached compiled workflow.
+        """
+        tracing = tracing_enabled() if tracing is None else tracing
+        variant = graph_variant() if variant is None else variant
+        key = (checkpointer, tracing, variant)
+
+        workflow = self._workflows.get(key)
+        if workflow is None:
+            with self._lock:
+                workflow = self._workflows.get(key)
+                if workflow is None:
+                    workflow = self._compile(checkpointer, tracing, variant)
+                    self._workflows[key] = workflow
+        return workflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._workflows.clear()
+
+    def _compile(
+        self, checkpointer: BaseCheckpointSaver | None, tracing: bool, variant: tuple
+    ) -> CompiledWorkflow:
+        graph = create_workflow_graph(*variant).compile(checkpointer=checkpointer)
+
+        tracer_metadata = None
+        if tracing:
+            tracer_metadata = {
+                "_opik_graph_definition": {
+                    "format": "mermaid",
+                    "data": graph.get_graph(xray=True).draw_mermaid(),
+                }
+            }
+
+        logger.info(f"Compiled workflow graph (variant={variant}, tracing={tracing})")
+        return CompiledWorkflow(graph=graph, tracer_metadata=tracer_metadata)
+
+
+def graph_variant() -> tuple:
+    """The graph variant selected by the settings, as create_workflow_graph arguments."""
+    return (settings.CLASSIFICATION_MODE, settings.GRAPH_ASYNC_NODES, settings.SPECULATIVE_RETRIEVAL)
+
+
+def tracing_enabled() -> bool:
+    """Opik tracing is on when it is explicitly enabled or Comet credentials are configured."""
+    return settings.OPIK_ENABLED or bool(settings.COMET_API_KEY)
+
+
+graph_registry = CompiledGraphRegistry()
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Optional
+from uuid import uuid4
+
+from loguru import logger
+
+from assistant.config import settings
+
+
+@dataclass
+class _Speculation:
+    """The in-flight speculative work of one query: a task per possible outcome."""
+
+    tasks: Dict[str, asyncio.Task]
+    started_at: float = field(default_factory=time.monotonic)
+
+    def cancel(self, keep: Optional[str] = None) -> int:
+        """Cancel every unfinished task but `keep` and return how many were cancelled.
+
+        Safe to call from any thread, e.g. a sync graph node running in an executor.
+        """
+        cancelled = 0
+        for name, task in self.tasks.items():
+            if name != keep and not task.done():
+                loop = task.get_loop()
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(task.cancel)
+                cancelled += 1
+        return cancelled
+
+
+class SpeculativeExecutor:
+    """
+    Process-wide registry of work started before the graph knows whether it is needed.
+
+    A node starts one task per possible outcome (e.g. a retrieval per department) and stores the
+    returned id in the graph state; the state is checkpointed, the tasks are not. A later node
+    either takes the result of the outcome that was chosen, which cancels the others, or cancels
+    them all. Speculations nobody claimed within `max_age` seconds (a failed or diverted run) are
+    cancelled the next time one is started.
+
+    Tasks are bound to the event loop of the async graph nodes that created them.
+
+    Args:
+        max_age: Seconds after which an unclaimed speculation is cancelled.
+    """
+
+    def __init__(self, max_age: float = settings.SPECULATIVE_RETRIEVAL_MAX_AGE_SECONDS) -> None:
+        self.max_age = max_age
+        self._speculations: Dict[str, _Speculation] = {}
+        self._lock = threading.Lock()
+
+        self.started = 0
+        self.used = 0
+        self.ready = 0
+        self.missed = 0
+        self.failed = 0
+        self.cancelled_tasks = 0
+        self.expired = 0
+        self.wait_seconds = 0.0
+
+    def start(self, outcomes: Dict[str, Awaitable[Any]]) -> str:
+        """Schedule one task per outcome on the running loop and return the speculation id."""
+        self._expire()
+        speculation_id = uuid4().hex
+        speculation = _Speculation(tasks={name: asyncio.ensure_future(work) for name, work in outcomes.items()})
+        for task in speculation.tasks.values():
+            # Failures are reported by take(); an unclaimed one must not log "exception never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        with self._lock:
+            self._speculations[speculation_id] = speculation
+            self.started += 1
+        return speculation_id
+
+    async def take(self, speculation_id: Optional[str], outcome: str) -> Optional[Any]:
+        """
+        Claim the result of `outcome` and cancel the other tasks.
+
+        Returns:
+            The task result, or None when there is no such speculation or outcome, or its task failed
+            or was cancelled (the caller then does the work itself).
+        """
+        speculation = self._pop(speculation_id)
+        if speculation is None:
+            return None
+        self._record_cancelled(speculation.cancel(keep=outcome))
+
+        task = speculation.tasks.get(outcome)
+        if task is None:
+            with self._lock:
+                self.missed += 1
+            return None
+
+        start = time.perf_counter()
+        was_ready = task.done()
+        # Unlike `await task`, waiting neither raises the failure of the task nor mistakes its
+        # cancellation for the cancellation of the caller
+        await asyncio.wait({task})
+        if task.cancelled() or task.exception() is not None:
+            with self._lock:
+                self.failed += 1
+            reason = "was cancelled" if task.cancelled() else f"failed: {task.exception()!r}"
+            logger.warning(f"Speculative work for {outcome} {reason}; doing it directly")
+            return None
+        with self._lock:
+            self.used += 1
+            self.ready += int(was_ready)
+            self.wait_seconds += time.perf_counter() - start
+        return task.result()
+
+    def cancel(self, speculation_id: Optional[str]) -> None:
+        """Cancel all the work of a speculation that turned out not to be needed."""
+        speculation = self._pop(speculation_id)
+        if speculation is not None:
+            self._record_cancelled(speculation.cancel())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "started": self.started,
+                "used": self.used,
+                "ready_when_needed": self.ready,
+                "missed": self.missed,
+                "failed": self.failed,
+                "cancelled_tasks": self.cancelled_tasks,
+                "expired": self.expired,
+                "pending": len(self._speculations),
+                "avg_wait_ms": 1000 * self.wait_seconds / self.used if self.used else 0.0,
+            }
+
+    def _pop(self, speculation_id: Optional[str]) -> Optional[_Speculation]:
+        if speculation_id is None:
+            return None
+        with self._lock:
+            return self._speculations.pop(speculation_id, None)
+
+    def _record_cancelled(self, count: int) -> None:
+        with self._lock:
+            self.cancelled_tasks += count
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self.max_age
+        with self._lock:
+            expired = [key for key, speculation in self._speculations.items() if speculation.started_at < deadline]
+            speculations = [self._speculations.pop(key) for key in expired]
+            self.expired += len(expired)
+        for speculation in speculations:
+            self._record_cancelled(speculation.cancel())
+        if expired:
+            logger.warning(f"Cancelled {len(expired)} unclaimed speculative retrievals")
+
+
+speculative_executor = SpeculativeExecutor()
@@ -1,4 +1,6 @@
-from typing import TypedDict, Literal
+from typing import Annotated, TypedDict, Literal
+from langchain_core.messages import AnyMessage
+from langgraph.graph.message import add_messages
 from pydantic import BaseModel
 
 class CustomerSupportAgentState(TypedDict):
@@ -9,6 +11,10 @@ class CustomerSupportAgentState(TypedDict):
     oncall_cust_info: dict
     final_response: str
     retrieved_content: str
+    speculation_id: str
+    # Conversation transcript kept verbatim, and the running summary of the turns folded out of it
+    messages: Annotated[list[AnyMessage], add_messages]
+    summary: str
 
 class QueryCategory(BaseModel):
     categorized_topic: Literal['HR', 'IT_SUPPORT', 'FACILITY_AND_ADMIN', 'BILLING_AND_PAYMENT', 'SHIPPING_AND_DELIVERY', 'GENERAL']
@@ -16,6 +22,10 @@ class QueryCategory(BaseModel):
 class QuerySentiment(BaseModel):
     sentiment: Literal['Positive', 'Neutral', 'Negative']
 
+class QueryClassification(BaseModel):
+    categorized_topic: Literal['HR', 'IT_SUPPORT', 'FACILITY_AND_ADMIN', 'BILLING_AND_PAYMENT', 'SHIPPING_AND_DELIVERY', 'GENERAL']
+    sentiment: Literal['Positive', 'Neutral', 'Negative']
+
 
 def state_to_str(state: CustomerSupportAgentState) -> str:
     if "final_response" in state and bool(state["final_response"]):
@@ -11,7 +11,7 @@ from opik.evaluation.metrics import (
     Moderation,
 )
 
-from assistant.application.generate_response import get_response
+from assistant.application.generate_response import close_checkpointer, get_response
 from assistant.application.agents.state import state_to_str
 from assistant.config import settings
 
@@ -36,11 +36,15 @@ async def evaluation_task(x: dict) -> dict:
     input_messages = x["question"]
     expected_output_message = x["answer"]
 
-    response, retrieved_content = await get_response(
-        messages=input_messages,
-        user_id="Saurabh",
-        new_thread=True,
-    )
+    try:
+        response, retrieved_content = await get_response(
+            messages=input_messages,
+            user_id="Saurabh",
+            new_thread=True,
+        )
+    finally:
+        # Each task runs in its own asyncio.run(); send the buffered conversation state before it returns
+        await close_checkpointer()
 
     return {
         "input": input_messages,
@@ -57,6 +61,8 @@ def get_used_prompts() -> list[opik.Prompt]:
         client.get_prompt(name="route_category_prompt"),
         client.get_prompt(name="response_prompt"),
         client.get_prompt(name="sentiment_category_prompt"),
+        client.get_prompt(name="classify_inquiry_prompt"),
+        client.get_prompt(name="general_response_prompt"),
     ]
 
     prompts = [p for p in prompts if p is not None]
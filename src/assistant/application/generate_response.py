@@ -1,45 +1,83 @@
+import asyncio
 import uuid
-from contextlib import nullcontext
-from typing import Any, AsyncGenerator, Union
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Union
 
-from opik.integrations.langchain import OpikTracer
 from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from loguru import logger
 try:
     from langgraph.checkpoint.mongodb import MongoDBSaver
 except Exception:
     MongoDBSaver = None
 
-from assistant.application.agents.graph import create_workflow_graph
+from assistant.application.agents.callbacks import RESPONSE_NODES
+from assistant.application.agents.registry import graph_registry
 from assistant.application.agents.state import CustomerSupportAgentState
+from assistant.application.state_retention import state_store
 from assistant.config import settings
+from assistant.infrastructure.mongdb.checkpointer import AsyncMongoDBSaver, InstrumentedCheckpointSaver
+from assistant.infrastructure.mongdb.pool import mongo_clients
 
 # Initialize MongoDB checkpointer once at module level
 _checkpointer = None
-if MongoDBSaver:
-    from pymongo import MongoClient
-
-    # Create a persistent MongoDB client
-    _mongo_client = MongoClient(settings.MONGO_URI, appname="customerassistant")
-
-    # Create checkpointer directly without context manager
-    _checkpointer = MongoDBSaver(
-        client=_mongo_client,
-        db_name=settings.MONGO_DB_NAME,
-        checkpoint_collection_name=settings.MONGO_STATE_CHECKPOINT_COLLECTION,
-        writes_collection_name=settings.MONGO_STATE_WRITES_COLLECTION,
+if settings.MONGO_ASYNC_CHECKPOINTER:
+    # Async client opened on first use; writes coalesced with the next checkpoint of the thread. The
+    # saver is the one resets and compaction use, so they flush and discard its buffered writes.
+    _checkpointer = InstrumentedCheckpointSaver(state_store)
+elif MongoDBSaver:
+    # The process-wide MongoDB client, shared with the other components
+    _mongo_client = mongo_clients.get(settings.MONGO_URI)
+
+    # Create checkpointer directly without context manager, timing its operations for /metrics
+    _checkpointer = InstrumentedCheckpointSaver(
+        MongoDBSaver(
+            client=_mongo_client,
+            db_name=settings.MONGO_DB_NAME,
+            checkpoint_collection_name=settings.MONGO_STATE_CHECKPOINT_COLLECTION,
+            writes_collection_name=settings.MONGO_STATE_WRITES_COLLECTION,
+            ttl=settings.CHECKPOINT_TTL_SECONDS,
+        )
     )
 
+# Graph runs still finishing (conversation summarization, final checkpoint) after their reply was
+# returned, by thread
+_turn_tails: Dict[str, asyncio.Task] = {}
+
+
+def warm_up_workflow() -> None:
+    """Compile the workflow graph for the configured variant ahead of the first request."""
+    graph_registry.get(checkpointer=_checkpointer)
+
+
+async def close_checkpointer() -> None:
+    """
+    Let the turns finishing in the background complete, then send the conversation state writes
+    still buffered by the async checkpointer.
+
+    Entry points running the workflow under asyncio.run() await it before their loop closes.
+    """
+    loop = asyncio.get_running_loop()
+    tails = [task for task in _turn_tails.values() if task.get_loop() is loop]
+    if tails:
+        await asyncio.wait(tails)
+    if _checkpointer is not None and isinstance(_checkpointer.saver, AsyncMongoDBSaver):
+        await _checkpointer.saver.aclose()
+
 
 async def get_response(
     messages: str | list[str] | list[dict[str, Any]],
     user_id: str,
     new_thread: bool = False,
+    background: bool = False,
 ) -> tuple:
     """Run a conversation through the workflow graph.
 
     Args:
         message: Initial message to start the conversation.
         user_id: Unique identifier.
+        new_thread: Whether to create a new conversation thread.
+        background: Return as soon as the reply is ready and finish the turn (conversation
+            summarization, final checkpoint) in a background task. Only for callers whose event
+            loop outlives the call, such as the API: asyncio.run() would cancel the task.
 
     Returns:
             - The final state after running the workflow.
@@ -48,24 +86,41 @@ async def get_response(
         RuntimeError: If there's an error running the conversation workflow.
     """
 
-    graph_builder = create_workflow_graph()
-    # Use MongoDBSaver if available, otherwise compile without a checkpointer.
-    if _checkpointer:
-        graph = graph_builder.compile(checkpointer=_checkpointer)
-    else:
-        graph = graph_builder.compile()
+    # Use the MongoDB checkpointer if available, otherwise the graph is compiled without one.
+    workflow = graph_registry.get(checkpointer=_checkpointer)
+    graph = workflow.graph
 
     try:
-        opik_tracer = OpikTracer(graph=graph.get_graph(xray=True))
         thread_id = user_id if not new_thread else f"{user_id}-{uuid.uuid4()}"
         config = {
             "configurable": {"thread_id": thread_id},
-            "callbacks": [opik_tracer],
+            "callbacks": workflow.callbacks(),
         }
-        output_state = await graph.ainvoke(
+        await _wait_for_previous_turn(thread_id)
+
+        # The turn is answered once a response node has run; in the background mode the rest of the
+        # graph run finishes in a task of its own
+        output_state = {}
+        stream = graph.astream(
             input={"customer_query": __format_messages(messages=messages)},
             config=config,
+            stream_mode="updates",
+            durability=settings.CHECKPOINT_DURABILITY,
         )
+        handed_off = False
+        try:
+            async for update in stream:
+                node = next((node for node in RESPONSE_NODES if node in update), None)
+                if node is not None:
+                    output_state = update[node]
+                    if background:
+                        _finish_in_background(thread_id, stream)
+                        handed_off = True
+                        break
+        finally:
+            if not handed_off:
+                await stream.aclose()
+
         last_message = output_state["final_response"]
         retrieved_content = output_state.get(
             "retrieved_content",
@@ -81,6 +136,7 @@ async def get_streaming_response(
     messages: str | list[str] | list[dict[str, Any]],
     user_id: str,
     new_thread: bool = False,
+    background: bool = False,
 ) -> AsyncGenerator[str, None]:
     """Run a conversation through the workflow graph with streaming response.
 
@@ -88,6 +144,8 @@ async def get_streaming_response(
         messages: Initial message to start the conversation.
         user_id: Unique identifier.
         new_thread: Whether to create a new conversation thread.
+        background: End the stream as soon as the reply is complete and finish the turn in a
+            background task; see get_response.
 
     Yields:
         Chunks of the response as they become available.
@@ -95,34 +153,57 @@ async def get_streaming_response(
     Raises:
         RuntimeError: If there's an error running the conversation workflow.
     """
-    graph_builder = create_workflow_graph()
-    if _checkpointer:
-        graph = graph_builder.compile(checkpointer=_checkpointer)
-    else:
-        graph = graph_builder.compile()
+    # Use the MongoDB checkpointer if available, otherwise the graph is compiled without one.
+    workflow = graph_registry.get(checkpointer=_checkpointer)
+    graph = workflow.graph
 
     try:
-        opik_tracer = OpikTracer(graph=graph.get_graph(xray=True))
         thread_id = user_id if not new_thread else f"{user_id}-{uuid.uuid4()}"
         config = {
             "configurable": {"thread_id": thread_id},
-            "callbacks": [opik_tracer],
+            "callbacks": workflow.callbacks(mode="stream"),
         }
 
-        async for chunk in graph.astream(
+        await _wait_for_previous_turn(thread_id)
+
+        stream = graph.astream(
             input={"customer_query": __format_messages(messages=messages)},
             config=config,
-            stream_mode="messages",
-        ):
-            if chunk[1]["langgraph_node"] == "generate_department_response" and isinstance(
-                chunk[0], AIMessageChunk
-            ):
-                yield chunk[0].content
+            stream_mode=["messages", "custom", "updates"],
+            durability=settings.CHECKPOINT_DURABILITY,
+        )
+        handed_off = False
+        try:
+            async for mode, chunk in stream:
+                # The reply is complete once its node has run; in the background mode the rest of the graph
+                # run (conversation summarization) finishes in a task instead of delaying the end of the stream
+                if mode == "updates":
+                    if background and not RESPONSE_NODES.isdisjoint(chunk):
+                        _finish_in_background(thread_id, stream)
+                        handed_off = True
+                        return
+                    continue
 
-            if chunk[1]["langgraph_node"] == "escalate_to_oncall_team" and isinstance(
-                chunk[0], AIMessageChunk
-            ):
-                yield chunk[0].content
+                # Responses served from the semantic cache are emitted by the node itself
+                if mode == "custom":
+                    if "response_chunk" in chunk:
+                        yield chunk["response_chunk"]
+                    continue
+
+                if chunk[1]["langgraph_node"] == "generate_department_response" and isinstance(
+                    chunk[0], AIMessageChunk
+                ):
+                    yield chunk[0].content
+
+                if chunk[1]["langgraph_node"] == "escalate_to_oncall_team" and isinstance(
+                    chunk[0], AIMessageChunk
+                ):
+                    yield chunk[0].content
+        finally:
+            # Closing this generator before the reply is complete (a disconnected client) closes the
+            # graph stream at once, which cancels the running nodes and their LLM calls
+            if not handed_off:
+                await stream.aclose()
 
     except Exception as e:
         raise RuntimeError(
@@ -130,6 +211,34 @@ async def get_streaming_response(
         ) from e
 
 
+async def _wait_for_previous_turn(thread_id: str) -> None:
+    # A turn starts from the state its predecessor leaves, running summary included. Waiting does
+    # not cancel the predecessor if this turn is cancelled.
+    tail = _turn_tails.get(thread_id)
+    if tail is not None:
+        await asyncio.wait({tail})
+
+
+def _finish_in_background(thread_id: str, stream: AsyncIterator[Any]) -> None:
+    async def drain() -> None:
+        try:
+            async for _ in stream:
+                pass
+        finally:
+            await stream.aclose()
+
+    task = asyncio.create_task(drain())
+    _turn_tails[thread_id] = task
+    task.add_done_callback(lambda task: _turn_tail_done(thread_id, task))
+
+
+def _turn_tail_done(thread_id: str, task: asyncio.Task) -> None:
+    if _turn_tails.get(thread_id) is task:
+        del _turn_tails[thread_id]
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Finishing the turn of thread {thread_id} failed: {task.exception()!r}")
+
+
 def __format_messages(
     messages: Union[str, list[dict[str, Any]]],
 ) -> list[Union[HumanMessage, AIMessage]]:
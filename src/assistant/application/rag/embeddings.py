@@ -1,20 +1,239 @@
-from typing import Literal, Union
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional, Union
 
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
+from loguru import logger
+
 from assistant.config import settings
+from assistant.infrastructure.metrics import embedding_duration
+
+
+class EmbeddingCache:
+    """Two-tier embedding store: an in-memory LRU in front of an on-disk SQLite table.
+
+    The SQLite file runs in WAL mode so several worker processes can read and write it at once.
+    Vectors are stored as float32 blobs keyed by a hash of (model id, dimensions, text).
+
+    Args:
+        path: Location of the SQLite file, or None for a memory-only cache.
+        memory_size: Maximum number of vectors kept in the in-memory tier.
+    """
+
+    def __init__(self, path: Optional[Path], memory_size: int) -> None:
+        self.path = path
+        self.memory_size = memory_size
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._connection.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Return the cached vectors of the given keys, promoting disk hits to memory."""
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+            missing = [key for key in keys if key not in found]
+            if missing and self._connection is not None:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start : start + 500]
+                    rows = self._connection.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._connection is not None and items:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+                )
+                self._connection.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def _remember(self, key: str, vector: list[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the underlying model for texts it has never seen.
+
+    Args:
+        underlying: The embedding model to call on cache misses.
+        cache: Shared two-tier embedding cache.
+        model_id: Model identifier, part of the cache key.
+        dimensions: Output dimensions requested from the model (None for the model default).
+    """
 
-def get_openai_embedding_model(model_id: str = settings.RAG_TEXT_EMBEDDING_MODEL_ID) -> OpenAIEmbeddings:
+    def __init__(
+        self,
+        underlying: Embeddings,
+        cache: EmbeddingCache,
+        model_id: str,
+        dimensions: Optional[int] = None,
+    ) -> None:
+        self.underlying = underlying
+        self.cache = cache
+        self.model_id = model_id
+        self.dimensions = dimensions
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}|{self.dimensions}|{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with embedding_duration.time(operation="documents"):
+            keys, found, missing = self._lookup(texts)
+            if missing:
+                vectors = self.underlying.embed_documents(list(missing.values()))
+                found.update(self._store(missing, vectors))
+            return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        with embedding_duration.time(operation="query"):
+            keys, found, missing = self._lookup([text])
+            if missing:
+                found.update(self._store(missing, [self.underlying.embed_query(text)]))
+            return found[keys[0]]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        # The SQLite reads, writes and commits run in a worker thread, as in RetrievalCache
+        with embedding_duration.time(operation="documents"):
+            keys, found, missing = await asyncio.to_thread(self._lookup, texts)
+            if missing:
+                vectors = await self.underlying.aembed_documents(list(missing.values()))
+                found.update(await asyncio.to_thread(self._store, missing, vectors))
+            return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        with embedding_duration.time(operation="query"):
+            keys, found, missing = await asyncio.to_thread(self._lookup, [text])
+            if missing:
+                vector = await self.underlying.aembed_query(text)
+                found.update(await asyncio.to_thread(self._store, missing, [vector]))
+            return found[keys[0]]
+
+    def _lookup(self, texts: list[str]) -> tuple[list[str], dict[str, list[float]], dict[str, str]]:
+        keys = [self.key(text) for text in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        return keys, found, missing
+
+    def _store(self, missing: dict[str, str], vectors: list[list[float]]) -> dict[str, list[float]]:
+        items = dict(zip(missing.keys(), vectors))
+        self.cache.put_many(items)
+        return items
+
+
+@lru_cache(maxsize=None)
+def get_embedding_cache(
+    path: Optional[Path] = settings.EMBEDDING_CACHE_PATH,
+    memory_size: int = settings.EMBEDDING_CACHE_MEMORY_SIZE,
+) -> EmbeddingCache:
+    """Process-wide embedding cache, shared by every embedding model instance."""
+    cache = EmbeddingCache(path=path, memory_size=memory_size)
+    logger.info(f"Embedding cache initialized (disk tier: {path or 'disabled'})")
+    return cache
+
+
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def embedding_dimensions(
+    model_id: str = settings.RAG_TEXT_EMBEDDING_MODEL_ID,
+    dimensions: Optional[int] = settings.RAG_EMBEDDING_DIMENSIONS,
+) -> int:
+    """Size of the vectors returned by the embedding model with the given dimensions setting."""
+    return dimensions or NATIVE_DIMENSIONS.get(model_id, 1536)
+
+
+def truncate_embedding(vector: list[float], dimensions: int) -> list[float]:
+    """Shorten a Matryoshka embedding (text-embedding-3) to its leading dimensions and re-normalise it.
+
+    This matches what the API returns when asked for fewer dimensions, without another call.
+    """
+    head = np.asarray(vector[:dimensions], dtype=np.float32)
+    return (head / max(float(np.linalg.norm(head)), 1e-12)).tolist()
+
+
+def get_openai_embedding_model(
+    model_id: str = settings.RAG_TEXT_EMBEDDING_MODEL_ID,
+    use_cache: bool = settings.EMBEDDING_CACHE_ENABLED,
+    dimensions: Optional[int] = settings.RAG_EMBEDDING_DIMENSIONS,
+) -> Embeddings:
     """Gets an OpenAI embedding model instance.
 
     Args:
         model_id (str): The ID/name of the OpenAI embedding model to use
+        use_cache (bool): Wrap the model with the shared in-memory/on-disk embedding cache
+        dimensions (int | None): Shorter output size for text-embedding-3 models, None for the native size
 
     Returns:
-        OpenAIEmbeddings: A configured OpenAI embeddings model instance with
-            special token handling enabled
+        Embeddings: A configured OpenAI embeddings model instance with
+            special token handling enabled, wrapped by CachedEmbeddings if caching is enabled
     """
-    return OpenAIEmbeddings(
+    embeddings = OpenAIEmbeddings(
         model=model_id,
+        dimensions=dimensions,
         allowed_special={"<|endoftext|>"},
         api_key = settings.OPENAI_API_KEY
-    )
\ No newline at end of file
+    )
+    if not use_cache:
+        return embeddings
+
+    return CachedEmbeddings(
+        underlying=embeddings, cache=get_embedding_cache(), model_id=model_id, dimensions=dimensions
+    )
@@ -0,0 +1,135 @@
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from assistant.config import settings
+from assistant.infrastructure.qdrant.service import QdrantManager, document_id
+
+
+@dataclass
+class IngestionReport:
+    """Outcome and throughput of a knowledge base ingestion run.
+
+    `seconds` and `batch_seconds` are wall-clock times of the whole run and of the embed/upsert
+    phase; `embed_seconds` and `upsert_seconds` add up the time spent by every worker.
+    `fingerprint` identifies the documents stored once the run finished.
+    """
+
+    total_documents: int = 0
+    unchanged: int = 0
+    added: int = 0
+    deleted: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    batch_seconds: float = 0.0
+    embed_seconds: float = 0.0
+    upsert_seconds: float = 0.0
+    fingerprint: str = ""
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.deleted)
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.total_documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def embeddings_per_second(self) -> float:
+        return self.added / self.batch_seconds if self.batch_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.total_documents} documents: {self.added} added, {self.deleted} deleted, "
+            f"{self.unchanged} unchanged in {self.batches} batches; {self.seconds:.2f}s total, "
+            f"{self.docs_per_second:.1f} docs/s, {self.embeddings_per_second:.1f} embeddings/s"
+        )
+
+
+class KnowledgeBaseIngestor:
+    """Idempotent, incremental ingestion of knowledge base documents into Qdrant.
+
+    Point ids are content hashes, so only new or changed documents are embedded and upserted,
+    and documents that disappeared from the knowledge base are deleted. Batches are written as
+    soon as they are embedded, which makes an interrupted run resumable: the next run skips
+    everything that already reached the collection.
+
+    Args:
+        vector_store: The QdrantManager holding the knowledge base collection.
+        batch_size: Number of documents embedded and upserted together.
+        max_concurrency: Maximum number of batches in flight at once.
+        delete_missing: Delete stored documents that are no longer in the knowledge base.
+    """
+
+    def __init__(
+        self,
+        vector_store: QdrantManager,
+        batch_size: int = settings.INGESTION_BATCH_SIZE,
+        max_concurrency: int = settings.INGESTION_MAX_CONCURRENCY,
+        delete_missing: bool = True,
+    ) -> None:
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.delete_missing = delete_missing
+
+    def run(self, documents: list[Document]) -> IngestionReport:
+        start = time.perf_counter()
+
+        desired = {document_id(doc): doc for doc in documents}
+        existing = set(self.vector_store.iter_point_ids())
+        to_add = [(point_id, doc) for point_id, doc in desired.items() if point_id not in existing]
+        to_delete = sorted(existing - desired.keys()) if self.delete_missing else []
+
+        report = IngestionReport(total_documents=len(desired), unchanged=len(desired) - len(to_add))
+        logger.info(
+            f"Ingesting {len(desired)} documents: {len(to_add)} to embed, "
+            f"{report.unchanged} unchanged, {len(to_delete)} to delete"
+        )
+
+        batches = [to_add[i : i + self.batch_size] for i in range(0, len(to_add), self.batch_size)]
+        batch_start = time.perf_counter()
+        max_workers = 1 if self.vector_store.is_local else self.max_concurrency
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._ingest_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                embed_seconds, upsert_seconds, count = future.result()
+                report.embed_seconds += embed_seconds
+                report.upsert_seconds += upsert_seconds
+                report.added += count
+                report.batches += 1
+                logger.debug(f"Batch {report.batches}/{len(batches)} written ({report.added}/{len(to_add)})")
+        report.batch_seconds = time.perf_counter() - batch_start
+
+        # Delete stale documents only once every replacement is stored
+        for i in range(0, len(to_delete), self.batch_size):
+            self.vector_store.delete_documents(to_delete[i : i + self.batch_size])
+        report.deleted = len(to_delete)
+        report.fingerprint = content_fingerprint((existing - set(to_delete)) | desired.keys())
+
+        # Backends that buffer writes publish them now
+        self.vector_store.flush()
+
+        report.seconds = time.perf_counter() - start
+        logger.info(f"Ingestion finished: {report}")
+        return report
+
+    def _ingest_batch(self, batch: list[tuple[str, Document]]) -> tuple[float, float, int]:
+        ids = [point_id for point_id, _ in batch]
+        documents = [doc for _, doc in batch]
+
+        start = time.perf_counter()
+        vectors = self.vector_store.build_vectors([doc.page_content for doc in documents])
+        embedded = time.perf_counter()
+        self.vector_store.upsert_points(ids, documents, vectors)
+
+        return embedded - start, time.perf_counter() - embedded, len(batch)
+
+
+def content_fingerprint(point_ids) -> str:
+    """Hash of a set of point ids; as ids are content hashes, it identifies the stored documents."""
+    return hashlib.sha256("\n".join(sorted(point_ids)).encode("utf-8")).hexdigest()
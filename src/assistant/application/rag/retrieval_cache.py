@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from assistant.config import settings
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for cache keys: case, unicode forms, spacing and surrounding
+    punctuation do not change what is retrieved."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" \t\n?!.,;:'\"")
+
+
+class RetrievalCache:
+    """Two-tier cache of retrieval results: an in-memory LRU in front of a shared SQLite table.
+
+    Entries hold the documents returned for a key (ids, contents and metadata) together with the
+    knowledge base generation they were retrieved from. An entry is only served while it is younger
+    than `ttl_seconds` and its generation is the current one; when the generation changes, entries
+    of older generations are purged from both tiers. The SQLite file runs in WAL mode so every API
+    worker on the host reads and writes it.
+
+    Args:
+        path: Location of the SQLite file, or None for a memory-only cache.
+        memory_size: Maximum number of entries kept in the in-memory tier.
+        max_entries: Maximum number of entries kept in the SQLite tier; the oldest are evicted.
+        ttl_seconds: Maximum age of an entry.
+        generation_source: Returns the current knowledge base generation.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path],
+        memory_size: int = settings.RETRIEVAL_CACHE_MEMORY_SIZE,
+        max_entries: int = settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = settings.RETRIEVAL_CACHE_TTL_SECONDS,
+        generation_source: Optional[Callable[[], int]] = None,
+    ) -> None:
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation_source = generation_source
+        self._memory: OrderedDict[str, tuple[int, float, List[dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._generation: Optional[int] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS retrievals ("
+                "key TEXT PRIMARY KEY, generation INTEGER NOT NULL, created_at REAL NOT NULL, documents TEXT NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS retrievals_created_at ON retrievals (created_at)")
+            self._connection.commit()
+
+    @staticmethod
+    def key(namespace: str, query: str, k: int, filters: Optional[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """Hash of (collection, normalized query, filter, k, search parameters)."""
+        material = json.dumps(
+            [namespace, normalize_query(query), filters or {}, k, params], sort_keys=True, default=str
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        generation = self._current_generation()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                source = "memory"
+            elif self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT generation, created_at, documents FROM retrievals WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1], json.loads(row[2]))
+                source = "disk"
+
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            if time.time() - entry[1] > self.ttl_seconds:
+                self._memory.pop(key, None)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if source == "disk":
+                self._remember(key, entry)
+                self.disk_hits += 1
+            else:
+                self.memory_hits += 1
+        return [Document(page_content=record["page_content"], metadata=record["metadata"]) for record in entry[2]]
+
+    async def aget(self, key: str) -> Optional[List[Document]]:
+        """Async variant of get: the generation check (a vector store request when it is due) and the
+        SQLite read run in a worker thread."""
+        return await asyncio.to_thread(self.get, key)
+
+    def put(self, key: str, documents: List[Document]) -> None:
+        records = [
+            {"id": doc.metadata.get("_id"), "page_content": doc.page_content, "metadata": doc.metadata}
+            for doc in documents
+        ]
+        entry = (self._current_generation(), time.time(), records)
+        with self._lock:
+            self._remember(key, entry)
+            self.stores += 1
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO retrievals (key, generation, created_at, documents) VALUES (?, ?, ?, ?)",
+                    (key, entry[0], entry[1], json.dumps(records, default=str)),
+                )
+                self._connection.execute(
+                    "DELETE FROM retrievals WHERE key IN "
+                    "(SELECT key FROM retrievals ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self._connection.commit()
+
+    async def aput(self, key: str, documents: List[Document]) -> None:
+        """Async variant of put: the SQLite write and commit run in a worker thread."""
+        await asyncio.to_thread(self.put, key, documents)
+
+    def clear(self) -> None:
+        """Drop every cached retrieval."""
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM retrievals")
+                self._connection.commit()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "memory_entries": len(self._memory),
+                "generation": self._generation,
+            }
+
+    def _remember(self, key: str, entry: tuple[int, float, List[dict]]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _current_generation(self) -> int:
+        if self.generation_source is None:
+            return 0
+
+        generation = self.generation_source()
+        if self._generation is not None and generation != self._generation:
+            logger.info(f"Knowledge base generation changed to {generation}, invalidating the retrieval cache")
+            with self._lock:
+                self._memory.clear()
+                if self._connection is not None:
+                    # Entries of the new generation may already have been written by other workers
+                    self._connection.execute("DELETE FROM retrievals WHERE generation < ?", (generation,))
+                    self._connection.commit()
+                self.invalidations += 1
+        self._generation = generation
+        return generation
+
+
+class CachedVectorStore:
+    """Vector store wrapper serving repeated searches from a RetrievalCache.
+
+    similarity_search and asimilarity_search are cached, the latter reading and writing the cache
+    in a worker thread; every other attribute is the wrapped store's, so the wrapper can stand in
+    for QdrantManager or MmapVectorIndex.
+
+    Args:
+        underlying: The vector store searched on cache misses.
+        cache: Retrieval cache, invalidated by the store's generation.
+    """
+
+    def __init__(self, underlying, cache: RetrievalCache) -> None:
+        self.underlying = underlying
+        self.cache = cache
+        self.namespace = str(getattr(underlying, "collection_name", None) or getattr(underlying, "path", ""))
+
+    def __getattr__(self, name: str):
+        return getattr(self.underlying, name)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        search_type: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search_kwargs: Optional[Dict[str, Any]] = None,
+        search_params: Any = None,
+    ) -> List[Document]:
+        options = {"search_type": search_type, "search_kwargs": search_kwargs, "search_params": search_params}
+        key = self._key(query, k, filters, **options)
+        documents = self.cache.get(key)
+        if documents is None:
+            documents = self.underlying.similarity_search(query, k, filters=filters, **options)
+            self.cache.put(key, documents)
+        return documents
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+        search_params: Any = None,
+    ) -> List[Document]:
+        key = self._key(query, k, filters, search_params=search_params)
+        documents = await self.cache.aget(key)
+        if documents is None:
+            documents = await self.underlying.asimilarity_search(query, k, filters=filters, search_params=search_params)
+            await self.cache.aput(key, documents)
+        return documents
+
+    def _key(self, query: str, k: int, filters: Optional[Dict[str, Any]], **params: Any) -> str:
+        params = {
+            name: value.model_dump(exclude_none=True) if hasattr(value, "model_dump") else value
+            for name, value in params.items()
+            if value is not None
+        }
+        return self.cache.key(self.namespace, query, k, filters, params)
+
+
+def with_retrieval_cache(vector_store):
+    """Wrap a vector store with the retrieval cache configured in the settings.
+
+    Returns:
+        CachedVectorStore | the given store: The wrapped store, or the store itself when the cache is disabled.
+    """
+    if not settings.RETRIEVAL_CACHE_ENABLED:
+        return vector_store
+
+    cache = RetrievalCache(path=settings.RETRIEVAL_CACHE_PATH, generation_source=vector_store.get_generation)
+    logger.info(f"Retrieval cache initialized (shared tier: {settings.RETRIEVAL_CACHE_PATH or 'disabled'})")
+    return CachedVectorStore(vector_store, cache)
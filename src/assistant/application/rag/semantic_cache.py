@@ -0,0 +1,427 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional, Protocol
+from uuid import uuid4
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from assistant.config import settings
+
+
+@dataclass
+class CachedResponse:
+    """A department response stored in the semantic cache."""
+
+    query: str
+    category: str
+    response: str
+    retrieved_content: str
+    created_at: float
+    generation: int
+
+
+@dataclass
+class CacheLookup:
+    """Result of a cache lookup. `vector` is kept so a miss can be stored without re-embedding."""
+
+    query: str
+    category: str
+    vector: list[float]
+    entry: Optional[CachedResponse] = None
+
+    @property
+    def hit(self) -> bool:
+        return self.entry is not None
+
+
+class CacheBackend(Protocol):
+    def search(
+        self, vector: list[float], category: str, threshold: float, generation: int
+    ) -> Optional[tuple[str, CachedResponse]]: ...
+
+    def add(self, vector: list[float], entry: CachedResponse) -> int: ...
+
+    def touch(self, entry_id: str) -> None: ...
+
+    def remove(self, entry_id: str) -> None: ...
+
+    def clear(self, keep_generation: Optional[int] = None) -> None: ...
+
+
+class InMemoryCacheBackend:
+    """In-process cache backend: an LRU ordered dict with a similarity matrix per category and generation.
+
+    Args:
+        max_entries: Size bound; the least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._vectors: dict[str, np.ndarray] = {}
+        self._matrices: dict[tuple[str, int], tuple[list[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def search(
+        self, vector: list[float], category: str, threshold: float, generation: int
+    ) -> Optional[tuple[str, CachedResponse]]:
+        with self._lock:
+            ids, matrix = self._category_matrix(category, generation)
+            if not ids:
+                return None
+            similarities = matrix @ _normalise(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            return ids[best], self._entries[ids[best]]
+
+    def add(self, vector: list[float], entry: CachedResponse) -> int:
+        """Store an entry and return the number of evicted entries."""
+        entry_id = str(uuid4())
+        with self._lock:
+            self._entries[entry_id] = entry
+            self._vectors[entry_id] = _normalise(vector)
+            self._matrices.pop((entry.category, entry.generation), None)
+
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            return evicted
+
+    def touch(self, entry_id: str) -> None:
+        with self._lock:
+            if entry_id in self._entries:
+                self._entries.move_to_end(entry_id)
+
+    def remove(self, entry_id: str) -> None:
+        with self._lock:
+            self._remove(entry_id)
+
+    def clear(self, keep_generation: Optional[int] = None) -> None:
+        """Delete cached entries, keeping those of `keep_generation` if given."""
+        with self._lock:
+            if keep_generation is None:
+                self._entries.clear()
+                self._vectors.clear()
+                self._matrices.clear()
+                return
+            for entry_id in [i for i, entry in self._entries.items() if entry.generation != keep_generation]:
+                self._remove(entry_id)
+
+    def _remove(self, entry_id: str) -> None:
+        entry = self._entries.pop(entry_id, None)
+        self._vectors.pop(entry_id, None)
+        if entry is not None:
+            self._matrices.pop((entry.category, entry.generation), None)
+
+    def _category_matrix(self, category: str, generation: int) -> tuple[list[str], np.ndarray]:
+        key = (category, generation)
+        if key not in self._matrices:
+            ids = [
+                entry_id
+                for entry_id, entry in self._entries.items()
+                if entry.category == category and entry.generation == generation
+            ]
+            matrix = np.stack([self._vectors[i] for i in ids]) if ids else np.empty((0, 0), dtype=np.float32)
+            self._matrices[key] = (ids, matrix)
+        return self._matrices[key]
+
+
+class QdrantCacheBackend:
+    """Cache backend storing responses as points of a dedicated Qdrant collection.
+
+    Entries can be shared by every API worker pointing at the same Qdrant instance.
+
+    Args:
+        client: Qdrant client (server or local/embedded).
+        collection_name: Name of the cache collection, created if missing.
+        vector_size: Dimensionality of the query embeddings.
+        max_entries: Size bound; the least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, client: QdrantClient, collection_name: str, vector_size: int, max_entries: int) -> None:
+        self.client = client
+        self.collection_name = collection_name
+        self.vector_size = vector_size
+        self.max_entries = max_entries
+        self._create_collection()
+
+    def _create_collection(self) -> None:
+        if self.client.collection_exists(self.collection_name):
+            return
+
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=models.VectorParams(size=self.vector_size, distance=models.Distance.COSINE),
+        )
+        for field_name, schema in (
+            ("category", models.PayloadSchemaType.KEYWORD),
+            ("generation", models.PayloadSchemaType.INTEGER),
+            ("last_used_at", models.PayloadSchemaType.FLOAT),
+        ):
+            self.client.create_payload_index(self.collection_name, field_name, field_schema=schema)
+
+    def search(
+        self, vector: list[float], category: str, threshold: float, generation: int
+    ) -> Optional[tuple[str, CachedResponse]]:
+        points = self.client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            query_filter=models.Filter(
+                must=[
+                    models.FieldCondition(key="category", match=models.MatchValue(value=category)),
+                    models.FieldCondition(key="generation", match=models.MatchValue(value=generation)),
+                ]
+            ),
+            limit=1,
+            score_threshold=threshold,
+            with_payload=True,
+        ).points
+        if not points:
+            return None
+
+        payload = dict(points[0].payload)
+        payload.pop("last_used_at", None)
+        return str(points[0].id), CachedResponse(**payload)
+
+    def add(self, vector: list[float], entry: CachedResponse) -> int:
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                models.PointStruct(
+                    id=str(uuid4()),
+                    vector=vector,
+                    payload={**asdict(entry), "last_used_at": entry.created_at},
+                )
+            ],
+        )
+
+        excess = self.client.count(self.collection_name, exact=True).count - self.max_entries
+        if excess <= 0:
+            return 0
+
+        oldest, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            limit=excess,
+            order_by=models.OrderBy(key="last_used_at", direction=models.Direction.ASC),
+            with_payload=False,
+        )
+        self.client.delete(self.collection_name, points_selector=[point.id for point in oldest])
+        return len(oldest)
+
+    def touch(self, entry_id: str) -> None:
+        self.client.set_payload(
+            collection_name=self.collection_name,
+            payload={"last_used_at": time.time()},
+            points=[entry_id],
+        )
+
+    def remove(self, entry_id: str) -> None:
+        self.client.delete(self.collection_name, points_selector=[entry_id])
+
+    def clear(self, keep_generation: Optional[int] = None) -> None:
+        """Delete cached entries, keeping those of `keep_generation` (written by other workers) if given."""
+        keep = (
+            [models.FieldCondition(key="generation", match=models.MatchValue(value=keep_generation))]
+            if keep_generation is not None
+            else []
+        )
+        self.client.delete(
+            self.collection_name,
+            points_selector=models.FilterSelector(filter=models.Filter(must_not=keep)),
+        )
+
+
+class SemanticCacheStats:
+    """Thread-safe hit/miss and latency counters of the semantic cache."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.lookup_seconds = 0.0
+        self.hit_response_seconds = 0.0
+        self.miss_response_seconds = 0.0
+
+    def record_lookup(self, hit: bool, seconds: float) -> None:
+        with self._lock:
+            self.hits += int(hit)
+            self.misses += int(not hit)
+            self.lookup_seconds += seconds
+
+    def record_response(self, hit: bool, seconds: float) -> None:
+        """Record the end-to-end latency of a department response served with or without the cache."""
+        with self._lock:
+            if hit:
+                self.hit_response_seconds += seconds
+            else:
+                self.miss_response_seconds += seconds
+
+    def increment(self, counter: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "avg_lookup_ms": 1000 * self.lookup_seconds / lookups if lookups else 0.0,
+                "avg_hit_response_ms": 1000 * self.hit_response_seconds / self.hits if self.hits else 0.0,
+                "avg_miss_response_ms": 1000 * self.miss_response_seconds / self.misses if self.misses else 0.0,
+            }
+
+
+class SemanticResponseCache:
+    """Semantic cache of department responses keyed on (query embedding, query category).
+
+    A cached response is reused when a new query of the same category is at least
+    `similarity_threshold` similar to the cached one, the entry is younger than `ttl_seconds`
+    and the knowledge base has not been re-ingested since it was stored.
+
+    Args:
+        embedding: Embedding model used for the query vectors.
+        backend: Storage backend (in-process or Qdrant).
+        similarity_threshold: Minimum cosine similarity for a hit.
+        ttl_seconds: Maximum age of a cached response.
+        generation_source: Returns the current knowledge base generation; entries of an older
+            generation are invalidated.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        backend: CacheBackend,
+        similarity_threshold: float = settings.SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+        ttl_seconds: float = settings.SEMANTIC_CACHE_TTL_SECONDS,
+        generation_source: Optional[Callable[[], int]] = None,
+    ) -> None:
+        self.embedding = embedding
+        self.backend = backend
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.generation_source = generation_source
+        self.stats = SemanticCacheStats()
+        self._generation: Optional[int] = None
+
+    def lookup(self, query: str, category: str) -> CacheLookup:
+        start = time.perf_counter()
+        lookup = CacheLookup(query=query, category=category, vector=self.embedding.embed_query(query))
+        self._resolve(lookup)
+        self.stats.record_lookup(lookup.hit, time.perf_counter() - start)
+        return lookup
+
+    async def alookup(self, query: str, category: str) -> CacheLookup:
+        """Async variant of lookup: the query is embedded without blocking the event loop and the
+        backend search runs in a worker thread."""
+        start = time.perf_counter()
+        lookup = CacheLookup(query=query, category=category, vector=await self.embedding.aembed_query(query))
+        await asyncio.to_thread(self._resolve, lookup)
+        self.stats.record_lookup(lookup.hit, time.perf_counter() - start)
+        return lookup
+
+    def _resolve(self, lookup: CacheLookup) -> None:
+        generation = self._current_generation()
+        found = self.backend.search(lookup.vector, lookup.category, self.similarity_threshold, generation)
+        if found is not None:
+            entry_id, entry = found
+            if time.time() - entry.created_at > self.ttl_seconds:
+                self.backend.remove(entry_id)
+                self.stats.increment("expirations")
+            else:
+                self.backend.touch(entry_id)
+                lookup.entry = entry
+
+    def store(self, lookup: CacheLookup, response: str, retrieved_content: str) -> None:
+        """Store the response generated for a missed lookup."""
+        entry = CachedResponse(
+            query=lookup.query,
+            category=lookup.category,
+            response=response,
+            retrieved_content=retrieved_content,
+            created_at=time.time(),
+            generation=self._current_generation(),
+        )
+        evicted = self.backend.add(lookup.vector, entry)
+        self.stats.increment("stores")
+        self.stats.increment("evictions", evicted)
+
+    async def astore(self, lookup: CacheLookup, response: str, retrieved_content: str) -> None:
+        await asyncio.to_thread(self.store, lookup, response, retrieved_content)
+
+    def invalidate(self) -> None:
+        """Drop every cached response."""
+        self.backend.clear()
+        self.stats.increment("invalidations")
+
+    def _current_generation(self) -> int:
+        if self.generation_source is None:
+            return 0
+
+        generation = self.generation_source()
+        if self._generation is not None and generation != self._generation:
+            logger.info(f"Knowledge base generation changed to {generation}, invalidating the semantic cache")
+            self.backend.clear(keep_generation=generation)
+            self.stats.increment("invalidations")
+        self._generation = generation
+        return generation
+
+
+def build_semantic_cache(vector_store) -> Optional[SemanticResponseCache]:
+    """Create the semantic cache configured in the settings on top of a QdrantManager.
+
+    Returns:
+        SemanticResponseCache | None: The cache, or None when it is disabled.
+    """
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    if vector_store.embedding is None:
+        # Keying the cache would embed every query, the API call sparse-only retrieval avoids
+        logger.info("Semantic response cache disabled: the sparse-only knowledge base has no dense embedding model")
+        return None
+
+    if settings.SEMANTIC_CACHE_BACKEND == "qdrant":
+        client = (
+            QdrantClient(path=str(settings.SEMANTIC_CACHE_QDRANT_PATH))
+            if settings.SEMANTIC_CACHE_QDRANT_PATH
+            # The embedded knowledge base index has no Qdrant client to share
+            else getattr(vector_store, "client", None)
+            or QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+        )
+        backend = QdrantCacheBackend(
+            client=client,
+            collection_name=settings.SEMANTIC_CACHE_COLLECTION,
+            vector_size=vector_store.vector_size,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        )
+    else:
+        backend = InMemoryCacheBackend(max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES)
+
+    return SemanticResponseCache(
+        embedding=vector_store.embedding,
+        backend=backend,
+        generation_source=vector_store.get_generation,
+    )
+
+
+def _normalise(vector: list[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    return array / max(float(np.linalg.norm(array)), 1e-12)
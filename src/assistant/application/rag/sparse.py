@@ -0,0 +1,155 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from langchain_qdrant import SparseEmbeddings, SparseVector
+from loguru import logger
+
+from assistant.config import settings
+
+# Keeps identifiers such as order numbers, error codes and file names in one token ("ord-10293", "0x80070005")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it my of on or our please "
+    "should so that the their there this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25SparseEmbeddings(SparseEmbeddings):
+    """Fully local BM25 sparse encoder, usable as the `sparse_embedding` of QdrantVectorStore.
+
+    Documents are encoded with the BM25 term-frequency saturation and length normalisation, queries
+    with the inverse document frequency of their terms, so the sparse dot product Qdrant computes
+    is the BM25 score. The vocabulary and the corpus statistics are built at ingest time with
+    `fit` and saved next to the other artifacts. The vocabulary only grows, so the indices of
+    vectors already stored stay valid across incremental ingestions.
+
+    Args:
+        path: Location of the vocabulary file, reloaded when another process rewrites it.
+        k1: BM25 term frequency saturation.
+        b: BM25 document length normalisation.
+    """
+
+    def __init__(self, path: Optional[Path] = None, k1: float = 1.2, b: float = 0.75) -> None:
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: dict[str, int] = {}
+        self.document_frequencies: dict[str, int] = {}
+        self.documents = 0
+        self.average_length = 0.0
+        self._lock = threading.Lock()
+        self._loaded_mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+        if path is not None and path.exists():
+            self._load()
+
+    def fit(self, texts: list[str]) -> "BM25SparseEmbeddings":
+        """Rebuild the corpus statistics from the whole knowledge base, extending the vocabulary."""
+        tokenized = [tokenize(text) for text in texts]
+        document_frequencies: Counter[str] = Counter()
+        for tokens in tokenized:
+            document_frequencies.update(set(tokens))
+
+        with self._lock:
+            for token in sorted(document_frequencies):
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+            self.document_frequencies = dict(document_frequencies)
+            self.documents = len(tokenized)
+            self.average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) if tokenized else 0.0
+
+        logger.info(f"BM25 vocabulary fitted on {self.documents} documents ({len(self.vocabulary)} terms)")
+        return self
+
+    def save(self, path: Optional[Path] = None) -> None:
+        path = path or self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            state = {
+                "k1": self.k1,
+                "b": self.b,
+                "documents": self.documents,
+                "average_length": self.average_length,
+                "vocabulary": self.vocabulary,
+                "document_frequencies": self.document_frequencies,
+            }
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(state))
+        temporary.replace(path)
+        if path == self.path:
+            self._loaded_mtime = path.stat().st_mtime
+
+    def embed_documents(self, texts: list[str]) -> list[SparseVector]:
+        self._reload_if_changed()
+        return [self._encode_document(text) for text in texts]
+
+    def embed_query(self, text: str) -> SparseVector:
+        self._reload_if_changed()
+        weights: dict[int, float] = {}
+        for token in set(tokenize(text)):
+            index = self.vocabulary.get(token)
+            if index is not None:
+                weights[index] = self._idf(token)
+        return SparseVector(indices=list(weights), values=list(weights.values()))
+
+    # Encoding is pure CPU work in the microsecond range, not worth a thread hop
+    async def aembed_documents(self, texts: list[str]) -> list[SparseVector]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> SparseVector:
+        return self.embed_query(text)
+
+    def _encode_document(self, text: str) -> SparseVector:
+        tokens = tokenize(text)
+        length_norm = 1 - self.b + self.b * len(tokens) / self.average_length if self.average_length else 1.0
+        weights: dict[int, float] = {}
+        for token, frequency in Counter(tokens).items():
+            index = self.vocabulary.get(token)
+            if index is not None:
+                weights[index] = frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return SparseVector(indices=list(weights), values=list(weights.values()))
+
+    def _idf(self, token: str) -> float:
+        frequency = self.document_frequencies.get(token, 0)
+        return math.log(1 + (self.documents - frequency + 0.5) / (frequency + 0.5))
+
+    def _load(self) -> None:
+        state = json.loads(self.path.read_text())
+        with self._lock:
+            self.k1, self.b = state["k1"], state["b"]
+            self.documents = state["documents"]
+            self.average_length = state["average_length"]
+            self.vocabulary = state["vocabulary"]
+            self.document_frequencies = state["document_frequencies"]
+            self._loaded_mtime = self.path.stat().st_mtime
+
+    def _reload_if_changed(self, max_age: float = settings.QDRANT_GENERATION_REFRESH_SECONDS) -> None:
+        """Pick up a vocabulary rewritten by an ingestion, checking the file at most every `max_age` seconds."""
+        now = time.monotonic()
+        if self.path is None or now - self._checked_at < max_age:
+            return
+        self._checked_at = now
+        if self.path.exists() and self.path.stat().st_mtime != self._loaded_mtime:
+            self._load()
+            logger.info(f"Reloaded BM25 vocabulary from {self.path} ({len(self.vocabulary)} terms)")
+
+
+@lru_cache(maxsize=None)
+def get_sparse_embedding_model(path: Optional[Path] = settings.SPARSE_VOCABULARY_PATH) -> BM25SparseEmbeddings:
+    """Process-wide BM25 encoder backed by the vocabulary written at ingest time."""
+    model = BM25SparseEmbeddings(path=path)
+    if not model.vocabulary:
+        logger.warning(f"BM25 vocabulary not found at {path}. Run the ingestion to build it.")
+    return model
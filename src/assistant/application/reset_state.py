@@ -1,53 +1,89 @@
+from datetime import datetime
+
 from loguru import logger
-from pymongo import MongoClient
 
-from assistant.config import settings
+from assistant.application.state_retention import state_store
 
 
 async def reset_conversation_state() -> dict:
     """Deletes all conversation state data from MongoDB.
 
     This function removes all stored conversation checkpoints and writes,
-    effectively resetting all philosopher conversations.
+    effectively resetting all conversations. The collections are renamed away
+    and recreated empty at once; the old ones are dropped in the background,
+    so turns in progress are not blocked.
 
     Returns:
         dict: Status message indicating success or failure with details
-              about which collections were deleted
+              about which collections were deleted and their approximate
+              checkpoint and write counts
 
     Raises:
         Exception: If there's an error connecting to MongoDB or deleting collections
     """
     try:
-        client = MongoClient(settings.MONGO_URI)
-        db = client[settings.MONGO_DB_NAME]
-
-        collections_deleted = []
-
-        if settings.MONGO_STATE_CHECKPOINT_COLLECTION in db.list_collection_names():
-            db.drop_collection(settings.MONGO_STATE_CHECKPOINT_COLLECTION)
-            collections_deleted.append(settings.MONGO_STATE_CHECKPOINT_COLLECTION)
-            logger.info(
-                f"Deleted collection: {settings.MONGO_STATE_CHECKPOINT_COLLECTION}"
-            )
-
-        if settings.MONGO_STATE_WRITES_COLLECTION in db.list_collection_names():
-            db.drop_collection(settings.MONGO_STATE_WRITES_COLLECTION)
-            collections_deleted.append(settings.MONGO_STATE_WRITES_COLLECTION)
-            logger.info(f"Deleted collection: {settings.MONGO_STATE_WRITES_COLLECTION}")
+        result = await state_store.awipe()
 
-        client.close()
-
-        if collections_deleted:
+        if result["collections"]:
             return {
                 "status": "success",
-                "message": f"Successfully deleted collections: {', '.join(collections_deleted)}",
+                "message": f"Successfully deleted collections: {', '.join(result['collections'])}",
+                **result,
             }
         else:
             return {
                 "status": "success",
                 "message": "No collections needed to be deleted",
+                **result,
             }
 
     except Exception as e:
         logger.error(f"Failed to reset conversation state: {str(e)}")
-        raise Exception(f"Failed to reset conversation state: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to reset conversation state: {str(e)}")
+
+
+async def reset_conversations(
+    user_id: str | None = None,
+    thread_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> dict:
+    """Deletes the conversation state of one user, one thread or a time range.
+
+    The criteria combine: a user_id with since deletes what the user said
+    after that time. Other conversations are left untouched.
+
+    Args:
+        user_id: Delete the conversation threads of this user.
+        thread_id: Delete this conversation thread.
+        since: Delete checkpoints created at or after this time (UTC when naive).
+        until: Delete checkpoints created before this time (UTC when naive).
+
+    Returns:
+        dict: Status message with the number of checkpoints and writes deleted
+
+    Raises:
+        ValueError: If no criterion is given
+        Exception: If there's an error deleting the conversation state
+    """
+    if user_id is None and thread_id is None and since is None and until is None:
+        raise ValueError("Give a user_id, thread_id, since or until to reset")
+    scope = ", ".join(
+        f"{name}={value}"
+        for name, value in (("user_id", user_id), ("thread_id", thread_id), ("since", since), ("until", until))
+        if value is not None
+    )
+    try:
+        result = await state_store.areset(user_id=user_id, thread_id=thread_id, since=since, until=until)
+        logger.info(
+            f"Reset conversation state ({scope}): deleted {result['checkpoints_deleted']} checkpoints "
+            f"and {result['writes_deleted']} writes"
+        )
+        return {
+            "status": "success",
+            "message": f"Deleted {result['checkpoints_deleted']} checkpoints matching {scope}",
+            **result,
+        }
+    except Exception as e:
+        logger.error(f"Failed to reset conversation state ({scope}): {str(e)}")
+        raise Exception(f"Failed to reset conversation state: {str(e)}")
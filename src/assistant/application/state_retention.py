@@ -0,0 +1,67 @@
+from loguru import logger
+
+from assistant.config import settings
+from assistant.infrastructure.mongdb.checkpointer import AsyncMongoDBSaver
+
+# The saver of the process. With MONGO_ASYNC_CHECKPOINTER the graph checkpoints through this very
+# instance, so resets, wipes and compaction see and discard its buffered writes; otherwise it works
+# on the documents of MongoDBSaver, which have the same format.
+state_store = AsyncMongoDBSaver(
+    keep_last=settings.CHECKPOINT_KEEP_LAST or None,
+    ttl=settings.CHECKPOINT_TTL_SECONDS,
+)
+
+
+async def get_conversation_state_stats(top: int = 10) -> dict:
+    """Reports the storage used by the conversation state and its distribution over threads.
+
+    Args:
+        top: Number of threads with the most checkpoints to list.
+
+    Returns:
+        dict: Document count and sizes of the checkpoint and writes collections, the number of
+              threads, checkpoints per thread and the retention settings.
+
+    Raises:
+        Exception: If there's an error reading the collection statistics
+    """
+    try:
+        return await state_store.astats(top=top)
+    except Exception as e:
+        logger.error(f"Failed to collect conversation state statistics: {str(e)}")
+        raise Exception(f"Failed to collect conversation state statistics: {str(e)}")
+
+
+async def compact_conversation_state(keep_last: int | None = None) -> dict:
+    """Deletes all but the newest checkpoints of every conversation thread.
+
+    Args:
+        keep_last: Checkpoints kept per thread. Defaults to CHECKPOINT_KEEP_LAST.
+
+    Returns:
+        dict: Status message with the number of threads compacted and checkpoints deleted
+
+    Raises:
+        Exception: If there's an error compacting the checkpoints
+    """
+    keep_last = keep_last or settings.CHECKPOINT_KEEP_LAST
+    if not keep_last:
+        return {"status": "success", "message": "Retention is disabled (CHECKPOINT_KEEP_LAST=0)"}
+    try:
+        result = await state_store.acompact(keep_last=keep_last)
+        logger.info(
+            f"Compacted {result['threads']} conversation threads, deleted {result['checkpoints_deleted']} checkpoints"
+        )
+        return {
+            "status": "success",
+            "message": f"Kept the last {keep_last} checkpoints of {result['threads']} threads",
+            **result,
+        }
+    except Exception as e:
+        logger.error(f"Failed to compact conversation state: {str(e)}")
+        raise Exception(f"Failed to compact conversation state: {str(e)}")
+
+
+async def close_state_store() -> None:
+    """Waits for the background work of the state store, such as dropping wiped collections."""
+    await state_store.aclose()
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from loguru import logger
 from pydantic import Field, field_validator
@@ -37,17 +38,205 @@ class Settings(BaseSettings):
         default="chatbot",
         description="Name of the MongoDB database.",
     )
+    MONGO_MAX_POOL_SIZE: int = Field(
+        default=50,
+        description="Connections of the MongoDB pool shared by the process (one pool per URI, per event loop "
+        "for the async client).",
+    )
+    MONGO_MIN_POOL_SIZE: int = Field(
+        default=0,
+        description="Connections the shared MongoDB pool keeps open while idle.",
+    )
+    MONGO_MAX_IDLE_TIME_MS: int = Field(
+        default=300_000,
+        description="Idle time after which a pooled MongoDB connection is closed.",
+    )
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = Field(
+        default=10_000,
+        description="Time a MongoDB operation waits for a free pooled connection before failing.",
+    )
+    MONGO_BATCH_SIZE: int = Field(
+        default=1000,
+        description="Documents fetched per cursor round trip and written per bulk write chunk by MongoClientWrapper.",
+    )
     MONGO_STATE_CHECKPOINT_COLLECTION: str = "assistant_state_checkpoints"
     MONGO_STATE_WRITES_COLLECTION: str = "assistant_state_writes"
     MONGO_LONG_TERM_MEMORY_COLLECTION: str = "assistant_long_term_memory"
+    MONGO_ASYNC_CHECKPOINTER: bool = Field(
+        default=True,
+        description="Keep the conversation state with the native async checkpointer (AsyncMongoClient, "
+        "coalesced writes) instead of MongoDBSaver, which runs blocking pymongo calls in a thread pool.",
+    )
+    CHECKPOINT_KEEP_LAST: int = Field(
+        default=20,
+        description="Checkpoints kept per conversation thread; the async checkpointer prunes older ones when a "
+        "turn starts, /compact-memory prunes every thread. 0 keeps them all.",
+    )
+    CHECKPOINT_TTL_SECONDS: int | None = Field(
+        default=None,
+        description="Expire checkpoints and writes this many seconds after they are written (TTL indexes), "
+        "which removes threads idle for that long. None keeps them.",
+    )
+    CHECKPOINT_DURABILITY: Literal["sync", "async", "exit"] = Field(
+        default="async",
+        description="When the conversation state is persisted: before every graph step ('sync'), while the "
+        "next step runs ('async') or once at the end of the turn ('exit').",
+    )
 
     # --- Agents Configuration ---
-    TOTAL_MESSAGES_SUMMARY_TRIGGER: int = 30
-    TOTAL_MESSAGES_AFTER_SUMMARY: int = 5
+    TOTAL_MESSAGES_SUMMARY_TRIGGER: int = Field(
+        default=30,
+        description="Messages of a conversation thread that trigger folding the older ones into a running "
+        "summary after the reply; 0 disables summarization.",
+    )
+    TOTAL_MESSAGES_AFTER_SUMMARY: int = Field(
+        default=5,
+        description="Most recent messages kept verbatim in the conversation context after a summarization.",
+    )
+    GRAPH_ASYNC_NODES: bool = Field(
+        default=True,
+        description="Run the native async graph nodes on the event loop instead of the sync nodes in a thread pool.",
+    )
+    WS_STREAM_FLUSH_CHARS: int = Field(
+        default=48,
+        description="Characters of a streamed answer buffered into one websocket frame; 0 sends every chunk.",
+    )
+    WS_STREAM_FLUSH_MS: float = Field(
+        default=25, description="Maximum time a streamed chunk waits to be coalesced with the next ones."
+    )
+    WS_STREAM_MAX_PENDING_CHUNKS: int = Field(
+        default=512, description="Capacity of the buffer between the graph stream and a websocket."
+    )
+    WS_SLOW_CONSUMER_POLICY: Literal["block", "disconnect"] = Field(
+        default="disconnect",
+        description="When the buffer is full, pause the graph stream ('block') or close the socket after "
+        "WS_SLOW_CONSUMER_TIMEOUT_SECONDS ('disconnect').",
+    )
+    WS_SLOW_CONSUMER_TIMEOUT_SECONDS: float = Field(
+        default=30, description="How long a websocket may leave its buffer full under the 'disconnect' policy."
+    )
+    WS_MAX_CONCURRENT_REQUESTS: int = Field(
+        default=4, description="Messages with a request_id answered concurrently on one /ws/chat connection."
+    )
+    WS_DEFAULT_ENCODING: Literal["json", "msgpack"] = Field(
+        default="json", description="Frame encoding of /ws/chat when the client does not pass ?encoding=."
+    )
+    SPECULATIVE_RETRIEVAL: bool = Field(
+        default=False,
+        description="Start the department retrievals as soon as a query arrives, concurrently with classification, "
+        "and keep only the one of the chosen department. Needs GRAPH_ASYNC_NODES.",
+    )
+    SPECULATIVE_RETRIEVAL_MAX_AGE_SECONDS: float = Field(
+        default=60, description="Speculative retrievals not claimed within this time are cancelled."
+    )
+    LLM_MAX_IN_FLIGHT: int = Field(
+        default=32,
+        description="Maximum number of concurrent LLM calls in the process.",
+    )
+    LLM_MAX_QUEUED: int = Field(
+        default=256,
+        description="Maximum number of LLM calls waiting for a free slot before new calls are rejected.",
+    )
+    CLASSIFICATION_MODE: Literal["sequential", "fused", "cascade"] = Field(
+        default="fused",
+        description=(
+            "'fused' classifies category and sentiment in one LLM call, 'sequential' uses two, "
+            "'cascade' answers locally when confident and falls back to the LLM otherwise."
+        ),
+    )
+
+    # --- Ingestion Configuration ---
+    INGESTION_BATCH_SIZE: int = Field(
+        default=64, description="Documents embedded and upserted per ingestion batch."
+    )
+    INGESTION_MAX_CONCURRENCY: int = Field(
+        default=4, description="Maximum number of ingestion batches in flight at once."
+    )
+
+    # --- Cascade Classifier Configuration ---
+    CLASSIFIER_CENTROIDS_PATH: Path = Field(
+        default=Path("artifacts/department_centroids.npz"),
+        description="Per-department embedding model built from the knowledge base at ingest time.",
+    )
+    CLASSIFIER_STRATEGY: Literal["centroid", "knn"] = Field(
+        default="centroid",
+        description="Score departments by centroid similarity or by mean similarity of the nearest neighbours.",
+    )
+    CLASSIFIER_KNN_K: int = Field(
+        default=5, description="Neighbours per department used by the 'knn' strategy."
+    )
+    CLASSIFIER_CATEGORY_MARGIN: float = Field(
+        default=0.04,
+        description="Minimum gap between the best and second best department score to skip the LLM.",
+    )
+    CLASSIFIER_MIN_SIMILARITY: float = Field(
+        default=0.35,
+        description="Minimum best department score; below it the query is treated as out of domain (e.g. GENERAL).",
+    )
+    CLASSIFIER_SENTIMENT_MARGIN: float = Field(
+        default=0.6,
+        description="Minimum lexicon polarity (|pos - neg| / (pos + neg)) to skip the LLM for sentiment.",
+    )
 
     # --- RAG Configuration ---
     RAG_TEXT_EMBEDDING_MODEL_ID: str = "text-embedding-3-small"
     RAG_TOP_K: int = 3
+    RAG_EMBEDDING_DIMENSIONS: int | None = Field(
+        default=None,
+        description="Dimensions requested from the embedding model (text-embedding-3 models support shortening). "
+        "None uses the model's native size.",
+    )
+    RAG_SHORTLIST_DIMENSIONS: int | None = Field(
+        default=None,
+        description="Enables two-stage search: candidates are shortlisted on this many leading dimensions of "
+        "the embedding, then rescored on the full vector. None searches the full vector directly.",
+    )
+    RAG_SHORTLIST_SIZE: int = Field(
+        default=50, description="Candidates kept by the low-dimension shortlist stage of two-stage search."
+    )
+
+    # --- Semantic Response Cache Configuration ---
+    SEMANTIC_CACHE_ENABLED: bool = Field(
+        default=True, description="Serve department responses for near-duplicate queries from a cache."
+    )
+    SEMANTIC_CACHE_BACKEND: Literal["memory", "qdrant"] = Field(
+        default="memory", description="Keep cached responses in-process or in a Qdrant collection."
+    )
+    SEMANTIC_CACHE_COLLECTION: str = Field(
+        default="customer_support_response_cache",
+        description="Qdrant collection used by the 'qdrant' cache backend.",
+    )
+    SEMANTIC_CACHE_QDRANT_PATH: Path | None = Field(
+        default=None,
+        description="Optional local (embedded) Qdrant path for the cache. Uses the main Qdrant instance if unset.",
+    )
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD: float = Field(
+        default=0.95, description="Minimum cosine similarity between queries to reuse a cached response."
+    )
+    SEMANTIC_CACHE_TTL_SECONDS: float = Field(
+        default=24 * 3600, description="Maximum age of a cached response."
+    )
+    SEMANTIC_CACHE_MAX_ENTRIES: int = Field(
+        default=5000, description="Maximum number of cached responses; least recently used ones are evicted."
+    )
+
+    # --- Retrieval Cache Configuration ---
+    RETRIEVAL_CACHE_ENABLED: bool = Field(
+        default=True, description="Serve repeated knowledge base searches (same query, filter and k) from a cache."
+    )
+    RETRIEVAL_CACHE_PATH: Path | None = Field(
+        default=Path("artifacts/retrieval_cache.sqlite3"),
+        description="SQLite file backing the shared tier, used by all worker processes (None for memory only).",
+    )
+    RETRIEVAL_CACHE_MEMORY_SIZE: int = Field(
+        default=2000, description="Number of search results kept in the in-process LRU tier."
+    )
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = Field(
+        default=50_000, description="Number of search results kept in the shared tier; the oldest are evicted."
+    )
+    RETRIEVAL_CACHE_TTL_SECONDS: float = Field(
+        default=3600, description="Maximum age of a cached search result."
+    )
 
     # --- MongoDB Atlas Configuration ---
     QDRANT_DATABASE_NAME: str = Field(
@@ -66,6 +255,69 @@ class Settings(BaseSettings):
         default=None,
         description="API key for QdrantDB service authentication.",
     )
+    QDRANT_PREFER_GRPC: bool = Field(
+        default=False, description="Use gRPC instead of REST for the async Qdrant client."
+    )
+    QDRANT_GRPC_PORT: int = Field(default=6334, description="gRPC port of the Qdrant server.")
+    QDRANT_POOL_SIZE: int | None = Field(
+        default=64,
+        description="Connections (REST) or channels (gRPC) in the shared async Qdrant client pool.",
+    )
+    VECTOR_BACKEND: Literal["qdrant", "mmap"] = Field(
+        default="qdrant",
+        description="Knowledge base store: the Qdrant server, or the in-process memory-mapped index built by the ingestion.",
+    )
+    MMAP_INDEX_PATH: Path = Field(
+        default=Path("artifacts/knowledge_base_index"),
+        description="Artifact directory of the memory-mapped knowledge base index.",
+    )
+    MMAP_INDEX_DTYPE: Literal["float32", "float16"] = Field(
+        default="float32",
+        description="Storage precision of the memory-mapped index; float16 halves its size.",
+    )
+    RETRIEVAL_MODE: Literal["dense", "sparse", "hybrid"] = Field(
+        default="dense",
+        description="Knowledge base retrieval: 'dense' embeds queries with OpenAI, 'sparse' uses the local "
+        "BM25 encoder only (no embedding API call) and 'hybrid' fuses both with reciprocal rank fusion.",
+    )
+    SPARSE_VOCABULARY_PATH: Path = Field(
+        default=Path("artifacts/bm25_vocabulary.json"),
+        description="BM25 vocabulary and corpus statistics written by the ingestion.",
+    )
+    QDRANT_PAYLOAD_INDEXES: list[str] = Field(
+        default=["source"],
+        description="Document metadata fields given a keyword payload index, i.e. the fields used in search filters.",
+    )
+    QDRANT_PARTITION_FIELD: str | None = Field(
+        default=None,
+        description="Metadata field whose values each get their own collection, e.g. 'source' for one "
+        "collection per department. None keeps the whole knowledge base in a single collection.",
+    )
+    QDRANT_QUANTIZATION: Literal["none", "scalar", "binary"] = Field(
+        default="none",
+        description="Quantization of the dense vectors: 'scalar' (int8, 4x smaller) or 'binary' (32x smaller).",
+    )
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = Field(
+        default=True, description="Keep the quantized vectors in RAM even when the originals are on disk."
+    )
+    QDRANT_VECTORS_ON_DISK: bool = Field(
+        default=False,
+        description="Store the original float32 vectors on disk (memory-mapped) instead of in RAM.",
+    )
+    QDRANT_SEARCH_RESCORE: bool = Field(
+        default=True, description="Rescore quantized search candidates with the original vectors."
+    )
+    QDRANT_SEARCH_OVERSAMPLING: float = Field(
+        default=2.0,
+        description="Candidates fetched from the quantized index per requested result before rescoring.",
+    )
+    QDRANT_HNSW_EF: int | None = Field(
+        default=None, description="HNSW search beam size; None uses the collection default."
+    )
+    QDRANT_GENERATION_REFRESH_SECONDS: float = Field(
+        default=10.0,
+        description="How long a worker trusts its cached knowledge base generation before re-reading it.",
+    )
     COLLECTION_NAME: str = Field(
         default="customer_support_klnowledge_base",
         description="Name of the Qdrant collection for embeddings.",
@@ -86,6 +338,16 @@ class Settings(BaseSettings):
         default="text-embedding-3-small",
         description="Embedding model identifier for OpenAI embeddings.",
     )
+    EMBEDDING_CACHE_ENABLED: bool = Field(
+        default=True, description="Cache embeddings in memory and on disk to skip repeated API calls."
+    )
+    EMBEDDING_CACHE_PATH: Path | None = Field(
+        default=Path("artifacts/embedding_cache.sqlite3"),
+        description="SQLite file backing the on-disk tier, shared by all worker processes (None for memory only).",
+    )
+    EMBEDDING_CACHE_MEMORY_SIZE: int = Field(
+        default=10_000, description="Number of vectors kept in the in-process LRU tier."
+    )
 
     # --- Opik / Observability ---
     OPIK_API_KEY: str | None = Field(default=None, description="API key for Opik.")
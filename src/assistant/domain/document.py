@@ -7,6 +7,29 @@ from pydantic import BaseModel, Field
 from assistant import utils
 from langchain_core.documents import Document
 
+# Maps the raw `category` field of the knowledge base entries onto the departments
+# used for routing (see QueryCategory). Every department has exactly one knowledge base file.
+KNOWLEDGE_BASE_DEPARTMENTS: Dict[str, str] = {
+    "HR": "HR",
+    "IT Support": "IT_SUPPORT",
+    "Facilities & Admin": "FACILITY_AND_ADMIN",
+    "Billing & Payment (External)": "BILLING_AND_PAYMENT",
+    "Shipping & Delivery (External)": "SHIPPING_AND_DELIVERY",
+    "Shipping & Payment (External)": "SHIPPING_AND_DELIVERY",
+}
+
+
+def department_for_category(raw_category: str) -> str:
+    """
+    Returns the routing department for a raw knowledge base category.
+
+    Unknown categories fall back to the previous cleaning rule (spaces -> underscores, '&' -> 'and').
+    """
+    return KNOWLEDGE_BASE_DEPARTMENTS.get(
+        raw_category, raw_category.replace(" ", "_").replace("&", "and")
+    )
+
+
 def read_all_json_files(folder_path: str) -> List[Dict[str, Any]]:
     """
     Reads all JSON files in the specified folder and returns a list of dictionaries
@@ -38,7 +61,8 @@ def create_documents_from_knowledge_base(knowledge_base):
     
     Each document will have:
     - `page_content`: from the 'doc' field
-    - `metadata`: 'source' field derived from the 'category' field (spaces -> underscores, '&' -> 'and')
+    - `metadata`: 'source' field set to the lowercased routing department of the 'category' field
+      (e.g. 'IT Support' -> 'it_support'), matching the filters used by generate_department_response
 
     Args:
         knowledge_base (list): A list of lists, where each inner list contains dictionaries with
@@ -53,7 +77,7 @@ def create_documents_from_knowledge_base(knowledge_base):
         for doc in data_collection:
             if 'doc' in doc and 'category' in doc:
                 raw_metadata = doc['category']
-                cleaned_metadata = raw_metadata.replace(" ", "_").replace("&", "and")
+                cleaned_metadata = department_for_category(raw_metadata).lower()
                 content = doc['doc']
                 
                 processed_docs.append(
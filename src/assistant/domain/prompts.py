@@ -81,6 +81,9 @@ _RESPONSE_PROMPT = ChatPromptTemplate.from_template(
 
         Apologies I was not able to answer your question, please reach out to +1-xxx-xxxx
 
+        Conversation so far:
+        {conversation}
+
         Customer Query:
         {customer_query}
 
@@ -94,6 +97,49 @@ RESPONSE_PROMPT = Prompt(
     prompt=_RESPONSE_PROMPT,
 )
 
+_GENERAL_RESPONSE_PROMPT = ChatPromptTemplate.from_template(
+        """You are a friendly customer support assistant for ShopUNow, a retail company.
+
+        Respond to the following query in a warm, conversational manner.
+        Introduce yourself briefly and let them know you can help with:
+        - Human Resources (HR) queries
+        - IT Support questions
+        - Facility and Admin issues
+        - Billing and Payment matters
+        - Shipping and Delivery inquiries
+
+        Conversation so far:
+        {conversation}
+
+        Customer Query:
+        {customer_query}
+        """
+    )
+
+GENERAL_RESPONSE_PROMPT = Prompt(
+    name="general_response_prompt",
+    prompt=_GENERAL_RESPONSE_PROMPT,
+)
+
+_SUMMARY_PROMPT = """Summarize the conversation between a customer and the ShopUNow support assistant.
+                     Extend the existing summary with the new messages below. Keep every detail needed to
+                     continue the conversation: who the customer is, what they asked for, order, ticket or
+                     account details they gave, and what was answered or promised.
+
+                     Write concise prose of at most 200 words and return just the summary.
+
+                     Existing summary:
+                     {summary}
+
+                     New messages:
+                     {conversation}
+                  """
+
+SUMMARY_PROMPT = Prompt(
+    name="conversation_summary_prompt",
+    prompt=_SUMMARY_PROMPT,
+)
+
 
 _SENTIMENT_CATEGORY_PROMPT = """Act as a customer support agent trying to best categorize the customer query.
                                    You are a support agent for a retail company, ShopUNow focusing on providing various services to customers.
@@ -122,4 +168,47 @@ _SENTIMENT_CATEGORY_PROMPT = """Act as a customer support agent trying to best c
 SENTIMENT_CATEGORY_PROMPT = Prompt(
     name="sentiment_category_prompt",
     prompt=_SENTIMENT_CATEGORY_PROMPT,
-)
\ No newline at end of file
+)
+
+
+_CLASSIFY_INQUIRY_PROMPT = """Act as a customer support agent trying to best categorize the customer query.
+                                 You are a support agent for a retail company, ShopUNow and the focus of query classification
+                                 to build an Intelligent AI Assistant which can leverage internal company information to
+                                 answer both internal employee as well as external customer queries.
+
+                                 Please read the customer query below and determine two things at once:
+
+                                 1. The best category from the following list:
+
+                                 'HR', 'IT_SUPPORT', 'FACILITY_AND_ADMIN', 'BILLING_AND_PAYMENT', 'SHIPPING_AND_DELIVERY', 'GENERAL'
+
+                                 Remember:
+                                 HR - records centralize data covering their entire employment lifecycle: personal details, leave, compensation (expenses, bonuses, benefits), career progression (transfers, development), and adherence to company policies (e.g., health & safety, equal opportunities, social media). Essential for employee support and compliance.
+
+                                 IT_SUPPORT - records centralize data on technical assistance, equipment, and system access. This includes device management, network issues, IT security, software support, and all service requests, vital for employee productivity and a secure IT infrastructure.
+
+                                 FACILITY_AND_ADMIN - Facilities & Admin records cover workplace environment, safety protocols, and administrative support. This includes health & safety, premise maintenance, and external contractor coordination, ensuring a safe and functional work environment.
+
+                                 BILLING_AND_PAYMENT - records cover financial transactions, including invoices, order history, charges, refunds, payment methods, and billing disputes, as well as gift card and store credit balances.
+
+                                 SHIPPING_AND_DELIVERY - records cover product deliveries, including tracking, shipping history, order status, delivery options/costs, instructions, and resolution of lost, damaged, or incorrect shipments.
+
+                                 GENERAL - simple greetings, casual conversation, general questions that don't require specific department knowledge or support. Examples: "hi", "hello", "how are you", "what can you do", "tell me about yourself".
+
+                                 2. The sentiment of the query, which should be one from the following list:
+
+                                 'Positive', 'Neutral', 'Negative'
+
+                                 Remember these rules when finding the sentiment:
+                                   - 'Negative' happens only when the internal or external customer is not happy with certain products, information provided or services offered by the company
+
+                                 Return just the category name and the sentiment (each from one of the above)
+
+                                 Query:
+                                 {customer_query}
+                              """
+
+CLASSIFY_INQUIRY_PROMPT = Prompt(
+    name="classify_inquiry_prompt",
+    prompt=_CLASSIFY_INQUIRY_PROMPT,
+)
@@ -1,29 +1,74 @@
+import asyncio
 from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Awaitable
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 from opik.integrations.langchain import OpikTracer
 from pydantic import BaseModel
 
+from assistant.application.agents.limiter import LLMOverloadedError, llm_limiter
+from assistant.application.agents.speculation import speculative_executor
+from assistant.application.agents.nodes import cascade_classifier, response_cache, vector_store
+from assistant.application.rag.embeddings import get_embedding_cache
+from assistant.application.rag.retrieval_cache import CachedVectorStore
 from assistant.application.generate_response import (
+    close_checkpointer,
     get_response,
     get_streaming_response,
+    warm_up_workflow,
 )
 from assistant.application.reset_state import (
     reset_conversation_state,
+    reset_conversations,
+)
+from assistant.application.state_retention import (
+    close_state_store,
+    compact_conversation_state,
+    get_conversation_state_stats,
 )
 
+from assistant.infrastructure.metrics import metrics, requests_in_flight
+from assistant.infrastructure.mongdb.pool import mongo_clients
 from assistant.infrastructure.opik_utils import configure
+from assistant.infrastructure.ws_streaming import (
+    SLOW_CONSUMER_CLOSE_CODE,
+    CoalescingStreamSender,
+    FrameCodec,
+    MultiplexedChatSession,
+    SlowConsumerError,
+)
+from assistant.config import settings
 
 configure()
 
+metrics.gauge(
+    "assistant_llm_calls_in_flight",
+    "LLM calls holding a slot of the concurrency limiter.",
+    function=lambda: llm_limiter.snapshot()["in_flight"],
+)
+metrics.gauge(
+    "assistant_llm_calls_waiting",
+    "LLM calls queued for a slot of the concurrency limiter.",
+    function=lambda: llm_limiter.snapshot()["waiting"],
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles startup and shutdown events for the API."""
-    # Startup code (if any) goes here
+    # Compile the workflow graph once so requests only look it up
+    warm_up_workflow()
     yield
     # Shutdown code goes here
+    await close_checkpointer()
+    await close_state_store()
+    await mongo_clients.aclose()
+    mongo_clients.close()
+    await vector_store.aclose()
     opik_tracer = OpikTracer()
     opik_tracer.flush()
 
@@ -44,83 +89,233 @@ class ChatMessage(BaseModel):
     user_id: str
 
 
+class ResetScope(BaseModel):
+    user_id: str | None = None
+    thread_id: str | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+
+
+# Non-standard "Client Closed Request" status, logged for turns abandoned by the caller
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before its response was ready."""
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has been read; the next ASGI message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _unless_disconnected(request: Request, work: Awaitable[Any]) -> Any:
+    """Await `work`, cancelling it when the client disconnects first (e.g. its request timed out).
+
+    Raises:
+        ClientDisconnected: If the client disconnected before `work` finished.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if task.cancelled():
+        raise ClientDisconnected()
+    return task.result()
+
+
 @app.post("/chat")
-async def chat(chat_message: ChatMessage):
+async def chat(chat_message: ChatMessage, request: Request):
     try:
-        response, _ = await get_response(
-            messages=chat_message.message,
-            user_id=chat_message.user_id,
-        )
+        with requests_in_flight.track_inprogress(endpoint="chat"):
+            # A caller that gives up stops the graph run, so the LLM does not answer for nobody
+            response, _ = await _unless_disconnected(
+                request,
+                get_response(
+                    messages=chat_message.message,
+                    user_id=chat_message.user_id,
+                    background=True,
+                ),
+            )
         return {"response": response}
+    except ClientDisconnected:
+        logger.info(f"Client of user {chat_message.user_id} disconnected, its /chat turn was cancelled")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         opik_tracer = OpikTracer()
         opik_tracer.flush()
 
-        raise HTTPException(status_code=500, detail=str(e))
+        # Too many concurrent LLM calls: ask the client to retry instead of reporting a failure
+        status_code = 503 if isinstance(e.__cause__, LLMOverloadedError) else 500
+        raise HTTPException(status_code=status_code, detail=str(e))
 
 
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
+    # Frames are JSON text by default; ?encoding=msgpack switches the server frames to msgpack binary
+    try:
+        codec = FrameCodec(websocket.query_params.get("encoding", settings.WS_DEFAULT_ENCODING))
+    except ValueError as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
     await websocket.accept()
 
-    try:
-        while True:
-            data = await websocket.receive_json()
-
-            if "message" not in data or "user_id" not in data:
-                await websocket.send_json(
-                    {
-                        "error": "Invalid message format. Required fields: 'message' and 'user_id'"
-                    }
-                )
-                continue
-
-            try:
-                # Use streaming response instead of get_response
-                response_stream = get_streaming_response(
-                    messages=data["message"],
-                    user_id=data["user_id"],
-                )
-
-                # Send initial message to indicate streaming has started
-                await websocket.send_json({"streaming": True})
-
-                # Stream each chunk of the response
-                full_response = ""
-                async for chunk in response_stream:
-                    full_response += chunk
-                    await websocket.send_json({"chunk": chunk})
-
-                await websocket.send_json(
-                    {"response": full_response, "streaming": False}
-                )
-
-            except Exception as e:
-                opik_tracer = OpikTracer()
-                opik_tracer.flush()
-
-                await websocket.send_json({"error": str(e)})
+    async def answer(data, envelope):
+        # The envelope carries the request_id of multiplexed requests into every frame of the answer
+        if not isinstance(data, dict) or "message" not in data or "user_id" not in data:
+            await codec.send(
+                websocket,
+                {
+                    **envelope,
+                    "error": "Invalid message format. Required fields: 'message' and 'user_id'",
+                },
+            )
+            return
+
+        try:
+            # Use streaming response instead of get_response
+            response_stream = get_streaming_response(
+                messages=data["message"],
+                user_id=data["user_id"],
+                background=True,
+            )
+
+            # Send initial message to indicate streaming has started
+            await codec.send(websocket, {**envelope, "streaming": True})
+
+            # Stream the response in coalesced chunks through a bounded buffer
+            with requests_in_flight.track_inprogress(endpoint="ws_chat"):
+                full_response = await CoalescingStreamSender(websocket, codec).stream(response_stream, envelope)
+
+            await codec.send(
+                websocket, {**envelope, "response": full_response, "streaming": False}
+            )
+
+        except SlowConsumerError as e:
+            # The socket is shared by every request of the connection; the receive loop ends with it
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason=str(e))
+
+        except WebSocketDisconnect:
+            raise
+
+        except Exception as e:
+            opik_tracer = OpikTracer()
+            opik_tracer.flush()
+
+            await codec.send(websocket, {**envelope, "error": str(e)})
 
+    try:
+        await MultiplexedChatSession(websocket, codec, answer).run()
     except WebSocketDisconnect:
         pass
 
 
+@app.get("/stats")
+async def stats():
+    """Returns runtime counters of the assistant components.
+
+    Returns:
+        dict: Hit-rate and accuracy counters of the cascade classifier,
+            hit/miss/latency counters of the semantic response cache,
+            hit counters of the embedding and retrieval caches, usage counters of
+            speculative retrieval, in-flight/queue-time counters of the LLM
+            concurrency limiter and pool checkout/health counters of the shared
+            MongoDB clients.
+    """
+    return {
+        "llm_limiter": llm_limiter.snapshot(),
+        "classifier": cascade_classifier.stats.snapshot(),
+        "semantic_cache": response_cache.stats.snapshot() if response_cache else None,
+        "embedding_cache": get_embedding_cache().stats(),
+        "retrieval_cache": vector_store.cache.stats() if isinstance(vector_store, CachedVectorStore) else None,
+        "speculative_retrieval": speculative_executor.snapshot(),
+        "mongo": mongo_clients.snapshot(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Returns latency histograms and in-flight gauges in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: Per-node, chat model, retrieval, embedding, checkpoint,
+            time-to-first-token and turn latency histograms, response lengths,
+            cancelled turn and saved token counters, MongoDB pool wait and checkout
+            metrics, and in-flight request, turn and LLM call gauges of this worker
+            process.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.post("/reset-memory")
-async def reset_conversation():
-    """Resets the conversation state. It deletes the two collections needed for keeping LangGraph state in MongoDB.
+async def reset_conversation(scope: ResetScope | None = None):
+    """Resets the conversation state.
+
+    Without a body, it deletes the two collections needed for keeping LangGraph state in MongoDB.
+    With a body holding a user_id, thread_id and/or since/until time range, it deletes only the
+    matching conversations.
+
+    Args:
+        scope: The conversations to reset; None resets all of them.
 
     Raises:
-        HTTPException: If there is an error resetting the conversation state.
+        HTTPException: 400 if the body holds no criterion, 500 if there is an error resetting the
+            conversation state.
     Returns:
-        dict: A dictionary containing the result of the reset operation.
+        dict: A dictionary containing the result of the reset operation and the deleted counts.
     """
+    if scope is not None and not scope.model_dump(exclude_none=True):
+        raise HTTPException(
+            status_code=400, detail="Give a user_id, thread_id, since or until, or no body to reset everything"
+        )
     try:
+        if scope is not None:
+            return await reset_conversations(**scope.model_dump())
         result = await reset_conversation_state()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/memory-stats")
+async def conversation_state_stats(top: int = 10):
+    """Reports the size of the conversation state collections and checkpoints per thread.
+
+    Args:
+        top: Number of threads with the most checkpoints to list.
+
+    Raises:
+        HTTPException: If there is an error reading the statistics.
+    Returns:
+        dict: Collection sizes, thread and checkpoints-per-thread counts and retention settings.
+    """
+    try:
+        return await get_conversation_state_stats(top=top)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/compact-memory")
+async def compact_conversation():
+    """Keeps only the newest CHECKPOINT_KEEP_LAST checkpoints of every conversation thread.
+
+    Raises:
+        HTTPException: If there is an error compacting the conversation state.
+    Returns:
+        dict: A dictionary containing the result of the compaction.
+    """
+    try:
+        return await compact_conversation_state()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,287 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Sequence
+
+# Seconds; covers sub-millisecond cache hits up to slow LLM turns
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus data model, with optional labels.
+
+    Args:
+        name: Metric name.
+        documentation: HELP text.
+        labels: Label names; observe() takes a value for each of them.
+        buckets: Upper bounds of the buckets, without +Inf.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_values(self.labels, labels)
+        with self._lock:
+            counts = self._series.get(key)
+            if counts is None:
+                # Bucket counts, then sum and count
+                counts = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the block, whether it succeeds or raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def mean(self) -> Optional[float]:
+        """Mean of all observations across label values, None before the first one."""
+        with self._lock:
+            total = sum(counts[-2] for counts in self._series.values())
+            count = sum(counts[-1] for counts in self._series.values())
+        return total / count if count else None
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(counts) for key, counts in self._series.items()}
+        for key, counts in sorted(series.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le=_format_value(bound))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le='+Inf')} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(counts[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter in the Prometheus data model, with optional labels.
+
+    Args:
+        name: Metric name, ending in `_total`.
+        documentation: HELP text.
+        labels: Label names.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = _label_values(self.labels, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Gauge in the Prometheus data model, either set by the code or read from `function` at scrape time.
+
+    Args:
+        name: Metric name.
+        documentation: HELP text.
+        labels: Label names.
+        function: Returns the current value of an unlabelled gauge when it is rendered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.function = function
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _label_values(self.labels, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_label_values(self.labels, labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        if self.function is not None:
+            lines.append(f"{self.name} {_format_value(self.function())}")
+            return lines
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics rendered by the /metrics endpoint.
+
+    Metrics live in the memory of each worker process; with several workers, every scrape
+    reports the worker that served it.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Histogram | Counter | Gauge] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, **kwargs))
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (), **kwargs) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, **kwargs))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering returns the existing metric, so modules can be reloaded
+            return self._metrics.setdefault(metric.name, metric)
+
+
+def _label_values(names: tuple, labels: Dict[str, str]) -> tuple:
+    if set(labels) != set(names):
+        raise ValueError(f"Expected labels {names}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in names)
+
+
+def _format_labels(names: tuple, values: tuple, **extra: str) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+metrics = MetricsRegistry()
+
+graph_node_duration = metrics.histogram(
+    "assistant_graph_node_duration_seconds", "Duration of a workflow graph node run.", ("node",)
+)
+llm_call_duration = metrics.histogram(
+    "assistant_llm_call_duration_seconds", "Duration of a chat model call, by the graph node making it.", ("node",)
+)
+retrieval_duration = metrics.histogram(
+    "assistant_retrieval_duration_seconds", "Knowledge base search latency, including the query embedding.", ("kind",)
+)
+embedding_duration = metrics.histogram(
+    "assistant_embedding_duration_seconds", "Embedding latency, including embedding cache lookups.", ("operation",)
+)
+checkpoint_duration = metrics.histogram(
+    "assistant_checkpoint_duration_seconds", "Latency of conversation state checkpoint operations.", ("operation",)
+)
+time_to_first_token = metrics.histogram(
+    "assistant_time_to_first_token_seconds", "Time from the start of a turn to its first response token.", ("mode",)
+)
+turn_duration = metrics.histogram(
+    "assistant_turn_duration_seconds", "Total duration of a conversation turn through the graph.", ("mode",)
+)
+response_tokens = metrics.histogram(
+    "assistant_response_tokens",
+    "Tokens generated for the response of a completed turn.",
+    ("mode",),
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048),
+)
+turns_cancelled = metrics.counter(
+    "assistant_turns_cancelled_total", "Turns aborted because the client disconnected or cancelled them.", ("mode",)
+)
+tokens_saved = metrics.counter(
+    "assistant_response_tokens_saved_total",
+    "Estimated response tokens not generated thanks to cancelled turns: the mean response length minus the "
+    "tokens generated before the cancellation.",
+    ("mode",),
+)
+conversation_context_tokens = metrics.histogram(
+    "assistant_conversation_context_tokens",
+    "Estimated tokens of conversation history (running summary and recent messages) in a response prompt.",
+    buckets=(0, 64, 128, 256, 512, 1024, 2048, 4096),
+)
+conversation_summaries = metrics.counter(
+    "assistant_conversation_summaries_total", "Summarizations folding older conversation turns into the summary."
+)
+summary_tokens_saved = metrics.counter(
+    "assistant_summary_tokens_saved_total",
+    "Estimated tokens removed from the conversation context of every later prompt of a thread by summarization: "
+    "the folded messages minus the growth of the summary.",
+)
+summary_llm_tokens = metrics.counter(
+    "assistant_summary_llm_tokens_total", "Tokens used by summarization LLM calls, as reported by the model.", ("kind",)
+)
+mongo_pool_wait = metrics.histogram(
+    "assistant_mongo_pool_wait_seconds",
+    "Time spent waiting to check a connection out of a MongoDB connection pool.",
+    ("client",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+mongo_checkouts = metrics.counter(
+    "assistant_mongo_connection_checkouts_total",
+    "MongoDB connection checkouts, by client kind and outcome.",
+    ("client", "outcome"),
+)
+mongo_checked_out = metrics.gauge(
+    "assistant_mongo_connections_checked_out", "MongoDB connections currently in use.", ("client",)
+)
+turns_in_flight = metrics.gauge(
+    "assistant_turns_in_flight", "Conversation turns currently running through the graph.", ("mode",)
+)
+requests_in_flight = metrics.gauge(
+    "assistant_requests_in_flight", "Requests currently being served, by endpoint.", ("endpoint",)
+)
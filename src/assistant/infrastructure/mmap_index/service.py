@@ -0,0 +1,319 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+
+from assistant.config import settings
+from assistant.infrastructure.qdrant.service import document_id
+
+
+@dataclass
+class IndexSnapshot:
+    """An immutable, published version of the index.
+
+    Rows of `vectors` are L2-normalised and grouped by `source`, so the rows of a department are
+    the contiguous range `ranges[source]`.
+    """
+
+    version: str
+    generation: int
+    ids: List[str]
+    documents: List[Document]
+    vectors: np.ndarray
+    ranges: Dict[str, tuple[int, int]]
+
+    @classmethod
+    def empty(cls, vector_size: int, dtype: str) -> "IndexSnapshot":
+        return cls("", 0, [], [], np.zeros((0, vector_size), dtype=dtype), {})
+
+
+class MmapVectorIndex:
+    """
+    Embedded vector index stored as a memory-mapped matrix, a drop-in alternative to QdrantManager
+    for small knowledge bases.
+
+    Ingestion writes the artifact directory: a `.npy` matrix (float32 or float16) whose rows are
+    sorted by department, the documents, and `manifest.json` pointing at the current version.
+    Readers map the matrix read-only, so every worker process shares the same page cache pages,
+    and a department-filtered search is a single matrix-vector product over that department's
+    row range. Writers publish a new version by atomically replacing the manifest; readers pick
+    it up within QDRANT_GENERATION_REFRESH_SECONDS.
+
+    Only dense retrieval is supported.
+
+    Args:
+        path: Artifact directory.
+        embedding: Dense embedding model, the one used at ingest time.
+        vector_size: Dimension of the embeddings.
+        dtype: Storage precision of the matrix, "float32" or "float16".
+    """
+
+    # Writes are buffered and published by flush(), one writer at a time
+    is_local = True
+    sparse_embedding = None
+
+    def __init__(self, path: Path, embedding, vector_size: int = 1536, dtype: str = "float32") -> None:
+        self.path = Path(path)
+        self.embedding = embedding
+        self.vector_size = vector_size
+        self.dtype = dtype
+
+        self._lock = threading.Lock()
+        self._snapshot = IndexSnapshot.empty(vector_size, dtype)
+        self._manifest_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._pending: Dict[str, tuple[Document, List[float]]] = {}
+        self._deleted: set[str] = set()
+
+        self._refresh(max_age=0)
+
+    # --- Reading -------------------------------------------------------------------------------
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        self._refresh()
+        return self._snapshot
+
+    def get_generation(self, max_age: float = settings.QDRANT_GENERATION_REFRESH_SECONDS) -> int:
+        self._refresh(max_age)
+        return self._snapshot.generation
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        search_type: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search_kwargs: Optional[Dict[str, Any]] = None,
+        search_params: Any = None,
+    ) -> List[Document]:
+        """Same contract as QdrantManager.similarity_search; only plain similarity search is supported."""
+        if search_type not in (None, "similarity"):
+            raise ValueError(f"MmapVectorIndex does not support search_type={search_type!r}")
+        k = (search_kwargs or {}).get("k", k)
+        return self.search_by_vectors([self.embedding.embed_query(query)], k, filters)[0]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+        search_params: Any = None,
+    ) -> List[Document]:
+        # The search itself takes microseconds; only the query embedding is worth awaiting
+        return self.search_by_vectors([await self.embedding.aembed_query(query)], k, filters)[0]
+
+    def similarity_search_batch(
+        self, queries: List[str], k: int = 4, filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Document]]:
+        """Search several queries with one embedding call and one matrix product."""
+        return self.search_by_vectors(self.embedding.embed_documents(queries), k, filters)
+
+    def search_by_vectors(
+        self, query_vectors: List[List[float]], k: int = 4, filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Document]]:
+        snapshot = self.snapshot
+        rows = self._rows(snapshot, filters)
+        if rows.size == 0 or not query_vectors:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        # Contiguous department ranges are sliced straight out of the mapping without a copy
+        start, stop = int(rows[0]), int(rows[-1]) + 1
+        matrix = snapshot.vectors[start:stop] if stop - start == rows.size else snapshot.vectors[rows]
+        scores = queries @ matrix.T
+
+        k = min(k, rows.size)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-query_scores[candidates])]
+            results.append([snapshot.documents[int(rows[i])] for i in ordered])
+        return results
+
+    def _rows(self, snapshot: IndexSnapshot, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Row numbers matching a metadata filter, using the department ranges for `source`."""
+        filters = dict(filters or {})
+        if "source" in filters:
+            value = filters.pop("source")
+            sources = value if isinstance(value, (list, tuple, set)) else [value]
+            ranges = [snapshot.ranges[source] for source in sources if source in snapshot.ranges]
+            rows = np.concatenate([np.arange(start, stop) for start, stop in sorted(ranges)]) if ranges else np.arange(0)
+        else:
+            rows = np.arange(len(snapshot.ids))
+
+        # Other fields are rare; check them row by row
+        for field, value in filters.items():
+            accepted = set(value) if isinstance(value, (list, tuple, set)) else {value}
+            rows = rows[[snapshot.documents[i].metadata.get(field) in accepted for i in rows]]
+        return rows
+
+    # --- Writing -------------------------------------------------------------------------------
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        if ids is None:
+            ids = [document_id(doc) for doc in documents]
+        self.upsert_points(ids, documents, self.build_vectors([doc.page_content for doc in documents]))
+        self.flush()
+
+    def build_vectors(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding.embed_documents(texts)
+
+    def upsert_points(self, ids: List[str], documents: List[Document], vectors: List[List[float]]) -> None:
+        """Stage documents for the next flush()."""
+        with self._lock:
+            for point_id, document, vector in zip(ids, documents, vectors):
+                self._pending[point_id] = (document, vector)
+                self._deleted.discard(point_id)
+
+    def delete_documents(self, ids: List[str]) -> bool:
+        """Stage deletions for the next flush(). Deleting happens on publication, as for upserts."""
+        with self._lock:
+            for point_id in ids:
+                self._pending.pop(point_id, None)
+                self._deleted.add(point_id)
+        return True
+
+    def iter_point_ids(self, batch_size: int = 1000) -> Iterator[str]:
+        with self._lock:
+            ids = (set(self.snapshot.ids) | self._pending.keys()) - self._deleted
+        yield from ids
+
+    def flush(self) -> None:
+        """Publish the staged upserts and deletions as a new version of the artifact."""
+        with self._lock:
+            if not self._pending and not self._deleted:
+                return
+            current = self._snapshot
+            rows = [
+                (point_id, document, current.vectors[i])
+                for i, (point_id, document) in enumerate(zip(current.ids, current.documents))
+                if point_id not in self._deleted and point_id not in self._pending
+            ]
+            rows += [(point_id, document, vector) for point_id, (document, vector) in self._pending.items()]
+            self._publish(rows, current.generation)
+            self._pending.clear()
+            self._deleted.clear()
+
+    def bump_generation(self, fingerprint: Optional[str] = None) -> int:
+        """Increment the knowledge base generation stored in the manifest and return the new value."""
+        with self._lock:
+            manifest = self._read_manifest()
+            manifest["generation"] = manifest.get("generation", 0) + 1
+            if fingerprint is not None:
+                manifest["fingerprint"] = fingerprint
+            self._write_manifest(manifest)
+        self._refresh(max_age=0)
+        return self._snapshot.generation
+
+    def sync_generation(self, fingerprint: str) -> int:
+        """Same contract as QdrantManager.sync_generation, with the fingerprint kept in the manifest."""
+        if self._read_manifest().get("fingerprint") == fingerprint:
+            return self.get_generation(max_age=0)
+        return self.bump_generation(fingerprint)
+
+    async def aclose(self) -> None:
+        pass
+
+    def _publish(self, rows: list[tuple[str, Document, Any]], generation: int) -> None:
+        rows.sort(key=lambda row: str(row[1].metadata.get("source", "")))
+
+        vectors = np.asarray([row[2] for row in rows], dtype=np.float32).reshape(-1, self.vector_size)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        ranges: Dict[str, list[int]] = {}
+        for i, (_, document, _) in enumerate(rows):
+            source = str(document.metadata.get("source", ""))
+            ranges.setdefault(source, [i, i])[1] = i + 1
+
+        version = uuid4().hex
+        self.path.mkdir(parents=True, exist_ok=True)
+        np.save(self.path / f"vectors-{version}.npy", vectors.astype(self.dtype))
+        (self.path / f"documents-{version}.json").write_text(
+            json.dumps(
+                [
+                    {"id": point_id, "page_content": document.page_content, "metadata": document.metadata}
+                    for point_id, document, _ in rows
+                ]
+            )
+        )
+        previous = self._read_manifest()
+        self._write_manifest(
+            {
+                "version": version,
+                "generation": generation,
+                # The generation still stands for the content it was bumped for
+                "fingerprint": previous.get("fingerprint"),
+                "dtype": self.dtype,
+                "vector_size": self.vector_size,
+                "ranges": ranges,
+            }
+        )
+        self._remove_stale_versions(keep={version, previous.get("version")})
+        logger.info(f"Published vector index version {version} ({len(rows)} documents) to {self.path}")
+        self._refresh(max_age=0)
+
+    def _remove_stale_versions(self, keep: set) -> None:
+        # Processes still mapping an unlinked version keep reading it until they refresh
+        for file in self.path.glob("*-*.*"):
+            if file.stem.split("-", 1)[-1] not in keep:
+                file.unlink(missing_ok=True)
+
+    def _read_manifest(self) -> dict:
+        manifest_path = self.path / "manifest.json"
+        return json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        temporary = self.path / f"manifest.{os.getpid()}.tmp"
+        temporary.write_text(json.dumps(manifest))
+        temporary.replace(self.path / "manifest.json")
+
+    def _refresh(self, max_age: float = settings.QDRANT_GENERATION_REFRESH_SECONDS) -> None:
+        """Map the published version if the manifest changed since it was last read."""
+        now = time.monotonic()
+        if now - self._checked_at < max_age:
+            return
+        self._checked_at = now
+
+        manifest_path = self.path / "manifest.json"
+        if not manifest_path.exists():
+            return
+        mtime = manifest_path.stat().st_mtime_ns
+        if mtime == self._manifest_mtime:
+            return
+
+        manifest = json.loads(manifest_path.read_text())
+        # A generation bumped before any version was published comes without one, like the empty snapshot
+        version = manifest.get("version", "")
+        if version == self._snapshot.version:
+            snapshot = replace(self._snapshot, generation=manifest.get("generation", 0))
+        else:
+            try:
+                records = json.loads((self.path / f"documents-{version}.json").read_text())
+                vectors = np.load(self.path / f"vectors-{version}.npy", mmap_mode="r")
+            except FileNotFoundError:
+                # Superseded while we were reading the manifest; the next refresh gets the newer one
+                return
+            snapshot = IndexSnapshot(
+                version=version,
+                generation=manifest["generation"],
+                ids=[record["id"] for record in records],
+                documents=[
+                    Document(page_content=record["page_content"], metadata={**record["metadata"], "_id": record["id"]})
+                    for record in records
+                ],
+                vectors=vectors,
+                ranges={source: tuple(bounds) for source, bounds in manifest["ranges"].items()},
+            )
+        self._snapshot, self._manifest_mtime = snapshot, mtime
@@ -0,0 +1,616 @@
+import asyncio
+import re
+from datetime import UTC, datetime
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.mongodb.utils import dumps_metadata, loads_metadata
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from pymongo import UpdateOne
+from loguru import logger
+from pymongo.asynchronous.collection import AsyncCollection
+
+from assistant.config import settings
+from assistant.infrastructure.metrics import checkpoint_duration
+from assistant.infrastructure.mongdb.pool import mongo_clients
+
+
+class InstrumentedCheckpointSaver(BaseCheckpointSaver):
+    """Checkpointer wrapper timing the reads and writes of another checkpointer.
+
+    Observations go to the `assistant_checkpoint_duration_seconds` histogram with the operation
+    as label: "read" (loading the thread state at the start of a turn), "write" (a checkpoint
+    after each superstep), "write_pending" (intermediate node writes) and "list". Everything else
+    is delegated unchanged.
+
+    Args:
+        saver: The checkpointer doing the actual work, e.g. MongoDBSaver.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver) -> None:
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.saver, name)
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with checkpoint_duration.time(operation="read"):
+            return self.saver.get_tuple(config)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with checkpoint_duration.time(operation="read"):
+            return await self.saver.aget_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        with checkpoint_duration.time(operation="list"):
+            yield from self.saver.list(config, **kwargs)
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        with checkpoint_duration.time(operation="list"):
+            async for checkpoint in self.saver.alist(config, **kwargs):
+                yield checkpoint
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with checkpoint_duration.time(operation="write"):
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with checkpoint_duration.time(operation="write"):
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = ""
+    ) -> None:
+        with checkpoint_duration.time(operation="write_pending"):
+            self.saver.put_writes(config, writes, task_id, task_path)
+
+    async def aput_writes(
+        self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = ""
+    ) -> None:
+        with checkpoint_duration.time(operation="write_pending"):
+            await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current: Any, channel: Any) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+
+class AsyncMongoDBSaver(BaseCheckpointSaver):
+    """
+    Native async MongoDB checkpointer, storing documents in the same shape as MongoDBSaver.
+
+    MongoDBSaver runs blocking pymongo calls in the default thread pool, one round trip per
+    operation. This saver talks to MongoDB through AsyncMongoClient on the event loop and, with
+    `coalesce_writes`, buffers the intermediate writes of a step instead of writing them as they
+    come: they are sent as one unordered bulk write together with the next checkpoint of the
+    thread, concurrently with it. Reading a thread or calling aflush() sends what is buffered first,
+    so reads always see every write. Buffered writes of a run that stops without a further
+    checkpoint (an error) are lost if the process dies before the thread is read again; they are
+    only needed to resume that run.
+
+    When checkpoints are written is up to the graph run's `durability` (CHECKPOINT_DURABILITY).
+
+    Retention keeps threads bounded. With `keep_last`, reading the latest checkpoint of a thread
+    (the start of a turn) prunes, in the background, all but its `keep_last` newest checkpoints
+    and their writes; only the latest one is needed to continue a conversation, the others are
+    history. With `ttl`, documents carry a `created_at` date and a TTL index removes them `ttl`
+    seconds later, so threads idle for that long disappear while active ones keep their recent
+    checkpoints. acompact() and astats() cover the threads no turn touches. areset() deletes the
+    conversations of a user, a thread or a time range, and awipe() all of them.
+
+    The collections and indexes are those of MongoDBSaver, so the two savers can be swapped on
+    existing data. The saver has no blocking methods: it serves async graph runs only. Its client
+    is the shared one of the running event loop from the process-wide registry, so callers running
+    each turn in its own asyncio.run() work as well.
+
+    Args:
+        mongodb_uri: MongoDB connection URI.
+        db_name: Database of the collections.
+        checkpoint_collection_name: Collection of checkpoints.
+        writes_collection_name: Collection of intermediate writes.
+        coalesce_writes: Buffer intermediate writes until the next checkpoint of the thread.
+        keep_last: Checkpoints kept per thread; None keeps them all.
+        ttl: Seconds after which checkpoints and writes expire; None keeps them.
+        serde: Serializer of checkpoints and writes.
+    """
+
+    def __init__(
+        self,
+        mongodb_uri: str = settings.MONGO_URI,
+        db_name: str = settings.MONGO_DB_NAME,
+        checkpoint_collection_name: str = settings.MONGO_STATE_CHECKPOINT_COLLECTION,
+        writes_collection_name: str = settings.MONGO_STATE_WRITES_COLLECTION,
+        coalesce_writes: bool = True,
+        keep_last: Optional[int] = None,
+        ttl: Optional[int] = None,
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.mongodb_uri = mongodb_uri
+        self.db_name = db_name
+        self.checkpoint_collection_name = checkpoint_collection_name
+        self.writes_collection_name = writes_collection_name
+        self.coalesce_writes = coalesce_writes
+        self.keep_last = keep_last
+        self.ttl = ttl
+
+        self._indexes_ready = False
+        self._checkpoint_id_indexes_ready = False
+        self._background: set[asyncio.Task] = set()
+        # Buffered write operations by (thread_id, checkpoint_ns)
+        self._pending_writes: Dict[tuple[str, str], List[UpdateOne]] = {}
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        checkpoints, writes = await self._collections()
+        thread_id = _identifier(config["configurable"]["thread_id"], "thread_id")
+        checkpoint_ns = _identifier(config["configurable"].get("checkpoint_ns", ""), "checkpoint_ns")
+        checkpoint_id = get_checkpoint_id(config)
+        await self.aflush(thread_id)
+
+        query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        if checkpoint_id:
+            query["checkpoint_id"] = _identifier(checkpoint_id, "checkpoint_id")
+        doc = await checkpoints.find_one(query, sort=[("checkpoint_id", -1)])
+        if doc is None:
+            return None
+        if self.keep_last and not checkpoint_id:
+            self._in_background(self.aprune_thread(thread_id, checkpoint_ns))
+        return await self._checkpoint_tuple(doc, writes)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints, writes = await self._collections()
+        query: Dict[str, Any] = {}
+        if config is not None:
+            if "thread_id" in config["configurable"]:
+                query["thread_id"] = _identifier(config["configurable"]["thread_id"], "thread_id")
+            if "checkpoint_ns" in config["configurable"]:
+                query["checkpoint_ns"] = _identifier(config["configurable"]["checkpoint_ns"], "checkpoint_ns")
+        if filter:
+            _check_filter(filter)
+            for key, value in filter.items():
+                query[f"metadata.{key}"] = dumps_metadata(self.serde, value)
+        if before is not None:
+            query["checkpoint_id"] = {"$lt": _identifier(before["configurable"]["checkpoint_id"], "checkpoint_id")}
+        await self.aflush(query.get("thread_id"))
+
+        cursor = checkpoints.find(query, sort=[("checkpoint_id", -1)], limit=limit or 0)
+        async for doc in cursor:
+            yield await self._checkpoint_tuple(doc, writes)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        checkpoints, writes = await self._collections()
+        thread_id = _identifier(config["configurable"]["thread_id"], "thread_id")
+        checkpoint_ns = _identifier(config["configurable"]["checkpoint_ns"], "checkpoint_ns")
+        checkpoint_id = _identifier(checkpoint["id"], "checkpoint id")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        doc = {
+            "parent_checkpoint_id": parent_checkpoint_id and _identifier(parent_checkpoint_id, "checkpoint_id"),
+            "type": type_,
+            "checkpoint": serialized_checkpoint,
+            "metadata": dumps_metadata(self.serde, get_checkpoint_metadata(config, metadata)),
+        }
+        if self.ttl:
+            doc["created_at"] = datetime.now(tz=UTC)
+        key = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}
+
+        # The writes of the previous step travel with this checkpoint, in parallel
+        pending = self._pending_writes.pop((thread_id, checkpoint_ns), None)
+        operations = [checkpoints.update_one(key, {"$set": doc}, upsert=True)]
+        if pending:
+            operations.append(writes.bulk_write(pending, ordered=False))
+        await asyncio.gather(*operations)
+        return {"configurable": key}
+
+    async def aput_writes(
+        self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = ""
+    ) -> None:
+        thread_id = _identifier(config["configurable"]["thread_id"], "thread_id")
+        checkpoint_ns = _identifier(config["configurable"]["checkpoint_ns"], "checkpoint_ns")
+        checkpoint_id = _identifier(config["configurable"]["checkpoint_id"], "checkpoint_id")
+        _identifier(task_id, "task_id")
+        _identifier(task_path, "task_path")
+
+        # Same semantics as MongoDBSaver: special writes (errors, interrupts) replace earlier ones
+        set_method = "$set" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "$setOnInsert"
+        operations = []
+        now = datetime.now(tz=UTC)
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized_value = self.serde.dumps_typed(value)
+            update = {"channel": channel, "type": type_, "value": serialized_value}
+            if self.ttl:
+                update["created_at"] = now
+            operations.append(
+                UpdateOne(
+                    {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": checkpoint_id,
+                        "task_id": task_id,
+                        "task_path": task_path,
+                        "idx": WRITES_IDX_MAP.get(channel, idx),
+                    },
+                    {set_method: update},
+                    upsert=True,
+                )
+            )
+        if not operations:
+            return
+        if self.coalesce_writes:
+            self._pending_writes.setdefault((thread_id, checkpoint_ns), []).extend(operations)
+            return
+        _, writes_collection = await self._collections()
+        await writes_collection.bulk_write(operations, ordered=False)
+
+    async def aflush(self, thread_id: Optional[str] = None) -> None:
+        """Send the buffered writes of a thread, or of every thread when `thread_id` is None."""
+        keys = [key for key in self._pending_writes if thread_id is None or key[0] == thread_id]
+        operations = [op for key in keys for op in self._pending_writes.pop(key)]
+        if operations:
+            _, writes = await self._collections()
+            await writes.bulk_write(operations, ordered=False)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        checkpoints, writes = await self._collections()
+        _identifier(thread_id, "thread_id")
+        for key in [key for key in self._pending_writes if key[0] == thread_id]:
+            del self._pending_writes[key]
+        await asyncio.gather(
+            checkpoints.delete_many({"thread_id": thread_id}), writes.delete_many({"thread_id": thread_id})
+        )
+
+    async def areset(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """
+        Delete the checkpoints and writes matching every given criterion, with two bulk deletes.
+
+        A user's threads are the thread named after the user_id and the threads started for it with
+        new_thread (`<user_id>-<uuid>`); both are found through the thread_id index. The time range
+        applies to the creation time of the checkpoints, which their ids encode; on its own it uses
+        a checkpoint_id index created on first use.
+
+        Args:
+            user_id: Delete the threads of this user.
+            thread_id: Delete this thread.
+            since: Delete checkpoints created at or after this time (UTC when naive).
+            until: Delete checkpoints created before this time (UTC when naive).
+
+        Returns:
+            dict: The number of checkpoints and writes deleted.
+
+        Raises:
+            ValueError: If no criterion is given; use awipe() to delete everything.
+        """
+        query: Dict[str, Any] = {}
+        if thread_id is not None:
+            query["thread_id"] = _identifier(thread_id, "thread_id")
+        if user_id is not None:
+            user_threads = {"$regex": f"^{re.escape(_identifier(user_id, 'user_id'))}(-{_UUID_PATTERN})?$"}
+            query = {"$and": [query, {"thread_id": user_threads}]} if query else {"thread_id": user_threads}
+        if since is not None or until is not None:
+            created = {}
+            if since is not None:
+                created["$gte"] = checkpoint_id_at(since)
+            if until is not None:
+                created["$lt"] = checkpoint_id_at(until)
+            query["checkpoint_id"] = created
+        if not query:
+            raise ValueError("Give a user_id, thread_id, since or until; awipe() deletes every conversation")
+
+        checkpoints, writes = await self._collections()
+        if user_id is None and thread_id is None:
+            await self._ensure_checkpoint_id_indexes(checkpoints, writes)
+        # Buffered writes of the matching threads are deleted along with the stored ones
+        await self.aflush()
+        deleted_checkpoints, deleted_writes = await asyncio.gather(
+            checkpoints.delete_many(query), writes.delete_many(query)
+        )
+        return {
+            "checkpoints_deleted": deleted_checkpoints.deleted_count,
+            "writes_deleted": deleted_writes.deleted_count,
+        }
+
+    async def awipe(self) -> Dict[str, Any]:
+        """
+        Delete every conversation without blocking the turns in progress.
+
+        Both collections are renamed away, which is immediate, and recreated empty with their
+        indexes; the renamed ones are dropped in the background. Turns keep reading and writing the
+        new collections throughout.
+
+        Returns:
+            dict: The collections wiped and their approximate checkpoint and write counts.
+        """
+        checkpoints, writes = await self._collections()
+        self._pending_writes.clear()
+        existing = await checkpoints.database.list_collection_names(
+            filter={"name": {"$in": [checkpoints.name, writes.name]}}
+        )
+        suffix = datetime.now(tz=UTC).strftime("%Y%m%d%H%M%S%f")
+        wiped, counts = [], {}
+        for collection, count_key in ((checkpoints, "checkpoints_deleted"), (writes, "writes_deleted")):
+            counts[count_key] = 0
+            if collection.name not in existing:
+                continue
+            counts[count_key] = await collection.estimated_document_count()
+            trash = collection.database[f"{collection.name}_wiped_{suffix}"]
+            await collection.rename(trash.name)
+            self._in_background(trash.drop())
+            wiped.append(collection.name)
+            logger.info(f"Renamed collection {collection.name} to {trash.name}, dropping it in the background")
+
+        # Writes arriving meanwhile recreate the collections; give them their unique indexes back
+        self._indexes_ready = self._checkpoint_id_indexes_ready = False
+        await self._collections()
+        return {"collections": wiped, **counts}
+
+    async def aprune_thread(self, thread_id: str, checkpoint_ns: str = "", keep_last: Optional[int] = None) -> int:
+        """
+        Delete all but the newest checkpoints of a thread, with their writes.
+
+        Args:
+            thread_id: The thread to prune.
+            checkpoint_ns: Its checkpoint namespace; "" for the graph itself.
+            keep_last: Checkpoints to keep; defaults to the saver's `keep_last`.
+
+        Returns:
+            int: The number of checkpoints deleted.
+        """
+        keep_last = keep_last or self.keep_last
+        if not keep_last:
+            return 0
+        checkpoints, writes = await self._collections()
+        query = {"thread_id": _identifier(thread_id, "thread_id"), "checkpoint_ns": checkpoint_ns}
+        # The newest checkpoint beyond the ones kept; it and everything older go
+        boundary = await checkpoints.find_one(
+            query, {"checkpoint_id": 1, "_id": 0}, sort=[("checkpoint_id", -1)], skip=keep_last
+        )
+        if boundary is None:
+            return 0
+        stale = {**query, "checkpoint_id": {"$lte": boundary["checkpoint_id"]}}
+        deleted, _ = await asyncio.gather(checkpoints.delete_many(stale), writes.delete_many(stale))
+        return deleted.deleted_count
+
+    async def acompact(self, keep_last: Optional[int] = None, concurrency: int = 8) -> Dict[str, int]:
+        """
+        Prune every thread holding more than `keep_last` checkpoints, e.g. threads no turn has
+        read since retention was enabled.
+
+        Returns:
+            dict: The number of threads pruned and of checkpoints deleted.
+        """
+        keep_last = keep_last or self.keep_last
+        if not keep_last:
+            return {"threads": 0, "checkpoints_deleted": 0}
+        checkpoints, _ = await self._collections()
+        cursor = await checkpoints.aggregate(
+            [
+                {"$group": {"_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"}, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": keep_last}}},
+            ]
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def prune(thread: Dict[str, str]) -> int:
+            async with semaphore:
+                return await self.aprune_thread(thread["thread_id"], thread["checkpoint_ns"], keep_last)
+
+        deleted = await asyncio.gather(*[prune(group["_id"]) async for group in cursor])
+        return {"threads": len(deleted), "checkpoints_deleted": sum(deleted)}
+
+    async def astats(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Report the size of both collections and how checkpoints are spread over threads.
+
+        Args:
+            top: Number of threads with the most checkpoints to list.
+
+        Returns:
+            dict: Document count, data, storage and index sizes in bytes of each collection, the
+                number of threads, the mean and maximum checkpoints per thread and the largest threads.
+        """
+        checkpoints, writes = await self._collections()
+
+        async def collection_stats(collection: AsyncCollection) -> Dict[str, int]:
+            cursor = await collection.aggregate([{"$collStats": {"storageStats": {}}}])
+            stats = (await cursor.to_list())[0]["storageStats"]
+            return {
+                "documents": stats.get("count", 0),
+                "size_bytes": stats.get("size", 0),
+                "storage_bytes": stats.get("storageSize", 0),
+                "index_bytes": stats.get("totalIndexSize", 0),
+            }
+
+        async def thread_stats() -> Dict[str, Any]:
+            cursor = await checkpoints.aggregate(
+                [
+                    {"$group": {"_id": "$thread_id", "checkpoints": {"$sum": 1}}},
+                    {
+                        "$facet": {
+                            "summary": [
+                                {
+                                    "$group": {
+                                        "_id": None,
+                                        "threads": {"$sum": 1},
+                                        "mean": {"$avg": "$checkpoints"},
+                                        "max": {"$max": "$checkpoints"},
+                                    }
+                                }
+                            ],
+                            "top": [{"$sort": {"checkpoints": -1}}, {"$limit": top}],
+                        }
+                    },
+                ]
+            )
+            facets = (await cursor.to_list())[0]
+            summary = facets["summary"][0] if facets["summary"] else {"threads": 0, "mean": 0, "max": 0}
+            return {
+                "threads": summary["threads"],
+                "checkpoints_per_thread": {"mean": summary["mean"], "max": summary["max"]},
+                "largest_threads": {thread["_id"]: thread["checkpoints"] for thread in facets["top"]},
+            }
+
+        checkpoint_stats, write_stats, threads = await asyncio.gather(
+            collection_stats(checkpoints), collection_stats(writes), thread_stats()
+        )
+        return {
+            "checkpoints": checkpoint_stats,
+            "writes": write_stats,
+            **threads,
+            "retention": {"keep_last": self.keep_last, "ttl_seconds": self.ttl},
+        }
+
+    async def aclose(self) -> None:
+        """Finish the background work and flush the buffered writes; the shared client stays open."""
+        # Callers running one asyncio.run() per thread each wait for the work of their own loop
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(task for task in self._background if task.get_loop() is loop), return_exceptions=True)
+        await self.aflush()
+
+    async def _collections(self) -> tuple[AsyncCollection, AsyncCollection]:
+        db = mongo_clients.get_async(self.mongodb_uri)[self.db_name]
+        checkpoints, writes = db[self.checkpoint_collection_name], db[self.writes_collection_name]
+        if not self._indexes_ready:
+            # The unique indexes of MongoDBSaver; creating an existing index is a no-op
+            await asyncio.gather(
+                checkpoints.create_index([("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)], unique=True),
+                writes.create_index(
+                    [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1), ("task_id", 1), ("idx", 1)],
+                    unique=True,
+                ),
+            )
+            if self.ttl:
+                await asyncio.gather(self._ensure_ttl_index(checkpoints), self._ensure_ttl_index(writes))
+            self._indexes_ready = True
+        return checkpoints, writes
+
+    async def _ensure_ttl_index(self, collection: AsyncCollection) -> None:
+        async for index in await collection.list_indexes():
+            if dict(index["key"]) == {"created_at": 1}:
+                if index.get("expireAfterSeconds") != self.ttl:
+                    # A new TTL applies to the existing index instead of conflicting with it
+                    await collection.database.command(
+                        "collMod", collection.name, index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": self.ttl}
+                    )
+                return
+        await collection.create_index([("created_at", 1)], expireAfterSeconds=self.ttl)
+
+    async def _ensure_checkpoint_id_indexes(self, checkpoints: AsyncCollection, writes: AsyncCollection) -> None:
+        if not self._checkpoint_id_indexes_ready:
+            await asyncio.gather(checkpoints.create_index("checkpoint_id"), writes.create_index("checkpoint_id"))
+            self._checkpoint_id_indexes_ready = True
+
+    def _in_background(self, work: Awaitable[Any]) -> None:
+        task = asyncio.ensure_future(work)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Checkpoint maintenance failed: {task.exception()!r}")
+
+    async def _checkpoint_tuple(self, doc: Dict[str, Any], writes: AsyncCollection) -> CheckpointTuple:
+        key = {"thread_id": doc["thread_id"], "checkpoint_ns": doc["checkpoint_ns"], "checkpoint_id": doc["checkpoint_id"]}
+        pending_writes = [
+            (write["task_id"], write["channel"], self.serde.loads_typed((write["type"], write["value"])))
+            async for write in writes.find(key)
+        ]
+        parent_config = None
+        if doc.get("parent_checkpoint_id"):
+            parent_config = {"configurable": {**key, "checkpoint_id": doc["parent_checkpoint_id"]}}
+        return CheckpointTuple(
+            {"configurable": key},
+            self.serde.loads_typed((doc["type"], doc["checkpoint"])),
+            loads_metadata(self.serde, doc["metadata"]),
+            parent_config,
+            pending_writes,
+        )
+
+
+# Suffix of the threads get_response starts with new_thread
+_UUID_PATTERN = "[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+# 100 ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_id_at(moment: datetime) -> str:
+    """
+    The smallest checkpoint id LangGraph can generate at `moment`. Checkpoint ids are UUIDv6, which
+    start with their creation time, so comparing ids compares creation times.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=UTC)
+    timestamp = int(moment.timestamp() * 10_000_000) + _UUID_EPOCH_OFFSET
+    # Time fields, then the version (6) and variant bits; the clock sequence and node are zero
+    value = ((timestamp >> 12) & 0xFFFFFFFFFFFF) << 80 | 0x6 << 76 | (timestamp & 0x0FFF) << 64 | 0x8 << 60
+    return str(UUID(int=value))
+
+
+def _identifier(value: Any, name: str) -> str:
+    # Identifiers go into query documents as they are; a dict would be read as an operator
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid {name}: expected a string, got {type(value).__name__}")
+    return value
+
+
+def _check_filter(filter: Dict[str, Any]) -> None:
+    for key, value in filter.items():
+        if not isinstance(key, str) or key.startswith("$"):
+            raise ValueError(f"Invalid filter key {key!r}: MongoDB operators are not allowed")
+        if isinstance(value, dict):
+            _check_filter(value)
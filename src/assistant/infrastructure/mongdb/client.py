@@ -1,20 +1,53 @@
-from typing import Generic, Type, TypeVar
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Generic, Iterable, Iterator, Optional, Sequence, Type, TypeVar
 
 from bson import ObjectId
 from loguru import logger
 from pydantic import BaseModel
-from pymongo import MongoClient, errors
+from pymongo import MongoClient, ReplaceOne, errors
 
 from assistant.config import settings
+from assistant.infrastructure.mongdb.pool import mongo_clients
 
 T = TypeVar("T", bound=BaseModel)
 
 
+@dataclass
+class BulkWriteReport:
+    """Outcome of a chunked bulk write.
+
+    Chunks are written unordered, so a failing document does not stop the others of its chunk,
+    and a failing chunk does not stop the next ones. `errors` lists the failures of every chunk
+    with the index of the document in the whole input.
+    """
+
+    documents: int = 0
+    chunks: int = 0
+    inserted: int = 0
+    upserted: int = 0
+    modified: int = 0
+    failed_chunks: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.documents} documents in {self.chunks} chunks: {self.inserted} inserted, "
+            f"{self.upserted} upserted, {self.modified} modified, {self.failed} failed "
+            f"in {self.failed_chunks} chunks"
+        )
+
+
 class MongoClientWrapper(Generic[T]):
     """Service class for MongoDB operations, supporting ingestion, querying, and validation.
 
     This class provides methods to interact with MongoDB collections, including document
-    ingestion, querying, and validation operations.
+    ingestion, querying, and validation operations. The client is the process-wide one of the
+    URI from the client registry, so creating a wrapper opens no connection of its own.
 
     Args:
         model (Type[T]): The Pydantic model class to use for document serialization.
@@ -27,7 +60,7 @@ class MongoClientWrapper(Generic[T]):
         collection_name (str): Name of the MongoDB collection.
         database_name (str): Name of the MongoDB database.
         mongodb_uri (str): MongoDB connection URI.
-        client (MongoClient): MongoDB client instance for database connections.
+        client (MongoClient): Shared MongoDB client instance for database connections.
         database (Database): Reference to the target MongoDB database.
         collection (Collection): Reference to the target MongoDB collection.
     """
@@ -49,8 +82,7 @@ class MongoClientWrapper(Generic[T]):
             mongodb_uri (str, optional): URI for connecting to MongoDB instance.
                 Defaults to value from settings.
 
-        Raises:
-            Exception: If connection to MongoDB fails.
+        The shared client connects lazily: an unreachable MongoDB surfaces on the first operation.
         """
 
         self.model = model
@@ -58,18 +90,10 @@ class MongoClientWrapper(Generic[T]):
         self.database_name = database_name
         self.mongodb_uri = mongodb_uri
 
-        try:
-            self.client = MongoClient(mongodb_uri, appname="customerassistant")
-            self.client.admin.command("ping")
-        except Exception as e:
-            logger.error(f"Failed to initialize MongoDBService: {e}")
-            raise
-
+        self.client: MongoClient = mongo_clients.get(mongodb_uri)
         self.database = self.client[database_name]
         self.collection = self.database[collection_name]
-        logger.info(
-            f"Connected to MongoDB instance:\n URI: {mongodb_uri}\n Database: {database_name}\n Collection: {collection_name}"
-        )
+        logger.debug(f"Using MongoDB database {database_name}, collection {collection_name}")
 
     def __enter__(self) -> "MongoClientWrapper":
         """Enable context manager support.
@@ -110,34 +134,71 @@ class MongoClientWrapper(Generic[T]):
             logger.error(f"Error clearing the collection: {e}")
             raise
 
-    def ingest_documents(self, documents: list[T]) -> None:
-        """Insert multiple documents into the MongoDB collection.
+    def ingest_documents(
+        self, documents: Iterable[T], batch_size: int = settings.MONGO_BATCH_SIZE
+    ) -> BulkWriteReport:
+        """Insert documents into the MongoDB collection in chunks of unordered bulk inserts.
+
+        The documents are consumed lazily, one chunk at a time, so a generator of any
+        length is imported with flat memory use. A failing chunk is reported and the next
+        ones are still written.
 
         Args:
-            documents: List of Pydantic model instances to insert.
+            documents: Pydantic model instances to insert, e.g. a generator.
+            batch_size: Documents per insert_many call.
+
+        Returns:
+            BulkWriteReport: Counts of inserted documents and the errors of every chunk.
 
         Raises:
             ValueError: If documents is empty or contains non-Pydantic model items.
-            errors.PyMongoError: If the insertion operation fails.
+            errors.PyMongoError: If the insertion fails for another reason than the documents
+                themselves (e.g. the server is unreachable).
         """
 
-        try:
-            if not documents or not all(
-                isinstance(doc, BaseModel) for doc in documents
-            ):
-                raise ValueError("Documents must be a list of Pycantic models.")
+        def write(chunk: list[dict]) -> dict[str, int]:
+            return {"inserted": len(self.collection.insert_many(chunk, ordered=False).inserted_ids)}
 
-            dict_documents = [doc.model_dump() for doc in documents]
+        report = self.__write_chunks(documents, batch_size, write)
+        logger.debug(f"Inserted documents into MongoDB: {report}")
+        return report
 
-            # Remove '_id' fields to avoid duplicate key errors
-            for doc in dict_documents:
-                doc.pop("_id", None)
+    def upsert_documents(
+        self,
+        documents: Iterable[T],
+        key_fields: Sequence[str],
+        batch_size: int = settings.MONGO_BATCH_SIZE,
+    ) -> BulkWriteReport:
+        """Insert or replace documents, matched on `key_fields`, in chunks of unordered bulk writes.
 
-            self.collection.insert_many(dict_documents)
-            logger.debug(f"Inserted {len(documents)} documents into MongoDB.")
-        except errors.PyMongoError as e:
-            logger.error(f"Error inserting documents: {e}")
-            raise
+        Re-importing the same documents is idempotent. Like ingest_documents, the documents
+        are consumed one chunk at a time and failures are reported per chunk.
+
+        Args:
+            documents: Pydantic model instances to write, e.g. a generator.
+            key_fields: Fields identifying a document; an index on them keeps the upserts fast.
+            batch_size: Documents per bulk_write call.
+
+        Returns:
+            BulkWriteReport: Counts of upserted and modified documents and the errors of every chunk.
+
+        Raises:
+            ValueError: If documents is empty, contains non-Pydantic model items or no key_fields are given.
+            errors.PyMongoError: If the write fails for another reason than the documents themselves.
+        """
+        if not key_fields:
+            raise ValueError("Upserts need at least one key field.")
+
+        def write(chunk: list[dict]) -> dict[str, int]:
+            result = self.collection.bulk_write(
+                [ReplaceOne({key: doc.get(key) for key in key_fields}, doc, upsert=True) for doc in chunk],
+                ordered=False,
+            )
+            return {"upserted": result.upserted_count, "modified": result.modified_count}
+
+        report = self.__write_chunks(documents, batch_size, write)
+        logger.debug(f"Upserted documents into MongoDB: {report}")
+        return report
 
     def fetch_documents(self, limit: int, query: dict) -> list[T]:
         """Retrieve documents from the MongoDB collection based on a query.
@@ -152,39 +213,119 @@ class MongoClientWrapper(Generic[T]):
         Raises:
             Exception: If the query operation fails.
         """
+        documents = list(self.iter_documents(query, limit=limit))
+        logger.debug(f"Fetched {len(documents)} documents with query: {query}")
+        return documents
+
+    def iter_documents(
+        self,
+        query: Optional[dict] = None,
+        projection: Optional[dict | list[str]] = None,
+        limit: int = 0,
+        batch_size: int = settings.MONGO_BATCH_SIZE,
+        validate: bool = True,
+    ) -> Iterator[T]:
+        """Stream the documents matching a query.
+
+        The server cursor returns `batch_size` documents per round trip and each one is
+        converted only when it is consumed, so memory use stays flat whatever the size of
+        the result, e.g. when exporting a whole collection.
+
+        Args:
+            query: MongoDB query filter; None matches every document.
+            projection: Fields to return (a list, or a MongoDB projection document); the
+                model must accept documents without the others.
+            limit: Maximum number of documents; 0 for no limit.
+            batch_size: Documents fetched per round trip.
+            validate: Validate every document against the model. False builds the model
+                instances without validation, for trusted data such as exports.
+
+        Yields:
+            T: Pydantic model instances matching the query criteria.
+
+        Raises:
+            errors.PyMongoError: If the query fails.
+        """
+        cursor = self.collection.find(query or {}, projection, limit=limit, batch_size=batch_size)
         try:
-            documents = list(self.collection.find(query).limit(limit))
-            logger.debug(f"Fetched {len(documents)} documents with query: {query}")
-            return self.__parse_documents(documents)
-        except Exception as e:
+            for doc in cursor:
+                yield self.__parse_document(doc, validate)
+        except errors.PyMongoError as e:
             logger.error(f"Error fetching documents: {e}")
             raise
+        finally:
+            cursor.close()
 
-    def __parse_documents(self, documents: list[dict]) -> list[T]:
-        """Convert MongoDB documents to Pydantic model instances.
+    def __parse_document(self, doc: dict, validate: bool = True) -> T:
+        """Convert a MongoDB document to a Pydantic model instance.
 
         Converts MongoDB ObjectId fields to strings and transforms the document structure
         to match the Pydantic model schema.
 
         Args:
-            documents (list[dict]): List of MongoDB documents to parse.
+            doc (dict): MongoDB document to parse.
+            validate (bool): Validate the document; False skips validation (model_construct).
 
         Returns:
-            list[T]: List of validated Pydantic model instances.
+            T: The Pydantic model instance.
         """
-        parsed_documents = []
-        for doc in documents:
-            for key, value in doc.items():
-                if isinstance(value, ObjectId):
-                    doc[key] = str(value)
-
-            _id = doc.pop("_id", None)
-            doc["id"] = _id
-
-            parsed_doc = self.model.model_validate(doc)
-            parsed_documents.append(parsed_doc)
+        for key, value in doc.items():
+            if isinstance(value, ObjectId):
+                doc[key] = str(value)
+
+        _id = doc.pop("_id", None)
+        doc["id"] = _id
+
+        if validate:
+            return self.model.model_validate(doc)
+        return self.model.model_construct(**doc)
+
+    def __write_chunks(
+        self, documents: Iterable[T], batch_size: int, write: Callable[[list[dict]], dict[str, int]]
+    ) -> BulkWriteReport:
+        """Run `write` on the dumped documents, `batch_size` at a time, and collect the outcome."""
+        report = BulkWriteReport()
+        iterator = iter(documents)
+        while chunk := list(islice(iterator, batch_size)):
+            if not all(isinstance(doc, BaseModel) for doc in chunk):
+                raise ValueError("Documents must be a list of Pydantic models.")
+
+            dict_documents = [doc.model_dump() for doc in chunk]
+            # Remove '_id' fields to avoid duplicate key errors
+            for doc in dict_documents:
+                doc.pop("_id", None)
 
-        return parsed_documents
+            offset = report.documents
+            report.documents += len(dict_documents)
+            report.chunks += 1
+            try:
+                counts = write(dict_documents)
+            except errors.BulkWriteError as e:
+                # Unordered: the other documents of the chunk were written
+                details = e.details
+                counts = {
+                    "inserted": details.get("nInserted", 0),
+                    "upserted": details.get("nUpserted", 0),
+                    "modified": details.get("nModified", 0),
+                }
+                report.failed_chunks += 1
+                report.errors.extend(
+                    {"index": offset + error["index"], "code": error.get("code"), "message": error.get("errmsg")}
+                    for error in details.get("writeErrors", [])
+                )
+                logger.warning(
+                    f"Bulk write chunk {report.chunks} (documents {offset}-{report.documents - 1}): "
+                    f"{len(details.get('writeErrors', []))} documents failed"
+                )
+            except errors.PyMongoError as e:
+                logger.error(f"Error writing documents {offset}-{report.documents - 1}: {e}")
+                raise
+            for key, value in counts.items():
+                setattr(report, key, getattr(report, key) + value)
+
+        if not report.chunks:
+            raise ValueError("Documents must be a non-empty list of Pydantic models.")
+        return report
 
     def get_collection_count(self) -> int:
         """Count the total number of documents in the collection.
@@ -203,11 +344,10 @@ class MongoClientWrapper(Generic[T]):
             raise
 
     def close(self) -> None:
-        """Close the MongoDB connection.
+        """Release the wrapper.
 
-        This method should be called when the service is no longer needed
-        to properly release resources, unless using the context manager.
+        The client and its connection pool are shared by the process and stay
+        open for the next user; the registry closes them at shutdown.
         """
 
-        self.client.close()
-        logger.debug("Closed MongoDB connection.")
\ No newline at end of file
+        logger.debug(f"Released MongoDB collection {self.collection_name}.")
\ No newline at end of file
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+from weakref import WeakKeyDictionary
+
+from loguru import logger
+from pymongo import AsyncMongoClient, MongoClient, monitoring
+
+from assistant.config import settings
+from assistant.infrastructure.metrics import mongo_checked_out, mongo_checkouts, mongo_pool_wait
+
+APP_NAME = "customerassistant"
+
+
+class _PoolMonitor(monitoring.ConnectionPoolListener, monitoring.ServerHeartbeatListener):
+    """Connection pool and heartbeat listener of the registry's clients of one kind ("sync" or "async")."""
+
+    def __init__(self, registry: "MongoClientRegistry", kind: str) -> None:
+        self.registry = registry
+        self.kind = kind
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        mongo_pool_wait.observe(event.duration, client=self.kind)
+        mongo_checkouts.inc(client=self.kind, outcome="ok")
+        mongo_checked_out.inc(client=self.kind)
+        self.registry._record_checkout(event.duration)
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        mongo_pool_wait.observe(event.duration, client=self.kind)
+        mongo_checkouts.inc(client=self.kind, outcome=event.reason)
+        self.registry._record_checkout(event.duration, failed=True)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        mongo_checked_out.dec(client=self.kind)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        pass
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def started(self, event: monitoring.ServerHeartbeatStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.ServerHeartbeatSucceededEvent) -> None:
+        self.registry._record_heartbeat(event.connection_id, None)
+
+    def failed(self, event: monitoring.ServerHeartbeatFailedEvent) -> None:
+        self.registry._record_heartbeat(event.connection_id, event.reply)
+
+
+class MongoClientRegistry:
+    """
+    Process-wide MongoDB clients: one connection pool per URI, shared by every component.
+
+    get() returns the MongoClient of a URI for blocking code and get_async() the AsyncMongoClient
+    of a URI for the running event loop (an async client is bound to the loop that uses it, so
+    there is one per loop, which for the API is a single one). Clients are created on first use
+    and connect lazily, on their first operation; no ping is paid up front.
+
+    Every pool is sized by the same settings, and the registry tracks checkouts, the time spent
+    waiting for a free connection and the outcome of the server heartbeats; snapshot() reports them
+    and the `assistant_mongo_*` metrics export them.
+
+    Args:
+        max_pool_size: Connections per pool.
+        min_pool_size: Connections each pool keeps open.
+        max_idle_time_ms: Idle time after which a pooled connection is closed.
+        wait_queue_timeout_ms: Time an operation waits for a free connection before failing.
+    """
+
+    def __init__(
+        self,
+        max_pool_size: int = settings.MONGO_MAX_POOL_SIZE,
+        min_pool_size: int = settings.MONGO_MIN_POOL_SIZE,
+        max_idle_time_ms: int = settings.MONGO_MAX_IDLE_TIME_MS,
+        wait_queue_timeout_ms: int = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    ) -> None:
+        self.options = {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min_pool_size,
+            "maxIdleTimeMS": max_idle_time_ms,
+            "waitQueueTimeoutMS": wait_queue_timeout_ms,
+        }
+        self._lock = threading.Lock()
+        self._clients: Dict[str, MongoClient] = {}
+        self._async_clients: WeakKeyDictionary = WeakKeyDictionary()
+        self._monitors = {kind: _PoolMonitor(self, kind) for kind in ("sync", "async")}
+
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._servers: Dict[str, Optional[str]] = {}
+
+    def get(self, uri: str = settings.MONGO_URI) -> MongoClient:
+        """The shared MongoClient of `uri`."""
+        with self._lock:
+            client = self._clients.get(uri)
+            if client is None:
+                client = self._clients[uri] = MongoClient(uri, **self._client_options("sync"))
+                logger.info(f"Created the shared MongoDB connection pool (max {self.options['maxPoolSize']})")
+            return client
+
+    def get_async(self, uri: str = settings.MONGO_URI) -> AsyncMongoClient:
+        """The shared AsyncMongoClient of `uri` for the running event loop."""
+        clients = self._async_clients.setdefault(asyncio.get_running_loop(), {})
+        client = clients.get(uri)
+        if client is None:
+            client = clients[uri] = AsyncMongoClient(uri, **self._client_options("async"))
+            logger.info(f"Created the shared async MongoDB connection pool (max {self.options['maxPoolSize']})")
+        return client
+
+    async def aclose(self) -> None:
+        """Close the async clients of the running event loop."""
+        clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+    def close(self) -> None:
+        """Close the sync clients; a later get() opens a new one."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Client, checkout, pool wait and server health counters."""
+        with self._lock:
+            servers = dict(self._servers)
+            checkouts, failures = self.checkouts, self.checkout_failures
+            total_wait, max_wait = self.total_wait_seconds, self.max_wait_seconds
+        return {
+            "clients": len(self._clients),
+            "async_clients": sum(len(clients) for clients in list(self._async_clients.values())),
+            "pool_options": dict(self.options),
+            "checkouts": checkouts,
+            "checkout_failures": failures,
+            "avg_wait_ms": 1000 * total_wait / (checkouts + failures) if checkouts + failures else 0.0,
+            "max_wait_ms": 1000 * max_wait,
+            # None until a first operation has connected
+            "healthy": all(error is None for error in servers.values()) if servers else None,
+            "servers": {address: "up" if error is None else f"down: {error}" for address, error in servers.items()},
+        }
+
+    def _client_options(self, kind: str) -> Dict[str, Any]:
+        return {**self.options, "appname": APP_NAME, "connect": False, "event_listeners": [self._monitors[kind]]}
+
+    def _record_checkout(self, wait_seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            if failed:
+                self.checkout_failures += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def _record_heartbeat(self, address: tuple, error: Optional[Exception]) -> None:
+        server = ":".join(str(part) for part in address)
+        with self._lock:
+            previous = self._servers.get(server, None)
+            self._servers[server] = None if error is None else str(error)
+        if error is not None and previous is None:
+            logger.warning(f"MongoDB server {server} is unreachable: {error}")
+        elif error is None and previous is not None:
+            logger.info(f"MongoDB server {server} is reachable again")
+
+
+mongo_clients = MongoClientRegistry()
@@ -1,18 +1,32 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
 from typing import Generic, Type, TypeVar
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 from bson import ObjectId
 from loguru import logger
 from pydantic import BaseModel
-from uuid import uuid4
+from uuid import NAMESPACE_URL, uuid5
 
 from langchain_qdrant import QdrantVectorStore, RetrievalMode
 from langchain_core.documents import Document
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, SparseVectorParams, SparseIndexParams
-from assistant.application.rag.embeddings import get_openai_embedding_model
+from assistant.application.rag.embeddings import (
+    embedding_dimensions,
+    get_openai_embedding_model,
+    truncate_embedding,
+)
+from assistant.application.rag.sparse import get_sparse_embedding_model
 
 from assistant.config import settings
 
+SHORTLIST_VECTOR_NAME = "shortlist"
+
 
 class QdrantManager:
     """
@@ -30,23 +44,63 @@ class QdrantManager:
         api_key: Optional[str] = None,
         retrieval_mode: RetrievalMode = RetrievalMode.DENSE,
         vector_name: Optional[str] = '',  # Modified: default to unnamed vector
-        sparse_vector_name: Optional[str] = None,
+        sparse_vector_name: Optional[str] = "sparse_vector",
         sparse_embedding=None,
         force_recreate: bool = False,  # New: force recreation flag
+        payload_indexes: Optional[List[str]] = None,
+        partition_field: Optional[str] = None,
+        quantization: Optional[str] = None,
+        quantization_always_ram: bool = True,
+        on_disk: bool = False,
+        search_params: Optional[models.SearchParams] = None,
+        shortlist_dimensions: Optional[int] = None,
+        shortlist_size: int = 50,
     ):
+        if shortlist_dimensions:
+            if retrieval_mode != RetrievalMode.DENSE:
+                raise ValueError("Two-stage shortlist search is only available in dense retrieval mode")
+            # The full and shortlist embeddings live side by side as named vectors
+            vector_name = vector_name or "full"
         self.collection_name = collection_name
         self.embedding = embedding
         self.sparse_embedding = sparse_embedding
         self.retrieval_mode = retrieval_mode
         self.vector_name = vector_name
-        self.sparse_vector_name = sparse_vector_name
+        self.sparse_vector_name = sparse_vector_name or "sparse_vector"
         self.force_recreate = force_recreate
+        self.vector_size = vector_size
+        # Metadata fields used in filters get a keyword payload index
+        self.payload_indexes = list(payload_indexes or [])
+        # When set, documents are stored in one collection per value of this metadata field
+        self.partition_field = partition_field
+        self._partitions: set[str] = set()
+        self._partitions_checked_at = 0.0
+        self._partition_lock = threading.Lock()
+        self._stores: Dict[str, QdrantVectorStore] = {}
+        # Dense vector storage: optional int8/binary copies kept in RAM, originals optionally on disk
+        self.quantization = quantization
+        self.quantization_always_ram = quantization_always_ram
+        self.on_disk = on_disk
+        # Used by every search that does not pass its own search_params
+        self.search_params = search_params
+        # Two-stage search: shortlist on the leading dimensions, rescore on the full vector
+        self.shortlist_dimensions = shortlist_dimensions
+        self.shortlist_size = shortlist_size
+        # Embedded (path based) Qdrant is single-writer, so callers must not write concurrently
+        self.is_local = bool(path)
+        self._generation: Optional[int] = None
+        self._generation_checked_at = 0.0
 
         # Initialize Qdrant client
         self.client = self._init_client(path)
+        self._async_client: Optional[AsyncQdrantClient] = None
 
         # Create collection if it does not exist or force_recreate is True
         self._create_collection(distance_metric, vector_size)
+        if self.partition_field:
+            # Partitions created with earlier settings get the current ones, like the main collection
+            for name in sorted(self._refresh_partitions(recreate=force_recreate)):
+                self._sync_storage(name)
 
         # Initialize LangChain QdrantVectorStore wrapper
         self.vector_store = self._init_vector_store()
@@ -60,36 +114,57 @@ class QdrantManager:
         else:
             return QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
 
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        """
+        Shared AsyncQdrantClient, created on first use.
+
+        A single client (and therefore a single HTTP/gRPC connection pool) serves every
+        concurrent request of the process.
+        """
+        if self._async_client is None:
+            self._async_client = AsyncQdrantClient(
+                url=settings.QDRANT_URL,
+                api_key=settings.QDRANT_API_KEY,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                grpc_port=settings.QDRANT_GRPC_PORT,
+                pool_size=settings.QDRANT_POOL_SIZE,
+            )
+        return self._async_client
+
     def _create_collection(self, distance_metric: Distance, vector_size: int):
         vectors_config = None
         sparse_vectors_config = None
+        dense_params = VectorParams(size=vector_size, distance=distance_metric, on_disk=self.on_disk or None)
 
         if self.retrieval_mode == RetrievalMode.DENSE:
             if self.vector_name:
-                vectors_config = {self.vector_name: VectorParams(size=vector_size, distance=distance_metric)}
+                vectors_config = {self.vector_name: dense_params}
             else:
-                vectors_config = VectorParams(size=vector_size, distance=distance_metric)
+                vectors_config = dense_params
+            if self.shortlist_dimensions:
+                # The shortlist is searched first and on every query, so it always stays in RAM
+                vectors_config[SHORTLIST_VECTOR_NAME] = VectorParams(
+                    size=self.shortlist_dimensions, distance=distance_metric
+                )
 
         elif self.retrieval_mode == RetrievalMode.SPARSE:
             sparse_vectors_config = {
-                self.sparse_vector_name or "sparse_vector": SparseVectorParams(
-                    index=SparseIndexParams(on_disk=False)
-                )
+                self.sparse_vector_name: SparseVectorParams(index=SparseIndexParams(on_disk=False))
             }
             vectors_config = {}
 
         elif self.retrieval_mode == RetrievalMode.HYBRID:
-            vectors_config = (
-                {self.vector_name: VectorParams(size=vector_size, distance=distance_metric)}
-                if self.vector_name else
-                VectorParams(size=vector_size, distance=distance_metric)
-            )
+            vectors_config = {self.vector_name: dense_params} if self.vector_name else dense_params
             sparse_vectors_config = {
-                self.sparse_vector_name or "sparse_vector": SparseVectorParams(
-                    index=SparseIndexParams(on_disk=False)
-                )
+                self.sparse_vector_name: SparseVectorParams(index=SparseIndexParams(on_disk=False))
             }
 
+        # Partition collections are created later with the same layout
+        self._vectors_config = vectors_config
+        self._sparse_vectors_config = sparse_vectors_config
+        self._quantization_config = self._build_quantization_config()
+
         existing_collections = self.client.get_collections().collections
         existing_names = [col.name for col in existing_collections]
 
@@ -101,25 +176,278 @@ class QdrantManager:
                 collection_name=self.collection_name,
                 vectors_config=vectors_config,
                 sparse_vectors_config=sparse_vectors_config,
+                quantization_config=self._quantization_config,
+            )
+        else:
+            self._sync_storage(self.collection_name)
+
+        self.ensure_payload_indexes(self.collection_name)
+
+    def _build_quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=0.99, always_ram=self.quantization_always_ram
+                )
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=self.quantization_always_ram)
             )
+        if self.quantization not in (None, "none"):
+            raise ValueError(f"Unknown quantization: {self.quantization}")
+        return None
 
-    def _init_vector_store(self) -> QdrantVectorStore:
+    def _sync_storage(self, collection_name: str) -> None:
+        """
+        Apply changed quantization and on-disk settings to an existing collection; Qdrant re-quantizes
+        and moves the vectors in the background.
+        """
+        # Embedded (path based) Qdrant neither quantizes nor keeps vectors on disk
+        if self.is_local:
+            return
+
+        config = self.client.get_collection(collection_name).config
+        if _quantization_differs(self._quantization_config, config.quantization_config):
+            self.client.update_collection(
+                collection_name, quantization_config=self._quantization_config or models.Disabled.DISABLED
+            )
+            logger.info(
+                f"Updated quantization of {collection_name} to {self.quantization or 'none'} "
+                f"(always_ram={self.quantization_always_ram})"
+            )
+
+        if self.retrieval_mode == RetrievalMode.SPARSE:
+            return
+        vectors = config.params.vectors
+        dense = vectors.get(self.vector_name or "") if isinstance(vectors, dict) else vectors
+        if dense is not None and bool(dense.on_disk) != self.on_disk:
+            self.client.update_collection(
+                collection_name, vectors_config={self.vector_name or "": models.VectorParamsDiff(on_disk=self.on_disk)}
+            )
+            logger.info(f"Updated on-disk storage of the vectors of {collection_name} to {self.on_disk}")
+
+    def ensure_payload_indexes(self, collection_name: str) -> None:
+        """
+        Create the missing keyword payload indexes of a collection.
+
+        Indexes created before the points are inserted also let Qdrant build the extra HNSW links
+        that keep filtered searches fast, so new collections get them straight away.
+        """
+        # Embedded (path based) Qdrant ignores payload indexes
+        if not self.payload_indexes or self.is_local:
+            return
+
+        payload_schema = self.client.get_collection(collection_name).payload_schema or {}
+        for field in self.payload_indexes:
+            key = f"{QdrantVectorStore.METADATA_KEY}.{field}"
+            if key not in payload_schema:
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=key,
+                    field_schema=models.PayloadSchemaType.KEYWORD,
+                )
+                logger.info(f"Created keyword payload index on {key} in {collection_name}")
+
+    def _init_vector_store(self, collection_name: Optional[str] = None) -> QdrantVectorStore:
         return QdrantVectorStore(
             client=self.client,
-            collection_name=self.collection_name,
+            collection_name=collection_name or self.collection_name,
             embedding=self.embedding,
             sparse_embedding=self.sparse_embedding,
             retrieval_mode=self.retrieval_mode,
             vector_name=self.vector_name,
+            sparse_vector_name=self.sparse_vector_name,
         )
 
+    def partition_name(self, value: Any) -> str:
+        """Collection holding the documents whose partition field equals `value`."""
+        slug = re.sub(r"[^a-z0-9]+", "_", str(value).lower()).strip("_")
+        return f"{self.collection_name}__{slug}"
+
+    def _refresh_partitions(self, recreate: bool = False) -> set[str]:
+        """Reload the partition collections created by any process, dropping them on recreate."""
+        prefix = f"{self.collection_name}__"
+        names = {col.name for col in self.client.get_collections().collections if col.name.startswith(prefix)}
+        if recreate:
+            for name in names:
+                self.client.delete_collection(name)
+            names = set()
+        with self._partition_lock:
+            self._partitions = names
+            self._partitions_checked_at = time.monotonic()
+        return names
+
+    def _ensure_partition(self, name: str) -> None:
+        with self._partition_lock:
+            if name in self._partitions:
+                return
+            if not self.client.collection_exists(name):
+                self.client.create_collection(
+                    collection_name=name,
+                    vectors_config=self._vectors_config,
+                    sparse_vectors_config=self._sparse_vectors_config,
+                    quantization_config=self._quantization_config,
+                )
+                logger.info(f"Created partition collection {name}")
+            else:
+                self._sync_storage(name)
+            self.ensure_payload_indexes(name)
+            self._partitions.add(name)
+
+    def _data_collections(self, max_age: float = 0.0) -> List[str]:
+        """Every collection holding documents: the partitions, or the main collection."""
+        if not self.partition_field:
+            return [self.collection_name]
+        if time.monotonic() - self._partitions_checked_at >= max_age:
+            self._refresh_partitions()
+        return sorted(self._partitions)
+
+    def _route(self, filters: Optional[Dict[str, Any]]) -> List[tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Resolve the collections a filtered search must query, with the filter left to apply in each.
+
+        Without partitioning everything goes to the main collection. With partitioning, a filter on
+        the partition field selects the matching partition collections and is dropped from the
+        payload filter, since every point in those collections matches it.
+        """
+        if not self.partition_field:
+            return [(self.collection_name, filters)]
+
+        filters = dict(filters or {})
+        if self.partition_field not in filters:
+            max_age = settings.QDRANT_GENERATION_REFRESH_SECONDS
+            return [(name, filters or None) for name in self._data_collections(max_age=max_age)]
+
+        value = filters.pop(self.partition_field)
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        routes = []
+        for name in dict.fromkeys(self.partition_name(v) for v in values):
+            # A partition unknown to this process may have been created by an ingestion since
+            if name in self._partitions or self.client.collection_exists(name):
+                self._partitions.add(name)
+                routes.append((name, filters or None))
+        return routes
+
+    def _store(self, collection_name: str) -> QdrantVectorStore:
+        if collection_name == self.collection_name:
+            return self.vector_store
+        store = self._stores.get(collection_name)
+        if store is None:
+            store = self._stores[collection_name] = self._init_vector_store(collection_name)
+        return store
+
     def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        """Upsert documents. Ids default to content hashes, so adding the same document twice is a no-op."""
         if ids is None:
-            ids = [str(uuid4()) for _ in documents]
-        self.vector_store.add_documents(documents=documents, ids=ids)
+            ids = [document_id(doc) for doc in documents]
+        self.upsert_points(ids, documents, self.build_vectors([doc.page_content for doc in documents]))
+
+    def build_vectors(self, texts: List[str]) -> List[models.VectorStruct]:
+        """Embed texts into the vector layout of the collection (dense, sparse or both)."""
+        return self.vector_store._build_vectors(texts)
+
+    def _with_shortlist(self, vector: models.VectorStruct) -> Dict[str, Any]:
+        """Add the truncated shortlist embedding next to the full one."""
+        vectors = dict(vector) if isinstance(vector, dict) else {self.vector_name: vector}
+        vectors.setdefault(SHORTLIST_VECTOR_NAME, truncate_embedding(vectors[self.vector_name], self.shortlist_dimensions))
+        return vectors
+
+    def upsert_points(
+        self, ids: List[str], documents: List[Document], vectors: List[models.VectorStruct]
+    ) -> None:
+        """Write already embedded documents using the LangChain payload layout, routed to their partition."""
+        payloads = QdrantVectorStore._build_payloads(
+            [doc.page_content for doc in documents],
+            [doc.metadata for doc in documents],
+            self.vector_store.content_payload_key,
+            self.vector_store.metadata_payload_key,
+        )
+
+        if self.shortlist_dimensions:
+            vectors = [self._with_shortlist(vector) for vector in vectors]
+
+        points_by_collection: Dict[str, List[models.PointStruct]] = {}
+        for point_id, document, vector, payload in zip(ids, documents, vectors, payloads):
+            collection_name = self.collection_name
+            if self.partition_field:
+                collection_name = self.partition_name(document.metadata.get(self.partition_field))
+                self._ensure_partition(collection_name)
+            points_by_collection.setdefault(collection_name, []).append(
+                models.PointStruct(id=point_id, vector=vector, payload=payload)
+            )
+
+        for collection_name, points in points_by_collection.items():
+            self.client.upsert(collection_name=collection_name, points=points)
+
+    def iter_point_ids(self, batch_size: int = 1000) -> Iterator[str]:
+        """Iterate over the ids of every point stored in the collection (or its partitions)."""
+        for collection_name in self._data_collections():
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=False,
+                    with_vectors=False,
+                )
+                for point in points:
+                    yield str(point.id)
+                if offset is None:
+                    break
 
     def delete_documents(self, ids: List[str]) -> bool:
-        return self.vector_store.delete(ids=ids)
+        for collection_name in self._data_collections():
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=ids),
+            )
+        return True
+
+    def flush(self) -> None:
+        """Writes are visible as soon as Qdrant acknowledges them; nothing to publish."""
+
+    def get_generation(self, max_age: float = settings.QDRANT_GENERATION_REFRESH_SECONDS) -> int:
+        """
+        Return the knowledge base generation stored in the collection metadata.
+
+        Every ingestion bumps the generation, which lets caches built on top of the collection
+        detect stale entries. The value is re-read from Qdrant at most every `max_age` seconds.
+        """
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked_at >= max_age:
+            metadata = self.client.get_collection(self.collection_name).config.metadata or {}
+            self._generation = int(metadata.get("generation", 0))
+            self._generation_checked_at = now
+        return self._generation
+
+    def bump_generation(self, fingerprint: Optional[str] = None) -> int:
+        """Increment the knowledge base generation after an ingestion and return the new value.
+
+        Args:
+            fingerprint: Content fingerprint of the knowledge base the new generation stands for.
+        """
+        generation = self.get_generation(max_age=0) + 1
+        metadata = {"generation": generation}
+        if fingerprint is not None:
+            metadata["fingerprint"] = fingerprint
+        self.client.update_collection(self.collection_name, metadata=metadata)
+        self._generation, self._generation_checked_at = generation, time.monotonic()
+        return generation
+
+    def sync_generation(self, fingerprint: str) -> int:
+        """
+        Bump the generation unless it already stands for the content `fingerprint` identifies, and
+        return the current value.
+
+        Unlike bumping when an ingestion run changed something, this also catches up on a run that
+        crashed after writing documents but before bumping.
+        """
+        metadata = self.client.get_collection(self.collection_name).config.metadata or {}
+        if metadata.get("fingerprint") == fingerprint:
+            return self.get_generation(max_age=0)
+        return self.bump_generation(fingerprint)
 
     def similarity_search(
         self,
@@ -128,6 +456,7 @@ class QdrantManager:
         search_type: Optional[str] = None,
         filters: Optional[Dict[str, Any]] = None,
         search_kwargs: Optional[Dict[str, Any]] = None,
+        search_params: Optional[models.SearchParams] = None,
     ) -> List[Document]:
         """
         Perform a similarity search with optional metadata (payload) filtering.
@@ -136,28 +465,317 @@ class QdrantManager:
             query: Query string to search.
             k: Number of top documents to return.
             search_type: Type of search ("similarity", "mmr", etc.).
-            filters: Metadata filter for narrowing results.
+            filters: Metadata filter for narrowing results, e.g. {"source": "hr"}.
             search_kwargs: Additional search options.
+            search_params: Qdrant search parameters (hnsw_ef, quantization rescore/oversampling).
+                Defaults to the search_params the manager was created with.
 
         Returns:
             List of Document objects.
         """
+        search_params = search_params or self.search_params
+        routes = self._route(filters)
+        if self.shortlist_dimensions:
+            # Two-stage search runs as a single Qdrant query with a prefetch, not through LangChain
+            dense_vector = self.embedding.embed_query(query)
+            responses = [
+                self.client.query_points(
+                    **self._query_options(
+                        collection_name, dense_vector, None, k, self._build_filter(route_filters), search_params
+                    )
+                )
+                for collection_name, route_filters in routes
+            ]
+            return self._to_documents(routes, responses, k)
+        if len(routes) != 1:
+            # Fan out over the partitions and keep the overall best matches
+            scored = [
+                result
+                for collection_name, route_filters in routes
+                for result in self._store(collection_name).similarity_search_with_score(
+                    query, k=k, filter=self._build_filter(route_filters), search_params=search_params
+                )
+            ]
+            return [doc for doc, _ in sorted(scored, key=lambda item: item[1], reverse=True)[:k]]
+
+        collection_name, route_filters = routes[0]
+
         # Build search kwargs with default k
         search_kwargs = search_kwargs or {}
         search_kwargs.setdefault("k", k)
+        if route_filters:
+            search_kwargs.setdefault("filter", self._build_filter(route_filters))
+        if search_params:
+            search_kwargs.setdefault("search_params", search_params)
 
-        retriever = self.vector_store.as_retriever(
+        retriever = self._store(collection_name).as_retriever(
             search_type=search_type or "similarity",
             search_kwargs=search_kwargs,
-            filter = filters
         )
         return retriever.invoke(query)
 
-def vectorstore():
-    # Instantiate QdrantManager
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+        search_params: Optional[models.SearchParams] = None,
+    ) -> List[Document]:
+        """
+        Non-blocking similarity search through the shared AsyncQdrantClient.
+
+        Args:
+            query: Query string to search.
+            k: Number of top documents to return.
+            filters: Metadata filter for narrowing results, e.g. {"source": "hr"}.
+            search_params: Optional Qdrant search parameters, defaults to the manager's search_params.
+
+        Returns:
+            List of Document objects.
+        """
+        search_params = search_params or self.search_params
+        if self.is_local:
+            # Embedded Qdrant has no async server to talk to; keep the event loop free anyway
+            return await asyncio.to_thread(
+                self.similarity_search, query, k, None, filters, None, search_params
+            )
+
+        dense_vector = sparse_vector = None
+        if self.retrieval_mode in (RetrievalMode.DENSE, RetrievalMode.HYBRID):
+            dense_vector = await self.embedding.aembed_query(query)
+        if self.retrieval_mode in (RetrievalMode.SPARSE, RetrievalMode.HYBRID):
+            sparse_vector = await self.sparse_embedding.aembed_query(query)
+
+        routes = await asyncio.to_thread(self._route, filters) if self.partition_field else self._route(filters)
+        responses = await asyncio.gather(
+            *(
+                self.async_client.query_points(
+                    **self._query_options(
+                        collection_name,
+                        dense_vector,
+                        sparse_vector,
+                        k,
+                        self._build_filter(route_filters),
+                        search_params,
+                    )
+                )
+                for collection_name, route_filters in routes
+            )
+        )
+
+        return self._to_documents(routes, responses, k)
+
+    def _to_documents(
+        self, routes: List[tuple[str, Any]], responses: List[models.QueryResponse], k: int
+    ) -> List[Document]:
+        """Merge the query responses of every routed collection into the top k documents."""
+        scored = [
+            (collection_name, point)
+            for (collection_name, _), response in zip(routes, responses)
+            for point in response.points
+        ]
+        if len(routes) > 1:
+            scored = sorted(scored, key=lambda item: item[1].score, reverse=True)[:k]
+        return [
+            QdrantVectorStore._document_from_point(
+                point,
+                collection_name,
+                self.vector_store.content_payload_key,
+                self.vector_store.metadata_payload_key,
+            )
+            for collection_name, point in scored
+        ]
+
+    def similarity_search_by_vector(
+        self,
+        vector: List[float],
+        k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+        search_params: Optional[models.SearchParams] = None,
+    ) -> List[models.ScoredPoint]:
+        """Dense search with an already embedded query, returning the scored points."""
+        search_params = search_params or self.search_params
+        points = []
+        for collection_name, route_filters in self._route(filters):
+            options = self._query_options(
+                collection_name, vector, None, k, self._build_filter(route_filters), search_params
+            )
+            points += self.client.query_points(**{**options, "with_payload": False}).points
+        return sorted(points, key=lambda point: point.score, reverse=True)[:k]
+
+    def _query_options(
+        self,
+        collection_name: str,
+        dense_vector: Optional[List[float]],
+        sparse_vector,
+        k: int,
+        query_filter: Optional[models.Filter],
+        search_params: Optional[models.SearchParams],
+    ) -> Dict[str, Any]:
+        """Build the query_points arguments for the configured retrieval mode."""
+        options: Dict[str, Any] = {
+            "collection_name": collection_name,
+            "query_filter": query_filter,
+            "search_params": search_params,
+            "limit": k,
+            "with_payload": True,
+            "with_vectors": False,
+        }
+        sparse_query = (
+            models.SparseVector(indices=sparse_vector.indices, values=sparse_vector.values)
+            if sparse_vector is not None
+            else None
+        )
+        sparse_vector_name = self.sparse_vector_name
+
+        if self.retrieval_mode == RetrievalMode.DENSE and self.shortlist_dimensions:
+            options.update(
+                prefetch=models.Prefetch(
+                    using=SHORTLIST_VECTOR_NAME,
+                    query=truncate_embedding(dense_vector, self.shortlist_dimensions),
+                    filter=query_filter,
+                    limit=max(self.shortlist_size, k),
+                    params=search_params,
+                ),
+                query=dense_vector,
+                using=self.vector_name,
+            )
+        elif self.retrieval_mode == RetrievalMode.DENSE:
+            options.update(query=dense_vector, using=self.vector_name or None)
+        elif self.retrieval_mode == RetrievalMode.SPARSE:
+            options.update(query=sparse_query, using=sparse_vector_name)
+        else:
+            options.update(
+                prefetch=[
+                    models.Prefetch(
+                        using=self.vector_name or None,
+                        query=dense_vector,
+                        filter=query_filter,
+                        limit=k,
+                        params=search_params,
+                    ),
+                    models.Prefetch(
+                        using=sparse_vector_name,
+                        query=sparse_query,
+                        filter=query_filter,
+                        limit=k,
+                    ),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+            )
+        return options
+
+    def _build_filter(self, filters: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+        """Translate a {"field": value} metadata filter into a Qdrant payload filter."""
+        if not filters:
+            return None
+
+        conditions = []
+        for field, value in filters.items():
+            match = (
+                models.MatchAny(any=list(value))
+                if isinstance(value, (list, tuple, set))
+                else models.MatchValue(value=value)
+            )
+            conditions.append(
+                models.FieldCondition(key=f"{self.vector_store.metadata_payload_key}.{field}", match=match)
+            )
+        return models.Filter(must=conditions)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+
+def document_id(document: Document) -> str:
+    """Deterministic point id derived from the document content and metadata."""
+    content = json.dumps(
+        {"page_content": document.page_content, "metadata": document.metadata}, sort_keys=True
+    )
+    return str(uuid5(NAMESPACE_URL, hashlib.sha256(content.encode("utf-8")).hexdigest()))
+
+
+def _quantization_differs(
+    desired: Optional[models.QuantizationConfig], current: Optional[models.QuantizationConfig]
+) -> bool:
+    """Whether a collection's quantization differs from the desired one in its kind or any field the latter sets."""
+    if desired is None or current is None:
+        return (desired is None) != (current is None)
+    if type(desired) is not type(current):
+        return True
+    return not _includes(current.model_dump(), desired.model_dump(exclude_none=True))
+
+
+def _includes(actual: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    return all(
+        _includes(actual.get(key) or {}, value) if isinstance(value, dict) else actual.get(key) == value
+        for key, value in expected.items()
+    )
+
+
+def search_params_from_settings() -> Optional[models.SearchParams]:
+    """Default search parameters: HNSW ef and, for quantized collections, rescoring and oversampling."""
+    quantization = None
+    if settings.QDRANT_QUANTIZATION != "none":
+        quantization = models.QuantizationSearchParams(
+            rescore=settings.QDRANT_SEARCH_RESCORE,
+            oversampling=settings.QDRANT_SEARCH_OVERSAMPLING,
+        )
+    if quantization is None and settings.QDRANT_HNSW_EF is None:
+        return None
+    return models.SearchParams(hnsw_ef=settings.QDRANT_HNSW_EF, quantization=quantization)
+
+
+def collection_name_for(
+    retrieval_mode: RetrievalMode,
+    dimensions: Optional[int] = settings.RAG_EMBEDDING_DIMENSIONS,
+    shortlist_dimensions: Optional[int] = settings.RAG_SHORTLIST_DIMENSIONS,
+) -> str:
+    """
+    Each vector layout (retrieval mode, embedding size, shortlist) has its own collection, so changing
+    the settings never writes incompatible vectors into an existing collection. The default layout
+    keeps the original collection name.
+    """
+    name = settings.QDRANT_DATABASE_NAME
+    if retrieval_mode != RetrievalMode.DENSE:
+        name += f"_{retrieval_mode.value}"
+    if dimensions:
+        name += f"_d{dimensions}"
+    if shortlist_dimensions:
+        name += f"_s{shortlist_dimensions}"
+    return name
+
+
+def vectorstore(retrieval_mode: Optional[str] = None):
+    retrieval_mode = RetrievalMode(retrieval_mode or settings.RETRIEVAL_MODE)
+
+    if settings.VECTOR_BACKEND == "mmap":
+        # Imported here, the mmap backend reuses document_id from this module
+        from assistant.infrastructure.mmap_index.service import MmapVectorIndex
+
+        if retrieval_mode != RetrievalMode.DENSE:
+            raise ValueError("The mmap vector backend only supports dense retrieval")
+        return MmapVectorIndex(
+            path=settings.MMAP_INDEX_PATH,
+            embedding=get_openai_embedding_model(),
+            vector_size=embedding_dimensions(),
+            dtype=settings.MMAP_INDEX_DTYPE,
+        )
+
+    # Instantiate QdrantManager; sparse-only retrieval never calls the embedding API
     return QdrantManager(
-        collection_name=settings.QDRANT_DATABASE_NAME,
-        embedding=get_openai_embedding_model(),
-        vector_size=1536,
-        retrieval_mode=RetrievalMode.DENSE,
+        collection_name=collection_name_for(retrieval_mode),
+        embedding=get_openai_embedding_model() if retrieval_mode != RetrievalMode.SPARSE else None,
+        sparse_embedding=get_sparse_embedding_model() if retrieval_mode != RetrievalMode.DENSE else None,
+        vector_size=embedding_dimensions(),
+        retrieval_mode=retrieval_mode,
+        payload_indexes=settings.QDRANT_PAYLOAD_INDEXES,
+        partition_field=settings.QDRANT_PARTITION_FIELD,
+        quantization=settings.QDRANT_QUANTIZATION,
+        quantization_always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+        on_disk=settings.QDRANT_VECTORS_ON_DISK,
+        search_params=search_params_from_settings(),
+        shortlist_dimensions=settings.RAG_SHORTLIST_DIMENSIONS,
+        shortlist_size=settings.RAG_SHORTLIST_SIZE,
     )
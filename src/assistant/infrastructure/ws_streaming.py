@@ -0,0 +1,320 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+
+from assistant.config import settings
+
+# Both ship with the LangChain/LangGraph stack; plain json is the fallback for text frames
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ormsgpack
+except ImportError:
+    ormsgpack = None
+
+ENCODINGS = ("json", "msgpack")
+
+# Closes the socket of a client that does not read its stream (RFC 6455 "Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+_END = object()
+
+
+class SlowConsumerError(RuntimeError):
+    """The client did not read the stream fast enough for the configured slow-consumer policy."""
+
+
+class FrameCodec:
+    """Encodes and decodes websocket messages as JSON text frames or msgpack binary frames.
+
+    Args:
+        encoding: "json" or "msgpack".
+    """
+
+    def __init__(self, encoding: str = "json") -> None:
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown websocket encoding {encoding!r}, expected one of {ENCODINGS}")
+        if encoding == "msgpack" and ormsgpack is None:
+            raise ValueError("msgpack framing needs the ormsgpack package")
+        self.encoding = encoding
+        # Multiplexed requests share the socket; frames must not interleave
+        self._send_lock = asyncio.Lock()
+
+    def encode(self, payload: Dict[str, Any]) -> str | bytes:
+        if self.encoding == "msgpack":
+            return ormsgpack.packb(payload)
+        if orjson is not None:
+            return orjson.dumps(payload).decode()
+        return json.dumps(payload, separators=(",", ":"))
+
+    async def send(self, websocket: WebSocket, payload: Dict[str, Any]) -> int:
+        """Send one frame and return its size in bytes."""
+        frame = self.encode(payload)
+        async with self._send_lock:
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+        return len(frame)
+
+    async def receive(self, websocket: WebSocket) -> Any:
+        """Receive one client message; text frames are JSON and binary frames msgpack, whatever the encoding."""
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is not None:
+            if ormsgpack is None:
+                raise ValueError("Binary frames need the ormsgpack package")
+            return ormsgpack.unpackb(message["bytes"])
+        return json.loads(message["text"])
+
+
+class CoalescingStreamSender:
+    """
+    Streams response chunks to a websocket in coalesced frames.
+
+    The graph stream and the socket are decoupled by a bounded queue of chunks. The sending side
+    merges whatever is queued into a single frame and flushes it once `flush_chars` characters are
+    buffered or `flush_seconds` after the first buffered chunk, so a fast LLM produces a handful of
+    frames per second instead of one per token, and a slow socket gets larger frames rather than a
+    growing backlog. When the queue is full the slow-consumer policy applies: "block" pauses the
+    graph stream until the client catches up, "disconnect" waits up to `slow_consumer_timeout`
+    seconds and then raises SlowConsumerError.
+
+    Args:
+        websocket: The accepted websocket.
+        codec: Frame encoding of the connection.
+        flush_chars: Characters buffered before a frame is sent; 0 sends every chunk as it comes.
+        flush_seconds: Maximum time a chunk waits for others to be coalesced with.
+        max_pending: Capacity of the chunk queue between the graph stream and the socket.
+        slow_consumer_policy: "block" or "disconnect".
+        slow_consumer_timeout: Seconds a full queue is tolerated under the "disconnect" policy.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        codec: FrameCodec,
+        flush_chars: int = settings.WS_STREAM_FLUSH_CHARS,
+        flush_seconds: float = settings.WS_STREAM_FLUSH_MS / 1000,
+        max_pending: int = settings.WS_STREAM_MAX_PENDING_CHUNKS,
+        slow_consumer_policy: str = settings.WS_SLOW_CONSUMER_POLICY,
+        slow_consumer_timeout: float = settings.WS_SLOW_CONSUMER_TIMEOUT_SECONDS,
+    ) -> None:
+        self.websocket = websocket
+        self.codec = codec
+        self.flush_chars = flush_chars
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.slow_consumer_policy = slow_consumer_policy
+        self.slow_consumer_timeout = slow_consumer_timeout
+
+        self.chunks = 0
+        self.frames = 0
+        self.bytes_sent = 0
+
+    async def stream(self, chunks: AsyncIterator[str], envelope: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Send every chunk of the stream as {"chunk": ...} frames and return the full response.
+
+        Args:
+            chunks: The response stream.
+            envelope: Extra fields added to every frame.
+
+        Raises:
+            SlowConsumerError: The client stopped reading under the "disconnect" policy.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        parts: List[str] = []
+        producer = asyncio.create_task(self._produce(chunks, queue, parts))
+        consumer = asyncio.create_task(self._consume(queue, envelope or {}))
+        try:
+            await asyncio.wait({producer, consumer}, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # Also reached when the caller is cancelled: stop reading the graph stream
+            for task in (producer, consumer):
+                task.cancel()
+            await asyncio.gather(producer, consumer, return_exceptions=True)
+
+        for task in (producer, consumer):
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return "".join(parts)
+
+    async def _produce(self, chunks: AsyncIterator[str], queue: asyncio.Queue, parts: List[str]) -> None:
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                parts.append(chunk)
+                self.chunks += 1
+                await self._put(queue, chunk)
+            # On failure stream() cancels the consumer instead; a stream error is reported as such
+            await self._put(queue, _END)
+        finally:
+            # Cancelled while waiting for queue space, the stream is suspended rather than closed;
+            # close it now so the graph run behind it stops instead of generating for nobody
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+
+    async def _put(self, queue: asyncio.Queue, item: Any) -> None:
+        if not queue.full():
+            queue.put_nowait(item)
+            return
+        if self.slow_consumer_policy == "block":
+            await queue.put(item)
+            return
+        try:
+            await asyncio.wait_for(queue.put(item), timeout=self.slow_consumer_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Websocket client read nothing for {self.slow_consumer_timeout}s, disconnecting it")
+            raise SlowConsumerError("The client is not reading the response stream") from None
+
+    async def _consume(self, queue: asyncio.Queue, envelope: Dict[str, Any]) -> None:
+        finished = False
+        while not finished:
+            item = await queue.get()
+            if item is _END:
+                return
+            buffer, size = [item], len(item)
+
+            # Coalesce: take what is already queued, then wait for more until the size or time limit
+            deadline = time.monotonic() + self.flush_seconds
+            while size < self.flush_chars:
+                if queue.empty():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                if item is _END:
+                    finished = True
+                    break
+                buffer.append(item)
+                size += len(item)
+
+            self.bytes_sent += await self.codec.send(self.websocket, {**envelope, "chunk": "".join(buffer)})
+            self.frames += 1
+
+
+class MultiplexedChatSession:
+    """
+    Serves the messages of one /ws/chat connection, several of them concurrently.
+
+    A message with a "request_id" (a string or an integer) is answered in a task of its own, so
+    the connection keeps reading while the answer streams, and every frame of the answer carries
+    the same "request_id". Up to `max_concurrent` messages are in flight at the same time; requests
+    beyond that, requests reusing the id of one in flight and requests with an id of another type
+    get an error frame. Messages without a "request_id" are
+    answered one at a time, in order, as before; they count toward `max_concurrent` too, and when it
+    is reached the connection stops reading until a message has been answered. Messages of the same
+    user_id (the same conversation thread) run one after the other, with or without a request_id.
+    {"type": "cancel", "request_id": ...} stops a request and is acknowledged with
+    {"request_id": ..., "cancelled": true|false} once no more frames of it can follow.
+
+    The connection is read while answers stream, so a disconnect is noticed immediately and cancels
+    every request of the connection, down to the graph runs and their LLM calls.
+
+    Args:
+        websocket: The accepted websocket.
+        codec: Frame encoding of the connection.
+        answer: Coroutine answering one message: (message, envelope) where the envelope holds the
+            fields to add to every frame of the answer.
+        max_concurrent: Messages in flight per connection.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        codec: FrameCodec,
+        answer: Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]],
+        max_concurrent: int = settings.WS_MAX_CONCURRENT_REQUESTS,
+    ) -> None:
+        self.websocket = websocket
+        self.codec = codec
+        self.answer = answer
+        self.max_concurrent = max_concurrent
+        self._requests: Dict[Any, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._conversation_locks: Dict[Any, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._in_order_lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        """Serve the connection until the client disconnects, then cancel the requests still running."""
+        try:
+            while True:
+                data = await self.codec.receive(self.websocket)
+                request_id = data.get("request_id") if isinstance(data, dict) else None
+
+                if isinstance(request_id, bool) or not isinstance(request_id, (str, int, type(None))):
+                    # Ids key the requests in flight and are echoed back in every frame
+                    await self.codec.send(self.websocket, {"error": "request_id must be a string or an integer"})
+                elif request_id is None:
+                    # Backpressure, as when these messages were answered before reading the next one
+                    while len(self._tasks) >= self.max_concurrent:
+                        await asyncio.wait(set(self._tasks), return_when=asyncio.FIRST_COMPLETED)
+                    self._spawn(self._serve_in_order(data))
+                elif data.get("type") == "cancel":
+                    await self._cancel(request_id)
+                elif request_id in self._requests:
+                    await self._reject(request_id, "A request with this request_id is already in flight")
+                elif len(self._tasks) >= self.max_concurrent:
+                    await self._reject(
+                        request_id, f"Too many concurrent requests on this connection (max {self.max_concurrent})"
+                    )
+                else:
+                    task = self._spawn(self._serve(data, request_id))
+                    self._requests[request_id] = task
+                    task.add_done_callback(lambda task, request_id=request_id: self._finished(request_id, task))
+        finally:
+            tasks = list(self._tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _spawn(self, work: Awaitable[None]) -> asyncio.Task:
+        task = asyncio.create_task(work)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Websocket request failed: {task.exception()!r}")
+
+    async def _serve(self, data: Dict[str, Any], request_id: Any) -> None:
+        async with self._conversation_locks[data.get("user_id")]:
+            await self.answer(data, {"request_id": request_id})
+
+    async def _serve_in_order(self, data: Any) -> None:
+        # asyncio.Lock is fair, so unidentified messages are answered in arrival order
+        user_id = data.get("user_id") if isinstance(data, dict) else None
+        async with self._in_order_lock, self._conversation_locks[user_id]:
+            await self.answer(data, {})
+
+    async def _cancel(self, request_id: Any) -> None:
+        task = self._requests.get(request_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.wait({task})
+        await self.codec.send(self.websocket, {"request_id": request_id, "cancelled": task is not None})
+
+    async def _reject(self, request_id: Any, error: str) -> None:
+        await self.codec.send(self.websocket, {"request_id": request_id, "error": error})
+
+    def _finished(self, request_id: Any, task: asyncio.Task) -> None:
+        if self._requests.get(request_id) is task:
+            del self._requests[request_id]